@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Batch describe benchmark
+Compares N sequential get_object_fields calls with one get_objects_fields call against
+the local mock Salesforce REST server, starting from a cold describe cache each time.
+
+    python benchmarks/bench_describe_batch.py --objects 30 --latency-ms 80
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.salesforce import streaming_mcp_server as server  # noqa: E402
+from src.salesforce.mock_salesforce import MockSalesforce  # noqa: E402
+
+
+async def sequential(names):
+    for name in names:
+        await server.get_object_fields({"object_name": name})
+
+
+async def batched(names):
+    await server.get_objects_fields({"object_names": names})
+
+
+def measure(label, coroutine_factory, names, mock, repeat):
+    timings = []
+    requests = []
+    for _ in range(repeat):
+        server.sf_client.describe_cache.invalidate()
+        before = mock.request_count
+        start = time.perf_counter()
+        asyncio.run(coroutine_factory(names))
+        timings.append(time.perf_counter() - start)
+        requests.append(mock.request_count - before)
+    best = min(timings)
+    print(f"{label:<28} best={best * 1000:9.1f}ms  requests={requests[0]}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sequential and batched describe calls')
+    parser.add_argument('--objects', type=int, default=30, help='Number of objects to describe')
+    parser.add_argument('--latency-ms', type=float, default=80.0, help='Simulated round-trip latency per request')
+    parser.add_argument('--fields', type=int, default=100, help='Fields per object')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (best is reported)')
+    args = parser.parse_args()
+
+    names = [f"Benchmark_Object_{i}__c" for i in range(args.objects)]
+    with MockSalesforce(latency=args.latency_ms / 1000, field_count=args.fields) as mock:
+        server.sf_client.sf = mock.salesforce()
+        seq = measure(f"{args.objects} x get_object_fields", sequential, names, mock, args.repeat)
+        batch = measure("1 x get_objects_fields", batched, names, mock, args.repeat)
+    print(f"speedup: {seq / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
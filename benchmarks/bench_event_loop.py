@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Event loop latency benchmark
+Runs N concurrent sessions of fast get_record calls while one session runs a slow
+SOQL query, and reports fast-call latency percentiles with and without the slow query.
+
+    python benchmarks/bench_event_loop.py --sessions 20 --calls 50 --slow-query-seconds 3
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.salesforce import streaming_mcp_server as server  # noqa: E402
+
+
+class FakeSObject:
+    """Stands in for simple_salesforce's SFType with a fixed per-call latency"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get(self, record_id):
+        time.sleep(self.latency)
+        return {"Id": record_id}
+
+
+class FakeSalesforce:
+    """Stands in for simple_salesforce.Salesforce with blocking calls"""
+
+    def __init__(self, fast_latency, slow_latency):
+        self.fast_latency = fast_latency
+        self.slow_latency = slow_latency
+
+    def query(self, query, headers=None):
+        time.sleep(self.slow_latency)
+        return {"records": [], "totalSize": 0, "done": True}
+
+    def describe(self):
+        return {"sobjects": [{"name": "Account", "keyPrefix": "001"}]}
+
+    def limits(self):
+        return {"DailyApiRequests": {"Max": 15000, "Remaining": 15000}}
+
+    def __getattr__(self, name):
+        return FakeSObject(self.fast_latency)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def session(index, calls, latencies):
+    """One MCP session issuing sequential get_record calls
+
+    Every session reads its own records, so concurrent calls are not coalesced and each one
+    goes through the executor.
+    """
+    for i in range(calls):
+        start = time.perf_counter()
+        await server.get_record({"object_name": "Account", "record_id": f"001{index:06d}{i:09d}"})
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_round(sessions, calls, with_slow_query):
+    latencies = []
+    tasks = [session(index, calls, latencies) for index in range(sessions)]
+    if with_slow_query:
+        tasks.append(server.run_soql_query({"query": "SELECT Id FROM Account"}))
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<22} n={len(latencies):<6} "
+          f"p50={percentile(latencies, 50) * 1000:8.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+          f"mean={statistics.mean(latencies) * 1000:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure tool latency while a slow query is running')
+    parser.add_argument('--sessions', type=int, default=20, help='Concurrent sessions')
+    parser.add_argument('--calls', type=int, default=50, help='get_record calls per session')
+    parser.add_argument('--fast-latency-ms', type=float, default=5.0, help='Simulated get_record latency')
+    parser.add_argument('--slow-query-seconds', type=float, default=3.0, help='Simulated slow SOQL latency')
+    args = parser.parse_args()
+
+    server.sf_client.sf = FakeSalesforce(args.fast_latency_ms / 1000, args.slow_query_seconds)
+    print(f"executor max_concurrency={server.sf_client.executor.max_concurrency}")
+
+    async def rounds():
+        baseline = await run_round(args.sessions, args.calls, with_slow_query=False)
+        report("baseline", baseline)
+        contended = await run_round(args.sessions, args.calls, with_slow_query=True)
+        report("with slow query", contended)
+
+    asyncio.run(rounds())
+    print(f"executor stats: {server.sf_client.executor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
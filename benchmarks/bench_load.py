@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Load harness
+Starts the local mock Salesforce org, runs setup_app() in a separate server process logged in to
+it, then drives N concurrent SSE MCP sessions per tool and reports throughput, p50/p95/p99 call
+latency and the server's resident memory after each tool (Linux only).
+
+    python benchmarks/bench_load.py --sessions 20 --calls 25
+    python benchmarks/bench_load.py --latency-ms 80 --records 5000 --value-size 200 --json
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import requests
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from bench_event_loop import percentile  # noqa: E402
+from src.salesforce.mock_salesforce import MockSalesforce, generate_records  # noqa: E402
+
+
+def tool_calls(record_ids):
+    """Arguments of the i-th call of each benchmarked tool"""
+    return {
+        "get_object_fields": lambda i: {"object_name": "Account"},
+        "run_soql_query": lambda i: {"query": "SELECT Id, Name FROM Account LIMIT 200", "bypass_cache": True},
+        "get_record": lambda i: {"object_name": "Account", "record_id": record_ids[i % len(record_ids)]},
+        "get_records": lambda i: {"record_ids": [record_ids[(i + j) % len(record_ids)] for j in range(50)],
+                                  "fields": ["Id", "Name"]},
+    }
+
+
+def run_server(port, mock_url):
+    """Server process: the real app with the default org logged in to the mock"""
+    sys.path.insert(0, str(ROOT))
+    # Measure the server rather than the rate limiter, unless limits are set explicitly
+    os.environ.setdefault('SALESFORCE_RATE_LIMIT', '0')
+    os.environ.setdefault('SALESFORCE_SESSION_RATE_LIMIT', '0')
+    import uvicorn
+
+    from src.salesforce import streaming_mcp_server as server
+    from src.salesforce.mock_salesforce import MockOrgConfig
+    from src.salesforce.registry import ClientRegistry
+
+    server.registry = ClientRegistry({"default": MockOrgConfig(mock_url)})
+    for name in ("", "mcp", server.package_logger.name):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    uvicorn.run(server.setup_app(), host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health/ready", timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{base_url} was not ready within {timeout}s")
+
+
+def memory_kb(pid):
+    """Current and peak resident set size of pid, or None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return None, None
+    return int(status["VmRSS"].split()[0]), int(status["VmHWM"].split()[0])
+
+
+async def session(url, tool, make_arguments, calls, latencies, errors):
+    """One SSE MCP session issuing sequential calls of tool"""
+    async with sse_client(url) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as client:
+            await client.initialize()
+            for i in range(calls):
+                start = time.perf_counter()
+                try:
+                    result = await client.call_tool(tool, {"arguments": make_arguments(i)})
+                    if result.isError:
+                        errors.append(result.content[0].text if result.content else "error")
+                except Exception as e:
+                    errors.append(str(e))
+                latencies.append(time.perf_counter() - start)
+
+
+async def drive(url, tool, make_arguments, sessions, calls):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(session(url, tool, make_arguments, calls, latencies, errors) for _ in range(sessions)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive concurrent SSE MCP sessions against the server and the mock org')
+    parser.add_argument('--sessions', type=int, default=20, help='Concurrent MCP sessions per tool')
+    parser.add_argument('--calls', type=int, default=25, help='Sequential calls per session')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Simulated round-trip latency per Salesforce request')
+    parser.add_argument('--records', type=int, default=1000, help='Account records in the mock org')
+    parser.add_argument('--fields', type=int, default=20, help='Custom fields per record and per describe')
+    parser.add_argument('--value-size', type=int, default=40, help='Characters in each custom field value')
+    parser.add_argument('--tools', default=','.join(tool_calls([""])), help='Comma-separated tools to drive')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with MockSalesforce(latency=args.latency_ms / 1000, field_count=args.fields) as mock:
+        records = generate_records("Account", args.records, args.fields, args.value_size)
+        mock.add_records("Account", records)
+        calls_by_tool = tool_calls([record["Id"] for record in records])
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = multiprocessing.get_context("spawn").Process(target=run_server, args=(port, mock.base_url),
+                                                               daemon=True)
+        process.start()
+        results = []
+        try:
+            wait_ready(base_url)
+            for tool in args.tools.split(','):
+                latencies, errors, elapsed = asyncio.run(
+                    drive(f"{base_url}/sse", tool, calls_by_tool[tool], args.sessions, args.calls))
+                rss, peak = memory_kb(process.pid)
+                results.append({
+                    "tool": tool,
+                    "calls": len(latencies),
+                    "errors": len(errors),
+                    "throughput": len(latencies) / elapsed,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p95_ms": percentile(latencies, 95) * 1000,
+                    "p99_ms": percentile(latencies, 99) * 1000,
+                    "rss_kb": rss,
+                    "peak_rss_kb": peak,
+                })
+                if errors:
+                    print(f"{tool}: first error: {errors[0]}", file=sys.stderr)
+        finally:
+            process.terminate()
+            process.join(timeout=5)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.sessions} sessions x {args.calls} calls, {args.latency_ms:.0f}ms simulated latency")
+    for r in results:
+        memory = f"rss={r['rss_kb'] / 1024:7.1f}MB peak={r['peak_rss_kb'] / 1024:7.1f}MB" if r["rss_kb"] else "rss=n/a"
+        print(f"{r['tool']:<18} calls={r['calls']:>5} errors={r['errors']:>3} {r['throughput']:8.1f}/s  "
+              f"p50={r['p50_ms']:7.1f}ms p95={r['p95_ms']:7.1f}ms p99={r['p99_ms']:7.1f}ms  {memory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Response shaping benchmark
+Reports the serialized size and shaping + serialization time of a large SOQL result in each
+output format. Tool results are serialized the way FastMCP sends them (indented JSON).
+
+    python benchmarks/bench_response_shapes.py --records 2000
+    python benchmarks/bench_response_shapes.py --input recorded_result.json
+"""
+
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+import pydantic_core
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.salesforce.shaping import OUTPUT_FORMATS, shape_result  # noqa: E402
+
+
+def generate_result(count):
+    """A run_soql_query result shaped like a recorded Opportunity query with parent fields"""
+    records = []
+    for i in range(count):
+        records.append({
+            "attributes": {"type": "Opportunity", "url": f"/services/data/v59.0/sobjects/Opportunity/006Hs00001{i:08d}"},
+            "Id": f"006Hs00001{i:08d}",
+            "Name": f"Renewal {i}",
+            "StageName": ("Prospecting", "Negotiation", "Closed Won")[i % 3],
+            "Amount": None if i % 4 == 0 else 1000.0 + i,
+            "CloseDate": "2024-12-31",
+            "Probability": None if i % 5 == 0 else 50.0,
+            "Description": None,
+            "NextStep": None if i % 2 else "Follow up",
+            "Account": {
+                "attributes": {"type": "Account", "url": f"/services/data/v59.0/sobjects/Account/001Hs00000{i % 97:08d}"},
+                "Name": f"Customer {i % 97}",
+                "Industry": None if i % 3 else "Technology",
+                "Owner": {
+                    "attributes": {"type": "User", "url": f"/services/data/v59.0/sobjects/User/005Hs00000{i % 7:08d}"},
+                    "Name": f"Rep {i % 7}",
+                },
+            },
+        })
+    return {"records": records, "totalSize": count, "done": True}
+
+
+def measure(result, fmt, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = pydantic_core.to_json(shape_result(result, fmt), fallback=str, indent=2)
+        timings.append(time.perf_counter() - start)
+    return len(payload), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare serialized size and time of the query output formats')
+    parser.add_argument('--records', type=int, default=2000, help='Records in the generated result')
+    parser.add_argument('--input', help='JSON file holding a recorded run_soql_query result to use instead')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per format (best is reported)')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, encoding='utf-8') as f:
+            result = json.load(f)
+    else:
+        result = generate_result(args.records)
+
+    print(f"{len(result['records'])} records")
+    raw_size = None
+    for fmt in OUTPUT_FORMATS:
+        size, best = measure(result, fmt, args.repeat)
+        raw_size = raw_size or size
+        print(f"{fmt:<10} bytes={size:>10}  ({size / raw_size:6.1%} of raw)  best={best * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark
+Measures the import time of the server module in fresh interpreters, then starts the app against
+the local mock Salesforce server and reports the time until /health answers (liveness) and until
+/health/ready answers 200 (login and describe warmup finished).
+
+    python benchmarks/bench_startup.py --login-ms 800 --warmup 20
+    python benchmarks/bench_startup.py --max-import-seconds 3 --max-ready-seconds 5   # fail on regressions
+"""
+
+from pathlib import Path
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import uvicorn
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.salesforce import streaming_mcp_server as server  # noqa: E402
+from src.salesforce.mock_salesforce import MockOrgConfig, MockSalesforce  # noqa: E402
+from src.salesforce.registry import ClientRegistry  # noqa: E402
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    "import src.salesforce.streaming_mcp_server; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def measure_import(repeat):
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def wait_for(url, started, timeout=30.0):
+    while time.perf_counter() - started < timeout:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not return 200 within {timeout}s")
+
+
+def measure_ready(login_delay, warmup_objects, latency):
+    with MockSalesforce(latency=latency, login_latency=login_delay) as mock:
+        server.registry = ClientRegistry({"default": MockOrgConfig(mock.base_url)})
+        os.environ['SALESFORCE_DESCRIBE_WARMUP'] = ",".join(warmup_objects)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+        started = time.perf_counter()
+        app = server.create_starlette_app(server.mcp._mcp_server)
+        uvicorn_server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+        thread = threading.Thread(target=uvicorn_server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        try:
+            live = wait_for(f"{base_url}/health", started)
+            ready = wait_for(f"{base_url}/health/ready", started)
+        finally:
+            uvicorn_server.should_exit = True
+            thread.join(timeout=5)
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and time to liveness/readiness')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh-interpreter imports to time (median is reported)')
+    parser.add_argument('--login-ms', type=float, default=800.0, help='Simulated Salesforce login time')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Simulated round-trip latency per request')
+    parser.add_argument('--warmup', type=int, default=10, help='Objects described during startup warmup')
+    parser.add_argument('--max-import-seconds', type=float, help='Exit with an error if the import is slower')
+    parser.add_argument('--max-ready-seconds', type=float, help='Exit with an error if readiness takes longer')
+    args = parser.parse_args()
+
+    import_time = measure_import(args.repeat)
+    warmup_objects = [f"Benchmark_Object_{i}__c" for i in range(args.warmup)]
+    live, ready = measure_ready(args.login_ms / 1000, warmup_objects, args.latency_ms / 1000)
+
+    print(f"import (median of {args.repeat})  {import_time * 1000:9.1f}ms")
+    print(f"time to live              {live * 1000:9.1f}ms")
+    print(f"time to ready             {ready * 1000:9.1f}ms  (login {args.login_ms:.0f}ms, {args.warmup} objects warmed)")
+
+    failures = []
+    if args.max_import_seconds is not None and import_time > args.max_import_seconds:
+        failures.append(f"import took {import_time:.2f}s, limit {args.max_import_seconds}s")
+    if args.max_ready_seconds is not None and ready > args.max_ready_seconds:
+        failures.append(f"readiness took {ready:.2f}s, limit {args.max_ready_seconds}s")
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -56,6 +56,7 @@ fi
 mkdir -p /app/logs
 
 echo "===== Server endpoints ====="
+echo "Streamable HTTP endpoint: http://0.0.0.0:${PORT:-8080}/mcp"
 echo "SSE endpoint: http://0.0.0.0:${PORT:-8080}/sse"
 echo "Health check: http://0.0.0.0:${PORT:-8080}/health"
 echo "Metrics: http://0.0.0.0:${PORT:-8080}/metrics"
@@ -67,4 +68,5 @@ echo "===== Starting server ====="
 exec python -m src.salesforce.streaming_mcp_server \
   --host 0.0.0.0 \
   --port ${PORT:-8080} \
-  --log-level ${LOG_LEVEL:-info}
+  --log-level ${LOG_LEVEL:-info} \
+  --workers ${MCP_WORKERS:-1}
@@ -1,9 +1,7 @@
-from . import streaming_mcp_server
-import asyncio
-
 def main():
     """Main entry point for the package."""
-    asyncio.run(server.run())
+    # Imported here so that importing the package does not load the server
+    from .streaming_mcp_server import main as server_main
+    server_main()
 
-# Optionally expose other important items at package level
-__all__ = ['main', 'server']
\ No newline at end of file
+__all__ = ['main']
@@ -0,0 +1,292 @@
+"""
+Bulk API 2.0 query jobs
+Submits a query job, polls it without blocking the event loop and streams the CSV result
+pages into a sink that summarizes, samples or saves the rows. Ingest jobs are polled the same way.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import asyncio
+import csv
+import glob
+import logging
+import os
+import random
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+BULK_MODES = ("summary", "sample", "file")
+
+# Job states in which Salesforce is still producing results
+PENDING_STATES = frozenset({"UploadComplete", "InProgress"})
+
+# Columns stop counting distinct values beyond this many, to bound memory on wide extracts
+DISTINCT_LIMIT = 1000
+
+
+class BulkConfig:
+    """Polling and output settings for Bulk API 2.0 query jobs"""
+
+    def __init__(self, poll_interval: float = 2.0, max_poll_interval: float = 30.0, timeout: float = 3600.0,
+                 output_dir: Optional[str] = None, output_max_age: float = 86400.0,
+                 output_max_bytes: int = 1024 ** 3):
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.output_dir = output_dir or os.path.join(tempfile.gettempdir(), "salesforce-bulk")
+        self.output_max_age = output_max_age
+        self.output_max_bytes = output_max_bytes
+
+    @classmethod
+    def from_env(cls) -> "BulkConfig":
+        """Build a config from SALESFORCE_BULK_* environment variables"""
+        return cls(
+            poll_interval=float(os.getenv('SALESFORCE_BULK_POLL_INTERVAL', 2.0)),
+            max_poll_interval=float(os.getenv('SALESFORCE_BULK_MAX_POLL_INTERVAL', 30.0)),
+            timeout=float(os.getenv('SALESFORCE_BULK_TIMEOUT', 3600.0)),
+            output_dir=os.getenv('SALESFORCE_BULK_OUTPUT_DIR') or None,
+            output_max_age=float(os.getenv('SALESFORCE_BULK_OUTPUT_MAX_AGE', 86400.0)),
+            output_max_bytes=int(os.getenv('SALESFORCE_BULK_OUTPUT_MAX_BYTES', 1024 ** 3)),
+        )
+
+    def output_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, f"bulk-{name}.csv")
+
+
+def prune_output(config: BulkConfig) -> int:
+    """Delete result files older than output_max_age, then the oldest until output_max_bytes is met
+
+    Only files named like FileSink output are considered. Files still being written are the most
+    recently modified, so they are the last to go. Returns how many files were deleted.
+    """
+    files = []
+    for path in glob.glob(config.output_path("*")):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    cutoff = time.time() - config.output_max_age
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= config.output_max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not delete bulk result file {path}: {e}")
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Deleted {removed} old bulk result files from {config.output_dir}")
+    return removed
+
+
+def iter_csv_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Re-split decoded response chunks into newline-terminated lines for csv.reader
+
+    Only '\\n' ends a line, so other line separators inside field values pass through untouched.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line + "\n"
+    if buffer:
+        yield buffer
+
+
+class BulkSink:
+    """Consumer of CSV result pages; every page starts with the header row"""
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+        self.rows = 0
+
+    def consume(self, rows: Iterator[List[str]]):
+        header = next(rows, None)
+        if header is None:
+            return
+        if self.columns is None:
+            self.columns = header
+            self.start()
+        for row in rows:
+            self.add(row)
+            self.rows += 1
+
+    def start(self):
+        """Called once the columns are known"""
+
+    def add(self, row: List[str]):
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the sink"""
+
+    def result(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class SummarySink(BulkSink):
+    """Per-column fill rate, distinct count and numeric range, without keeping the rows"""
+
+    def start(self):
+        self.non_empty = [0] * len(self.columns)
+        self.distinct = [set() for _ in self.columns]
+        self.numeric = [True] * len(self.columns)
+        self.minimum: List[Optional[float]] = [None] * len(self.columns)
+        self.maximum: List[Optional[float]] = [None] * len(self.columns)
+        self.total = [0.0] * len(self.columns)
+
+    def add(self, row: List[str]):
+        for i, value in enumerate(row):
+            if value == "":
+                continue
+            self.non_empty[i] += 1
+            if len(self.distinct[i]) < DISTINCT_LIMIT:
+                self.distinct[i].add(value)
+            if self.numeric[i]:
+                try:
+                    number = float(value)
+                except ValueError:
+                    self.numeric[i] = False
+                    continue
+                self.total[i] += number
+                self.minimum[i] = number if self.minimum[i] is None else min(self.minimum[i], number)
+                self.maximum[i] = number if self.maximum[i] is None else max(self.maximum[i], number)
+
+    def result(self) -> Dict[str, Any]:
+        columns = {}
+        for i, name in enumerate(self.columns or []):
+            column = {
+                "non_empty": self.non_empty[i],
+                "distinct": len(self.distinct[i]),
+            }
+            if len(self.distinct[i]) >= DISTINCT_LIMIT:
+                column["distinct_capped"] = True
+            if self.numeric[i] and self.non_empty[i]:
+                column.update(min=self.minimum[i], max=self.maximum[i], sum=self.total[i])
+            columns[name] = column
+        return {"summary": columns}
+
+
+class SampleSink(BulkSink):
+    """Uniform random sample of the rows (reservoir sampling), returned in extract order"""
+
+    def __init__(self, size: int, seed: Optional[int] = None):
+        super().__init__()
+        self.size = size
+        self.random = random.Random(seed)
+        self.sample: List[tuple] = []
+
+    def add(self, row: List[str]):
+        if len(self.sample) < self.size:
+            self.sample.append((self.rows, row))
+            return
+        slot = self.random.randrange(self.rows + 1)
+        if slot < self.size:
+            self.sample[slot] = (self.rows, row)
+
+    def result(self) -> Dict[str, Any]:
+        return {"records": [dict(zip(self.columns, row)) for _, row in sorted(self.sample, key=lambda item: item[0])]}
+
+
+class FileSink(BulkSink):
+    """Writes the rows to a local CSV file and returns its path instead of the data"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def add(self, row: List[str]):
+        self._writer.writerow(row)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def result(self) -> Dict[str, Any]:
+        self.close()
+        if self.columns is None:
+            return {"path": None, "bytes": 0}
+        return {"path": self.path, "bytes": os.path.getsize(self.path)}
+
+
+async def report(progress, done: int, total: Optional[int], message: str):
+    """Report progress to an MCP context or a WriteJob, ignoring a client that has gone away"""
+    if progress is None:
+        return
+    try:
+        await progress.report_progress(done, total, message=message)
+    except Exception as e:
+        logger.debug(f"Could not report progress: {e}")
+
+
+async def wait_for_job(client, job_id: str, config: BulkConfig, ctx=None, get_job=None) -> Dict[str, Any]:
+    """Poll a job with growing intervals until it completes, fails or times out
+
+    get_job reads the job's state; it defaults to the client's query job lookup.
+    """
+    get_job = get_job or client.get_bulk_query_job
+    deadline = time.monotonic() + config.timeout
+    interval = config.poll_interval
+    while True:
+        job = await client.run(get_job, job_id)
+        state = job.get("state")
+        kind = job.get("operation") or "query"
+        if state == "JobComplete":
+            return job
+        if state not in PENDING_STATES:
+            raise ValueError(f"Bulk {kind} job {job_id} ended in state {state}: {job.get('errorMessage') or 'no details'}")
+        if time.monotonic() + interval > deadline:
+            raise TimeoutError(f"Bulk {kind} job {job_id} did not complete within {config.timeout:.0f}s")
+        await report(ctx, job.get("numberRecordsProcessed", 0), None, f"Bulk job {job_id} is {state}")
+        await asyncio.sleep(interval)
+        interval = min(interval * 1.5, config.max_poll_interval)
+
+
+async def run_bulk_query(client, query: str, sink: BulkSink, config: BulkConfig, *, ctx=None,
+                         page_size: Optional[int] = None) -> Dict[str, Any]:
+    """Run query as a Bulk API 2.0 job and feed every result page to sink
+
+    The job is aborted if polling fails, times out or the tool call is cancelled.
+    """
+    job = await client.run(client.create_bulk_query_job, query)
+    job_id = job["id"]
+    completed = False
+    try:
+        job = await wait_for_job(client, job_id, config, ctx)
+        completed = True
+        total = job.get("numberRecordsProcessed")
+        locator, pages = None, 0
+        while True:
+            locator = await client.run(client.read_bulk_query_results, job_id, sink.consume, locator, page_size)
+            pages += 1
+            await report(ctx, sink.rows, total, f"Read page {pages}: {sink.rows} of {total} records")
+            if locator is None:
+                break
+    except BaseException:
+        if not completed:
+            try:
+                await client.run(client.abort_bulk_query_job, job_id)
+            except Exception as e:
+                logger.warning(f"Could not abort bulk query job {job_id}: {e}")
+        raise
+    finally:
+        sink.close()
+
+    return {"job_id": job_id, "totalSize": sink.rows, "pages": pages, "columns": sink.columns or [], **sink.result()}
@@ -0,0 +1,367 @@
+"""
+Caches for Salesforce metadata and query results
+DescribeCache: bounded LRU with per-entry TTL, If-Modified-Since revalidation and a periodically flushed snapshot
+QueryCache: opt-in SOQL result cache with a memory budget and stale-while-revalidate
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_FLUSH_INTERVAL = 30.0
+SNAPSHOT_VERSION = 1
+DEFAULT_QUERY_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class DescribeEntry:
+    """Cached describe result for one object"""
+
+    __slots__ = ("value", "fetched_at", "last_modified")
+
+    def __init__(self, value: Any, fetched_at: float, last_modified: Optional[str] = None):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.last_modified = last_modified
+
+
+class DescribeCache:
+    """Thread-safe LRU cache of describe results with TTL-based revalidation
+
+    Expired entries are kept so they can be revalidated with If-Modified-Since
+    instead of being fetched again in full. Changes only mark the snapshot dirty; the server
+    calls flush() every flush_interval seconds and at shutdown.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS,
+                 snapshot_path: Optional[str] = None, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, DescribeEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, org_alias: str = "default") -> "DescribeCache":
+        """Build a cache configured from SALESFORCE_DESCRIBE_CACHE_* environment variables
+
+        Orgs other than the default get their own snapshot file, e.g. describe_cache.acme.json.
+        """
+        snapshot_path = os.getenv('SALESFORCE_DESCRIBE_CACHE_PATH') or None
+        if snapshot_path and org_alias != "default":
+            root, ext = os.path.splitext(snapshot_path)
+            snapshot_path = f"{root}.{org_alias}{ext}"
+        return cls(
+            max_entries=int(os.getenv('SALESFORCE_DESCRIBE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.getenv('SALESFORCE_DESCRIBE_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+            snapshot_path=snapshot_path,
+            flush_interval=float(os.getenv('SALESFORCE_DESCRIBE_CACHE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)),
+        )
+
+    def is_fresh(self, entry: DescribeEntry) -> bool:
+        """True if the entry is within its TTL"""
+        return time.time() - entry.fetched_at < self.ttl
+
+    def get(self, name: str) -> Optional[DescribeEntry]:
+        """Return the entry for name, fresh or expired, marking it recently used"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+            return entry
+
+    def get_fresh(self, name: str) -> Optional[Any]:
+        """Return the cached value if present and within its TTL, counting the hit or miss"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and self.is_fresh(entry):
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            return None
+
+    def put(self, name: str, value: Any, last_modified: Optional[str] = None):
+        """Store a freshly fetched describe result"""
+        with self._lock:
+            self._entries[name] = DescribeEntry(value, time.time(), last_modified)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def revalidated(self, name: str):
+        """Restart the TTL of an entry the server reported as unmodified"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            entry.fetched_at = time.time()
+            self.revalidations += 1
+            self._dirty = True
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one entry, or every entry when name is None"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+            self._dirty = True
+
+    def names(self) -> List[str]:
+        """Cached object names, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
+
+    def load_snapshot(self) -> int:
+        """Load entries from the snapshot file, returning how many were loaded"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                logger.warning(f"Ignoring describe cache snapshot with unknown version at {self.snapshot_path}")
+                return 0
+            entries = sorted(snapshot.get("entries", {}).items(), key=lambda item: item[1]["fetched_at"])
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Could not load describe cache snapshot {self.snapshot_path}: {e}")
+            return 0
+
+        entries = entries[-self.max_entries:]
+        with self._lock:
+            for name, data in entries:
+                self._entries[name] = DescribeEntry(data["value"], data["fetched_at"], data.get("last_modified"))
+        logger.info(f"Loaded {len(entries)} describe cache entries from {self.snapshot_path}")
+        return len(entries)
+
+    def flush(self) -> bool:
+        """Write the snapshot if entries changed since it was last written, returning whether it was"""
+        if not self.snapshot_path or not self._dirty:
+            return False
+        return self.save_snapshot()
+
+    def save_snapshot(self) -> bool:
+        """Atomically write all entries to the snapshot file, if one is configured, returning whether it was"""
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            self._dirty = False
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "entries": {
+                    name: {"value": e.value, "fetched_at": e.fetched_at, "last_modified": e.last_modified}
+                    for name, e in self._entries.items()
+                },
+            }
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".describe-cache-")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not write describe cache snapshot {self.snapshot_path}: {e}")
+            self._dirty = True
+            return False
+        return True
+
+
+# Clauses that make a SOQL query update tracking data, so its results must not be cached
+_SIDE_EFFECT_CLAUSES = re.compile(r"\bFOR\s+(UPDATE|VIEW|REFERENCE)\b|\bUPDATE\s+(TRACKING|VIEWSTAT)\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_SOQL_KEYWORDS = frozenset("""
+    SELECT FROM WHERE AND OR NOT IN LIKE INCLUDES EXCLUDES LIMIT OFFSET ORDER BY ASC DESC NULLS FIRST LAST
+    GROUP HAVING ROLLUP CUBE WITH TYPEOF WHEN THEN ELSE END USING SCOPE FOR VIEW REFERENCE UPDATE TRACKING
+    VIEWSTAT TRUE FALSE NULL DATA CATEGORY AT ABOVE BELOW ABOVE_OR_BELOW SECURITY_ENFORCED USER_MODE SYSTEM_MODE
+""".split())
+_WORD = re.compile(r"[A-Za-z_]+")
+
+
+def normalize_soql(query: str) -> str:
+    """Canonical form of a SOQL query for cache keys
+
+    Whitespace runs collapse to one space and keywords are upper-cased; string
+    literals and identifiers (whose case can show up in aliases) are left alone.
+    """
+    parts = []
+    position = 0
+    for match in _STRING_LITERAL.finditer(query):
+        parts.append(_normalize_code(query[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_normalize_code(query[position:]))
+    return "".join(parts).strip()
+
+
+def _normalize_code(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([(),])\s*", r"\1", text)
+    return _WORD.sub(lambda m: m.group(0).upper() if m.group(0).upper() in _SOQL_KEYWORDS else m.group(0), text)
+
+
+def is_cacheable_query(normalized_query: str) -> bool:
+    """True unless the query has side effects such as FOR VIEW or UPDATE TRACKING"""
+    return not _SIDE_EFFECT_CLAUSES.search(_STRING_LITERAL.sub("''", normalized_query))
+
+
+class QueryEntry:
+    """Cached result of one SOQL query"""
+
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value: Any, size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class QueryCache:
+    """LRU cache of SOQL results bounded by total serialized size, with stale-while-revalidate
+
+    Entries are fresh for ttl seconds and may then be served for stale_ttl more seconds
+    while a background refresh runs. Used from the event loop only.
+    """
+
+    def __init__(self, ttl: float = 0, stale_ttl: float = 0, max_bytes: int = DEFAULT_QUERY_CACHE_BYTES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, ...], QueryEntry]" = OrderedDict()
+        self._refreshing: Set[Tuple[str, ...]] = set()
+        # The event loop only keeps weak references to tasks, so running refreshes are held here
+        self._tasks: Set[asyncio.Task] = set()
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @classmethod
+    def from_env(cls) -> "QueryCache":
+        """Build a cache configured from SALESFORCE_QUERY_CACHE_* environment variables (disabled by default)"""
+        return cls(
+            ttl=float(os.getenv('SALESFORCE_QUERY_CACHE_TTL', 0)),
+            stale_ttl=float(os.getenv('SALESFORCE_QUERY_CACHE_STALE_TTL', 0)),
+            max_bytes=int(os.getenv('SALESFORCE_QUERY_CACHE_MAX_BYTES', DEFAULT_QUERY_CACHE_BYTES)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(identity: str, normalized_query: str, *options: Any) -> Tuple[str, ...]:
+        """Cache key for a query run by a given org user with the given response options"""
+        return (identity, normalized_query) + tuple(str(option) for option in options)
+
+    def get(self, key: Tuple[str, ...]) -> Tuple[Optional[Any], bool]:
+        """Return (value, is_fresh), or (None, False) on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, True
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return entry.value, False
+            self._remove(key)
+        self.misses += 1
+        return None, False
+
+    def put(self, key: Tuple[str, ...], value: Any):
+        """Store a result, evicting least recently used entries to stay within max_bytes"""
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = QueryEntry(value, size, time.monotonic())
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def refresh_in_background(self, key: Tuple[str, ...], fetch: Callable[[], Awaitable[Any]]):
+        """Re-run a stale query once in the background and store the new result"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            self.put(key, await fetch())
+            self.refreshes += 1
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(lambda task: self._refreshed(key, task))
+
+    def _refreshed(self, key: Tuple[str, ...], task: asyncio.Task):
+        self._tasks.discard(task)
+        self._refreshing.discard(key)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background refresh of cached query failed: {task.exception()}")
+
+    def invalidate(self, identity: Optional[str] = None):
+        """Drop every entry for one identity, or all entries when identity is None"""
+        for key in [k for k in self._entries if identity is None or k[0] == identity]:
+            self._remove(key)
+
+    def _remove(self, key: Tuple[str, ...]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit counters"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,620 @@
+"""
+Salesforce client wrapper
+One SalesforceClient per org, each with its own executor, HTTP pool and caches
+"""
+
+from datetime import datetime
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+import asyncio
+import contextvars
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceError, SalesforceExpiredSession
+
+from .bulk import iter_csv_lines
+from .cache import DescribeCache, QueryCache
+from .coalesce import SingleFlight
+from .executor import BoundedExecutor, max_concurrency_from_env
+from .metrics import current_tool
+from .ratelimit import RateLimitConfig, RateLimiter, current_session, tool_priority
+from .replica import Replica, ReplicaConfig
+from .schema_index import SchemaIndex
+from .soql import SoqlParseError, SoqlValidationError, parse_soql, validate_query
+from .tracing import TRACER
+from .transport import TransportConfig, build_session
+from .writes import WriteJobs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ORG = "default"
+
+# Maximum number of subrequests in one Composite batch request
+COMPOSITE_BATCH_LIMIT = 25
+
+# Maximum number of IDs in one sObject Collections retrieve request
+COLLECTION_READ_LIMIT = 200
+
+# Size of the chunks Bulk API result pages are decoded in
+BULK_RESULT_CHUNK_SIZE = 64 * 1024
+
+# Minimum seconds between login attempts after a failed login
+LOGIN_RETRY_INTERVAL = 5.0
+
+
+class OrgConfig:
+    """Credentials and settings for one Salesforce org
+
+    The default org reads SALESFORCE_USERNAME, SALESFORCE_ACCESS_TOKEN, etc. Any other alias
+    reads the same variables with the alias inserted, e.g. SALESFORCE_ACME_USERNAME.
+    """
+
+    def __init__(self, alias: str = DEFAULT_ORG, username: Optional[str] = None, password: Optional[str] = None,
+                 security_token: Optional[str] = None, access_token: Optional[str] = None,
+                 instance_url: Optional[str] = None, domain: Optional[str] = None,
+                 max_concurrency: Optional[int] = None):
+        self.alias = alias
+        self.username = username
+        self.password = password
+        self.security_token = security_token
+        self.access_token = access_token
+        self.instance_url = instance_url
+        self.domain = domain
+        self.max_concurrency = max_concurrency or max_concurrency_from_env()
+
+    @staticmethod
+    def env_prefix(alias: str) -> str:
+        return "SALESFORCE_" if alias == DEFAULT_ORG else f"SALESFORCE_{alias.upper()}_"
+
+    @classmethod
+    def from_env(cls, alias: str = DEFAULT_ORG) -> "OrgConfig":
+        prefix = cls.env_prefix(alias)
+        concurrency = os.getenv(f"{prefix}MAX_CONCURRENCY")
+        return cls(
+            alias=alias,
+            username=os.getenv(f"{prefix}USERNAME"),
+            password=os.getenv(f"{prefix}PASSWORD"),
+            security_token=os.getenv(f"{prefix}SECURITY_TOKEN"),
+            access_token=os.getenv(f"{prefix}ACCESS_TOKEN"),
+            instance_url=os.getenv(f"{prefix}INSTANCE_URL"),
+            domain=os.getenv(f"{prefix}DOMAIN"),
+            max_concurrency=int(concurrency) if concurrency and concurrency.isdigit() else None,
+        )
+
+    @property
+    def can_login(self) -> bool:
+        """True if the config holds a username and password, so an expired session can be renewed"""
+        return bool(self.username and self.password)
+
+    def connect(self, session) -> Salesforce:
+        """Create a simple_salesforce client, logging in if the config holds a username and password"""
+        if self.access_token and self.instance_url:
+            return Salesforce(instance_url=self.instance_url, session_id=self.access_token, session=session)
+        return Salesforce(
+            username=self.username,
+            password=self.password,
+            security_token=self.security_token,
+            domain=self.domain,
+            session=session
+        )
+
+
+class SalesforceClient:
+    """Salesforce client wrapper
+
+    With connect=False the login is deferred to connect() or the first call that needs a session.
+    """
+
+    def __init__(self, config: Optional[OrgConfig] = None, session=None, connect: bool = True):
+        self.config = config or OrgConfig.from_env()
+        self.alias = self.config.alias
+        self.sf = None
+        self.describe_cache = DescribeCache.from_env(self.alias)
+        self.describe_cache.load_snapshot()
+        self.query_cache = QueryCache.from_env()
+        self.warmup_complete = True
+        self.executor = BoundedExecutor(self.config.max_concurrency, name=f"salesforce-{self.alias}")
+        self.transport_config = TransportConfig.from_env(min_pool_size=self.executor.max_concurrency)
+        self.session = session or build_session(self.transport_config)
+        self.rate_limiter = RateLimiter(RateLimitConfig.from_env())
+        self.inflight = SingleFlight()
+        self.schema_index = SchemaIndex(self.describe_cache.max_entries)
+        replica_config = ReplicaConfig.from_env(self.alias)
+        self.replica = Replica(self, replica_config) if replica_config.enabled else None
+        self.write_jobs = WriteJobs()
+        self._limits_task: Optional[asyncio.Task] = None
+        self._login_lock = threading.Lock()
+        self._generation = 0
+        self._last_login_failure = 0.0
+        self.logins = 0
+        self.session_refreshes = 0
+        self._key_prefixes: Optional[Dict[str, str]] = None
+        self._object_names: Optional[List[str]] = None
+        if connect:
+            self._initialize()
+
+    def _initialize(self):
+        """Initialize Salesforce connection from the org config"""
+        try:
+            sf = self.config.connect(self.session)
+            # Session renewal is handled by reconnect() so that concurrent expiries share one login
+            sf._salesforce_login_partial = None
+            self.sf = sf
+            self._generation += 1
+            self.logins += 1
+            logger.info(f"Connected to Salesforce org '{self.alias}' successfully")
+        except Exception as e:
+            now_cet = datetime.now(ZoneInfo("Europe/Paris")).strftime("%Y-%m-%d %H:%M:%S")
+            logger.error(f"[{now_cet} CET] Salesforce connection failed for org '{self.alias}': {e}")
+            self._last_login_failure = time.monotonic()
+            self.sf = None
+
+    def reconnect(self, seen_generation: int):
+        """Log in again unless another thread already did so since seen_generation
+
+        Callers that observed the same expired session queue on the lock and only the
+        first performs the login; the rest reuse its session.
+        """
+        with self._login_lock:
+            if self.sf is not None and self._generation != seen_generation:
+                return
+            if self.sf is not None and not self.config.can_login:
+                raise ValueError("Salesforce session expired and cannot be refreshed without a username and password")
+            if self.sf is None and time.monotonic() - self._last_login_failure < LOGIN_RETRY_INTERVAL:
+                raise ValueError("Salesforce connection not established.")
+            if self.sf is not None:
+                self.session_refreshes += 1
+            self._initialize()
+            if self.sf is None:
+                raise ValueError("Salesforce connection not established.")
+
+    async def connect(self) -> bool:
+        """Log in on the executor, so the event loop keeps serving while the login is in flight"""
+        if self.sf is not None:
+            return True
+        try:
+            await self.executor.run(self.reconnect, self._generation)
+        except ValueError:
+            return False
+        return True
+
+    def _with_session(self, func, *args, **kwargs):
+        """Call func, connecting first if needed and retrying once after renewing an expired session"""
+        generation = self._generation
+        if self.sf is None:
+            self.reconnect(generation)
+            generation = self._generation
+        try:
+            return func(*args, **kwargs)
+        except SalesforceExpiredSession:
+            logger.info(f"Salesforce session for org '{self.alias}' expired, logging in again")
+            self.reconnect(generation)
+            return func(*args, **kwargs)
+
+    @property
+    def identity(self):
+        """Org instance and user the client is authenticated as, used to partition cached results"""
+        if not self.sf:
+            return ""
+        user = self.config.username or hashlib.sha256(self.sf.session_id.encode()).hexdigest()[:16]
+        return f"{self.sf.sf_instance}|{user}"
+
+    def get_object_fields(self, object_name):
+        """Get fields for a specific object"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        entry = self.describe_cache.get(object_name)
+        if entry is not None and self.describe_cache.is_fresh(entry):
+            return entry.value
+
+        # Revalidate an expired entry instead of downloading the full describe again
+        headers = {'If-Modified-Since': entry.last_modified} if entry and entry.last_modified else {}
+        url = f"{self.sf.base_url}sobjects/{object_name}/describe"
+        try:
+            response = self.sf._call_salesforce('GET', url, name=object_name, headers=headers)
+        except SalesforceError as e:
+            if entry is not None and e.status == 304:
+                self.describe_cache.revalidated(object_name)
+                return entry.value
+            raise
+
+        filtered_fields = self._filter_fields(response.json()['fields'])
+        last_modified = response.headers.get('Last-Modified') or formatdate(usegmt=True)
+        self.describe_cache.put(object_name, filtered_fields, last_modified)
+        return filtered_fields
+
+    @staticmethod
+    def _filter_fields(fields):
+        """Keep only the describe attributes the tools expose"""
+        filtered_fields = []
+        for field in fields:
+            filtered_fields.append({
+                'label': field['label'],
+                'name': field['name'],
+                'updateable': field['updateable'],
+                'type': field['type'],
+                'length': field['length'],
+                'picklistValues': field['picklistValues']
+            })
+        return filtered_fields
+
+    def describe_batch(self, object_names):
+        """Describe up to 25 objects in one Composite batch request
+
+        Returns a (fields by object, error message by object) tuple.
+        """
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        batch = {
+            "haltOnError": False,
+            "batchRequests": [
+                {"method": "GET", "url": f"v{self.sf.sf_version}/sobjects/{name}/describe"} for name in object_names
+            ],
+        }
+        response = self.sf.restful('composite/batch', method='POST', json=batch)
+        fields_by_object, errors = {}, {}
+        last_modified = formatdate(usegmt=True)
+        for name, result in zip(object_names, response['results']):
+            if result['statusCode'] == 200:
+                fields_by_object[name] = self._filter_fields(result['result']['fields'])
+                self.describe_cache.put(name, fields_by_object[name], last_modified)
+            else:
+                details = result.get('result') or [{}]
+                errors[name] = details[0].get('message', f"HTTP {result['statusCode']}")
+        return fields_by_object, errors
+
+    async def object_fields(self, object_name):
+        """Fields of one object from the describe cache, or from a describe shared with concurrent callers"""
+        cached = self.describe_cache.get_fresh(object_name)
+        if cached is not None:
+            return cached
+        return await self.run_shared(("describe", object_name), self.get_object_fields, object_name)
+
+    async def field_index(self, object_name):
+        """Searchable index of one object's fields, built from its describe"""
+        return self.schema_index.get(object_name, await self.object_fields(object_name))
+
+    async def get_objects_fields(self, object_names):
+        """Get fields for several objects, answering from the cache and batching the misses
+
+        Misses that another call is already describing join that describe; the rest are split into
+        Composite batches of 25 that are sent concurrently.
+        """
+        fields_by_object, errors, misses, joined = {}, {}, [], []
+        for name in dict.fromkeys(object_names):
+            cached = self.describe_cache.get_fresh(name)
+            if cached is not None:
+                fields_by_object[name] = cached
+            elif self.inflight.in_flight(("describe", name)):
+                joined.append(name)
+            else:
+                misses.append(name)
+
+        chunks = [misses[i:i + COMPOSITE_BATCH_LIMIT] for i in range(0, len(misses), COMPOSITE_BATCH_LIMIT)]
+        batches, shared = await asyncio.gather(
+            asyncio.gather(*(self.run_shared(("describe_batch",) + tuple(chunk), self.describe_batch, chunk)
+                             for chunk in chunks)),
+            asyncio.gather(*(self.object_fields(name) for name in joined), return_exceptions=True),
+        )
+        for batch_fields, batch_errors in batches:
+            fields_by_object.update(batch_fields)
+            errors.update(batch_errors)
+        for name, result in zip(joined, shared):
+            if isinstance(result, Exception):
+                errors[name] = str(result)
+            else:
+                fields_by_object[name] = result
+        return fields_by_object, errors
+
+    async def warm_up(self, object_names):
+        """Describe the given objects concurrently so the first tool calls hit the cache"""
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.object_fields(name) for name in object_names),
+            return_exceptions=True
+        )
+        for name, result in zip(object_names, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Describe warmup failed for {name}: {result}")
+        logger.info(f"Describe warmup of {len(object_names)} objects finished in {time.perf_counter() - started:.2f}s")
+
+    def query_page(self, query=None, next_url=None, batch_size=None):
+        """Fetch a single page of SOQL results, either the first page of a query or the page at next_url"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        headers = {'Sforce-Query-Options': f'batchSize={batch_size}'} if batch_size else {}
+        if next_url:
+            return self.sf.query_more(next_url, identifier_is_url=True, headers=headers)
+        return self.sf.query(query, headers=headers)
+
+    def explain_query(self, query):
+        """Query plans Salesforce would consider for query, from the REST query explain resource"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful('query', params={'explain': query})
+
+    def _cached_entry(self, object_name):
+        """(cache key, entry) of an object's describe, matched case-insensitively and regardless of age"""
+        entry = self.describe_cache.get(object_name)
+        if entry is not None:
+            return object_name, entry
+        lowered = object_name.lower()
+        name = next((name for name in self.describe_cache.names() if name.lower() == lowered), None)
+        entry = self.describe_cache.get(name) if name else None
+        return (name, entry) if entry is not None else (None, None)
+
+    def cached_fields(self, object_name):
+        """Cached describe fields of an object, matched case-insensitively and regardless of age, or None"""
+        _, entry = self._cached_entry(object_name)
+        return entry.value if entry is not None else None
+
+    def _fresh_cached_fields(self, object_name):
+        """Cached describe fields of an object if they are within their TTL, or None"""
+        _, entry = self._cached_entry(object_name)
+        return entry.value if entry is not None and self.describe_cache.is_fresh(entry) else None
+
+    async def check_query(self, query):
+        """Raise SoqlValidationError if query references objects or fields the org does not have
+
+        Fields are checked against cached describes only; objects that are not cached are checked
+        against the global describe, loaded once. Before a query is rejected, the expired describes it
+        was checked against are revalidated, and any that cannot be are left unchecked. Queries the
+        parser does not understand pass unchecked.
+        """
+        try:
+            parsed = parse_soql(query)
+        except SoqlParseError as e:
+            logger.debug(f"Skipping SOQL pre-flight check: {e}")
+            return
+        if self._object_names is None and any(self.cached_fields(name) is None for name in parsed.object_names()):
+            try:
+                await self.run_shared(("global_describe",), self.key_prefixes)
+            except Exception as e:
+                logger.debug(f"Global describe unavailable for the SOQL pre-flight check: {e}")
+        problems = validate_query(parsed, self.cached_fields, self._object_names)
+        if problems:
+            # A describe loaded from the snapshot or past its TTL may predate fields added since
+            stale = {name for name, entry in map(self._cached_entry, parsed.object_names())
+                     if entry is not None and not self.describe_cache.is_fresh(entry)}
+            if stale:
+                results = await asyncio.gather(*(self.object_fields(name) for name in stale), return_exceptions=True)
+                for name, result in zip(stale, results):
+                    if isinstance(result, Exception):
+                        logger.debug(f"Could not revalidate the {name} describe for the SOQL pre-flight check: {result}")
+                problems = validate_query(parsed, self._fresh_cached_fields, self._object_names)
+        if problems:
+            raise SoqlValidationError(problems)
+
+    def get_record(self, object_name, record_id):
+        """Retrieve a single record by ID"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return getattr(self.sf, object_name).get(record_id)
+
+    def get_deleted(self, object_name, start, end):
+        """IDs and deletion dates of records deleted between two aware datetimes, from the getDeleted resource"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        params = {'start': start.isoformat(timespec='seconds'), 'end': end.isoformat(timespec='seconds')}
+        return self.sf.restful(f'sobjects/{object_name}/deleted/', params=params)
+
+    def key_prefixes(self) -> Dict[str, str]:
+        """Object name by record ID prefix (e.g. '001' -> 'Account'), from the global describe, fetched once"""
+        if self._key_prefixes is None:
+            if not self.sf:
+                raise ValueError("Salesforce connection not established.")
+            sobjects = self.sf.describe()['sobjects']
+            self._object_names = [sobject['name'] for sobject in sobjects]
+            self._key_prefixes = {sobject['keyPrefix']: sobject['name'] for sobject in sobjects if sobject.get('keyPrefix')}
+        return self._key_prefixes
+
+    def retrieve_records(self, object_name, record_ids, fields):
+        """Fetch up to 200 records of one object with an sObject Collections request
+
+        The result is aligned with record_ids, with None for IDs that do not exist or are not visible.
+        """
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful(f'composite/sobjects/{object_name}', method='POST',
+                               json={"ids": record_ids, "fields": fields})
+
+    async def get_records(self, record_ids, fields, object_name=None):
+        """Fetch records by ID, grouped by object into Collections requests of 200 sent concurrently
+
+        Without object_name each ID's object is resolved from its key prefix. fields is either a list
+        used for every object or a dict of field lists by object. Returns a (record by ID, error
+        message by ID) tuple; a failed request only fails the IDs it carried.
+        """
+        ids_by_object, errors = {}, {}
+        prefixes = None if object_name else await self.run(self.key_prefixes)
+        for record_id in dict.fromkeys(record_ids):
+            name = object_name or prefixes.get(record_id[:3])
+            if name is None:
+                errors[record_id] = f"No object found for ID prefix '{record_id[:3]}'"
+            else:
+                ids_by_object.setdefault(name, []).append(record_id)
+
+        chunks = []
+        for name, ids in ids_by_object.items():
+            object_fields = fields.get(name) if isinstance(fields, dict) else fields
+            if not object_fields:
+                errors.update((record_id, f"No fields requested for {name}") for record_id in ids)
+                continue
+            for i in range(0, len(ids), COLLECTION_READ_LIMIT):
+                chunks.append((name, ids[i:i + COLLECTION_READ_LIMIT], object_fields))
+
+        results = await asyncio.gather(
+            *(self.run(self.retrieve_records, name, ids, object_fields) for name, ids, object_fields in chunks),
+            return_exceptions=True
+        )
+        records = {}
+        for (name, ids, _), result in zip(chunks, results):
+            if isinstance(result, Exception):
+                for record_id in ids:
+                    errors[record_id] = str(result)
+                continue
+            for record_id, record in zip(ids, result):
+                if record is None:
+                    errors[record_id] = f"{name} record not found or not accessible"
+                else:
+                    records[record_id] = record
+        return records, errors
+
+    def create_bulk_query_job(self, query):
+        """Submit a Bulk API 2.0 query job"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful('jobs/query', method='POST', json={"operation": "query", "query": query})
+
+    def get_bulk_query_job(self, job_id):
+        """Current state of a Bulk API 2.0 query job"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful(f'jobs/query/{job_id}')
+
+    def abort_bulk_query_job(self, job_id):
+        """Abort a Bulk API 2.0 query job that has not completed"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful(f'jobs/query/{job_id}', method='PATCH', json={"state": "Aborted"})
+
+    def read_bulk_query_results(self, job_id, consume, locator=None, max_records=None):
+        """Stream one CSV page of a completed query job into consume(rows) without buffering it
+
+        Returns the locator of the next page, or None after the last page.
+        """
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        params = {}
+        if locator:
+            params['locator'] = locator
+        if max_records:
+            params['maxRecords'] = max_records
+        url = f"{self.sf.base_url}jobs/query/{job_id}/results"
+        response = self.sf._call_salesforce('GET', url, name=job_id, params=params, headers={'Accept': 'text/csv'},
+                                            stream=True)
+        with response:
+            response.encoding = 'utf-8'
+            consume(csv.reader(iter_csv_lines(response.iter_content(BULK_RESULT_CHUNK_SIZE, decode_unicode=True))))
+        next_locator = response.headers.get('Sforce-Locator')
+        return None if next_locator in (None, '', 'null') else next_locator
+
+    def write_collection(self, object_name, records, external_id_field=None, all_or_none=False):
+        """Update up to 200 records of one object, or upsert them by external_id_field, with an sObject
+        Collections request
+
+        Returns one {id, success, errors} result per record, in order; upserts also report 'created'.
+        """
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        body = {"allOrNone": all_or_none, "records": [{"attributes": {"type": object_name}, **record} for record in records]}
+        path = f'composite/sobjects/{object_name}/{external_id_field}' if external_id_field else 'composite/sobjects'
+        return self.sf.restful(path, method='PATCH', json=body)
+
+    def create_ingest_job(self, object_name, operation, external_id_field=None):
+        """Open a Bulk API 2.0 ingest job that takes LF-terminated CSV"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        body = {"object": object_name, "operation": operation, "contentType": "CSV", "lineEnding": "LF"}
+        if external_id_field:
+            body["externalIdFieldName"] = external_id_field
+        return self.sf.restful('jobs/ingest', method='POST', json=body)
+
+    def upload_ingest_data(self, job_id, data):
+        """Upload the CSV data of an open ingest job"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        url = f"{self.sf.base_url}jobs/ingest/{job_id}/batches"
+        self.sf._call_salesforce('PUT', url, name=job_id, data=data, headers={'Content-Type': 'text/csv'})
+
+    def set_ingest_job_state(self, job_id, state):
+        """Close an ingest job with 'UploadComplete' so Salesforce processes it, or abort it with 'Aborted'"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful(f'jobs/ingest/{job_id}', method='PATCH', json={"state": state})
+
+    def get_ingest_job(self, job_id):
+        """Current state and record counts of a Bulk API 2.0 ingest job"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        return self.sf.restful(f'jobs/ingest/{job_id}')
+
+    def read_ingest_results(self, job_id, kind, consume):
+        """Stream the 'failedResults' or 'successfulResults' CSV of a completed ingest job into consume(rows)"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+
+        url = f"{self.sf.base_url}jobs/ingest/{job_id}/{kind}/"
+        response = self.sf._call_salesforce('GET', url, name=job_id, headers={'Accept': 'text/csv'}, stream=True)
+        with response:
+            response.encoding = 'utf-8'
+            consume(csv.reader(iter_csv_lines(response.iter_content(BULK_RESULT_CHUNK_SIZE, decode_unicode=True))))
+
+    def fetch_limits(self):
+        """The org's /limits resource"""
+        if not self.sf:
+            raise ValueError("Salesforce connection not established.")
+        return self.sf.limits()
+
+    async def _refresh_limits(self):
+        try:
+            self.rate_limiter.observe_limits(await self.executor.run(self._with_session, self.fetch_limits))
+        except Exception as e:
+            logger.warning(f"Could not read API limits for org '{self.alias}': {e}")
+
+    def _observe_api_usage(self):
+        usage = getattr(self.session.get_adapter("https://"), "api_usage", None)
+        if usage is not None:
+            self.rate_limiter.observe_usage(*usage)
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking Salesforce call on the client's bounded executor once the rate limiter admits it
+
+        Raises RateLimitExceeded, with a retry-after hint, when the call is not admitted.
+        """
+        with TRACER.span(f"salesforce.{func.__name__}", {"salesforce.org": self.alias}):
+            # Scheduled ahead of admission, so that an org rejected for its quota still learns when usage drops.
+            # Runs in a fresh context so its calls are not traced as part of this one.
+            if self.sf is not None and self.rate_limiter.limits_due():
+                self._limits_task = asyncio.create_task(self._refresh_limits(), context=contextvars.Context())
+            with TRACER.span("rate_limit.wait"):
+                await self.rate_limiter.acquire(current_session.get(), tool_priority(current_tool.get()))
+            try:
+                return await self.executor.run(self._with_session, func, *args, **kwargs)
+            finally:
+                self._observe_api_usage()
+
+    async def run_shared(self, key, func, *args, **kwargs):
+        """Like run(), but concurrent calls with the same key share one upstream call and its outcome"""
+        return await self.inflight.run(key, lambda: self.run(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection state and login counters"""
+        return {
+            "connected": self.sf is not None,
+            "logins": self.logins,
+            "session_refreshes": self.session_refreshes,
+        }
@@ -0,0 +1,62 @@
+"""
+Request coalescing for Salesforce calls
+Concurrent identical requests share one upstream call and its result or error (single-flight)
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving while it runs await the same outcome
+
+    The call runs as its own task, so a caller that is cancelled does not cancel it for the others.
+    Nothing is kept once the call finishes; caching results is left to the caches.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._loop = None
+        self.calls = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def in_flight(self, key: Hashable) -> bool:
+        task = self._inflight.get(key)
+        return task is not None and task.get_loop() is self._loop
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call(), or the call already running under key"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Tasks are bound to one loop; start afresh when a new loop takes over
+            self._loop = loop
+            self._inflight = {}
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = loop.create_task(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as unhandled when every caller has gone
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream calls made versus calls that joined one already in flight"""
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "coalesced_ratio": round(self.coalesced / requests, 4) if requests else 0.0,
+        }
@@ -0,0 +1,108 @@
+"""
+Bounded executor for blocking Salesforce calls
+Keeps simple_salesforce's synchronous HTTP calls off the event loop
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+def max_concurrency_from_env(default: int = DEFAULT_MAX_CONCURRENCY) -> int:
+    """Read the per-org concurrency limit from SALESFORCE_MAX_CONCURRENCY"""
+    value = os.getenv('SALESFORCE_MAX_CONCURRENCY')
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid SALESFORCE_MAX_CONCURRENCY={value!r}, using {default}")
+        return default
+
+
+class BoundedExecutor:
+    """Runs blocking callables in a thread pool with a bounded number of in-flight calls
+
+    Calls beyond the concurrency limit wait on an asyncio semaphore rather than in the
+    thread pool's internal queue, so the number of waiting callers can be reported.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, name: str = "salesforce"):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"{name}-io")
+        self._semaphore = None
+        self._loop = None
+        self.waiting = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_waiting = 0
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run func(*args, **kwargs) in the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # asyncio primitives are bound to one loop; start afresh when a new loop takes over
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        semaphore = self._semaphore
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            with TRACER.span("executor.queue", child_only=True):
+                await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        finished = []
+
+        def call_and_mark():
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finished.append(time.time_ns())
+
+        try:
+            # Copy the caller's context so context variables are visible in the worker thread
+            context = contextvars.copy_context()
+            result = await loop.run_in_executor(self._pool, functools.partial(context.run, call_and_mark))
+            self.completed += 1
+            return result
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            if finished:
+                # Time between the worker finishing and the event loop resuming the caller
+                TRACER.record("event_loop.resume", finished[0], time.time_ns())
+            self.active -= 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of executor queue depth and throughput counters"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,254 @@
+"""
+Prometheus metrics for the MCP server
+In-process counters, gauges and histograms rendered in the Prometheus text exposition format
+"""
+
+from contextvars import ContextVar
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import functools
+import re
+import threading
+import time
+
+from .tracing import TRACER
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a describe cache hit up to a long multi-page query
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+# Name of the MCP tool whose call is being handled, set by instrument
+current_tool: ContextVar[Optional[str]] = ContextVar("mcp_tool", default=None)
+
+
+def package_version() -> str:
+    """Installed version of the mcp-salesforce-connector distribution"""
+    try:
+        return version("mcp-salesforce-connector")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for a metric family with a fixed set of label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, dict(state, buckets=list(state["buckets"]))) for key, state in self._values.items())
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, state in items:
+            cumulative = 0
+            for bound, observed in zip(self.buckets, state["buckets"]):
+                cumulative += observed
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> List[str]:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return lines
+
+
+def render_stats(component: str, stats_by_org: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Render the numeric entries of per-org stats() dicts as gauges named salesforce_<component>_<key>
+
+    Booleans are exported as 0/1; strings and missing values are skipped.
+    """
+    series: Dict[str, List[Tuple[str, float]]] = {}
+    for org, stats in stats_by_org.items():
+        for key, value in stats.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                series.setdefault(key, []).append((org, value))
+
+    lines = []
+    for key, values in series.items():
+        name = _INVALID_NAME_CHARS.sub('_', f"salesforce_{component}_{key}")
+        lines.append(f"# HELP {name} {component.replace('_', ' ').capitalize()} {key.replace('_', ' ')}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f'{name}{{org="{_escape(org)}"}} {_format_value(value)}' for org, value in values)
+    return lines
+
+
+def exposition(sections: Iterable[List[str]]) -> str:
+    """Join rendered metric families into a text exposition document"""
+    return "\n".join(line for section in sections for line in section) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+TOOL_CALLS = REGISTRY.counter("mcp_tool_calls_total", "MCP tool calls", ("tool",))
+TOOL_ERRORS = REGISTRY.counter("mcp_tool_errors_total", "MCP tool calls that raised an error", ("tool",))
+TOOL_LATENCY = REGISTRY.histogram("mcp_tool_duration_seconds", "MCP tool call latency in seconds", ("tool",))
+TOOL_RESPONSE_BYTES = REGISTRY.counter("mcp_tool_response_bytes_total", "Bytes of content returned by MCP tools",
+                                       ("tool",))
+SSE_SESSIONS = REGISTRY.gauge("mcp_sse_sessions_active", "Open SSE sessions")
+SSE_SESSIONS.set(0)
+
+
+def content_size(content: Iterable[Any]) -> int:
+    """UTF-8 bytes of the text in a tool result's content, which FastMCP has already serialized"""
+    return sum(len(item.text.encode()) for item in content if getattr(item, "type", None) == "text")
+
+
+def instrument(func):
+    """Record call count, errors and latency for an async MCP tool
+
+    The call is traced as a tool.<name> span. The tool name is available to the code it calls through
+    current_tool.
+
+    Apply beneath @mcp.tool() so FastMCP registers the wrapper; functools.wraps keeps the
+    original signature, which FastMCP uses to build the tool schema and inject the Context.
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        token = current_tool.set(tool)
+        try:
+            with TRACER.span(f"tool.{tool}"):
+                result = await func(*args, **kwargs)
+        except Exception:
+            TOOL_ERRORS.inc(tool=tool)
+            raise
+        finally:
+            current_tool.reset(token)
+            TOOL_CALLS.inc(tool=tool)
+            TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool)
+        return result
+
+    return wrapper
@@ -0,0 +1,659 @@
+"""
+Local mock of the Salesforce REST API for benchmarks and offline tests
+Serves SOAP login, limits, describe, SOQL query with nextRecordsUrl pagination, sObject get, getDeleted,
+Composite, sObject Collections retrieve, update and upsert, and Bulk API 2.0 query and ingest jobs over
+plain HTTP with configurable latency
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+import asyncio
+import copy
+import csv
+import io
+import re
+import socket
+import threading
+import time
+
+import requests
+import uvicorn
+from simple_salesforce import Salesforce
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from .client import DEFAULT_ORG, OrgConfig
+from .transport import PooledAdapter, TransportConfig
+
+API_VERSION = "59.0"
+DAILY_API_LIMIT = 15000
+
+# Record ID prefixes of the standard objects the mock knows about
+KEY_PREFIXES = {"Account": "001", "Contact": "003", "User": "005", "Opportunity": "006", "Lead": "00Q", "Case": "500"}
+
+_SELECT = re.compile(r'^\s*SELECT\s+(.+?)\s+FROM\s+(\w+)', re.IGNORECASE | re.DOTALL)
+_LIMIT = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+_MODSTAMP_SINCE = re.compile(r'\bSystemModstamp\s*>=\s*(\S+)', re.IGNORECASE)
+_ORDER_BY_MODSTAMP = re.compile(r'\bORDER\s+BY\s+SystemModstamp\b', re.IGNORECASE)
+_SOAP_USERNAME = re.compile(r'<(?:\w+:)?username>(.*?)</(?:\w+:)?username>', re.DOTALL)
+_SOAP_PASSWORD = re.compile(r'<(?:\w+:)?password>(.*?)</(?:\w+:)?password>', re.DOTALL)
+
+LOGIN_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns="urn:partner.soap.sforce.com">
+<soapenv:Body><loginResponse><result>
+<serverUrl>{instance_url}/services/Soap/u/{version}/00Dmock</serverUrl>
+<sessionId>{session_id}</sessionId>
+</result></loginResponse></soapenv:Body></soapenv:Envelope>"""
+
+LOGIN_FAULT = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:sf="urn:fault.partner.soap.sforce.com">
+<soapenv:Body><soapenv:Fault><faultcode>sf:INVALID_LOGIN</faultcode>
+<detail><sf:LoginFault><sf:exceptionCode>INVALID_LOGIN</sf:exceptionCode>
+<sf:exceptionMessage>Invalid username, password, security token; or user locked out.</sf:exceptionMessage>
+</sf:LoginFault></detail></soapenv:Fault></soapenv:Body></soapenv:Envelope>"""
+
+MOCK_INSTANCE_URL = "https://mock.my.salesforce.com"
+
+
+def salesforce_datetime(value: Optional[datetime] = None) -> str:
+    """Timestamp in the format Salesforce returns, e.g. '2024-05-01T12:00:00.000+0000'; now by default"""
+    value = (value or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}+0000"
+
+
+def generate_describe(object_name: str, field_count: int = 50, picklist_values: int = 5) -> Dict[str, Any]:
+    """Build a describe payload shaped like the REST API's, with deterministic fields"""
+    fields = [
+        {"label": "Record ID", "name": "Id", "updateable": False, "type": "id", "length": 18, "picklistValues": []},
+        {"label": "Name", "name": "Name", "updateable": True, "type": "string", "length": 255, "picklistValues": []},
+        {"label": "System Modstamp", "name": "SystemModstamp", "updateable": False, "type": "datetime", "length": 0,
+         "picklistValues": []},
+    ]
+    for i in range(max(0, field_count - len(fields))):
+        is_picklist = i % 5 == 0
+        fields.append({
+            "label": f"Custom Field {i}",
+            "name": f"Custom_Field_{i}__c",
+            "updateable": True,
+            "type": "picklist" if is_picklist else "string",
+            "length": 255,
+            "picklistValues": [
+                {"active": True, "defaultValue": False, "label": f"Option {j}", "validFor": None, "value": f"option_{j}"}
+                for j in range(picklist_values)
+            ] if is_picklist else [],
+        })
+    return {"name": object_name, "label": object_name, "custom": object_name.endswith("__c"), "fields": fields}
+
+
+def generate_records(object_name: str, count: int, field_count: int = 10, value_size: int = 20) -> List[Dict[str, Any]]:
+    """Deterministic records with an Id, a Name and field_count custom text fields of value_size characters"""
+    prefix = KEY_PREFIXES.get(object_name, "a00")
+    records = []
+    for i in range(count):
+        record = {"Id": f"{prefix}{i:015d}", "Name": f"{object_name} {i}"}
+        for j in range(field_count):
+            record[f"Custom_Field_{j}__c"] = f"{i}-{j}-".ljust(value_size, "x")
+        records.append(record)
+    return records
+
+
+class MockSalesforce:
+    """In-process mock Salesforce org
+
+    Args:
+        latency: Seconds added to every request, to simulate network round trips
+        field_count: Number of fields in each generated describe result
+        login_latency: Extra seconds a SOAP login takes
+        query_page_size: Records per SOQL query page when no batchSize is requested
+
+    Records added with add_records are what queries, sObject gets and retrieves against that
+    object return; a SystemModstamp >= filter and ORDER BY SystemModstamp are honoured, other
+    filters are ignored. delete_records moves records to what getDeleted reports. Collections and ingest
+    job updates and upserts change these records and stamp SystemModstamp; updates of unknown IDs fail.
+    Set credentials to a username -> password mapping to reject other logins.
+    Daily API usage reported in Sforce-Limit-Info and /limits is api_requests_before plus the
+    requests served, out of daily_api_limit.
+    """
+
+    def __init__(self, latency: float = 0.0, field_count: int = 50, login_latency: float = 0.0,
+                 query_page_size: int = 2000):
+        self.latency = latency
+        self.field_count = field_count
+        self.login_latency = login_latency
+        self.query_page_size = query_page_size
+        self.credentials: Optional[Dict[str, str]] = None
+        self.daily_api_limit = DAILY_API_LIMIT
+        self.api_requests_before = 0
+        self.request_count = 0
+        self.logins = 0
+        self._failures = []
+        self._query_cursors: Dict[str, List[Dict[str, Any]]] = {}
+        self.records: Dict[str, List[Dict[str, Any]]] = {}
+        self.deleted: Dict[str, List[Dict[str, Any]]] = {}
+        self.bulk_jobs: Dict[str, Dict[str, Any]] = {}
+        self.ingest_jobs: Dict[str, Dict[str, Any]] = {}
+        # Number of status polls a bulk job reports InProgress before it completes
+        self.bulk_polls = 1
+        self.base_url: Optional[str] = None
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = Starlette(routes=[
+            Route("/services/Soap/u/{version}", self.handle_login, methods=["POST"]),
+            Route("/services/data/v{version}/limits", self.handle_limits),
+            Route("/services/data/v{version}/sobjects", self.handle_global_describe),
+            Route("/services/data/v{version}/sobjects/{name}/describe", self.handle_describe),
+            Route("/services/data/v{version}/sobjects/{name}/deleted/", self.handle_deleted),
+            Route("/services/data/v{version}/sobjects/{name}/{record_id}", self.handle_record),
+            Route("/services/data/v{version}/query", self.handle_query),
+            Route("/services/data/v{version}/query/{locator}", self.handle_query_more),
+            Route("/services/data/v{version}/composite", self.handle_composite, methods=["POST"]),
+            Route("/services/data/v{version}/composite/batch", self.handle_composite_batch, methods=["POST"]),
+            Route("/services/data/v{version}/composite/sobjects", self.handle_collection_write, methods=["PATCH"]),
+            Route("/services/data/v{version}/composite/sobjects/{name}", self.handle_collection_retrieve,
+                  methods=["POST"]),
+            Route("/services/data/v{version}/composite/sobjects/{name}/{field}", self.handle_collection_write,
+                  methods=["PATCH"]),
+            Route("/services/data/v{version}/jobs/query", self.handle_bulk_create, methods=["POST"]),
+            Route("/services/data/v{version}/jobs/query/{job_id}", self.handle_bulk_job, methods=["GET", "PATCH"]),
+            Route("/services/data/v{version}/jobs/query/{job_id}/results", self.handle_bulk_results),
+            Route("/services/data/v{version}/jobs/ingest", self.handle_ingest_create, methods=["POST"]),
+            Route("/services/data/v{version}/jobs/ingest/{job_id}", self.handle_ingest_job, methods=["GET", "PATCH"]),
+            Route("/services/data/v{version}/jobs/ingest/{job_id}/batches", self.handle_ingest_upload, methods=["PUT"]),
+            Route("/services/data/v{version}/jobs/ingest/{job_id}/{kind}/", self.handle_ingest_results),
+        ])
+
+    def add_records(self, object_name: str, records: List[Dict[str, Any]]):
+        """Make queries against object_name return these records"""
+        self.records.setdefault(object_name, []).extend(records)
+
+    def delete_records(self, object_name: str, record_ids: List[str], deleted_date: Optional[datetime] = None):
+        """Remove records so getDeleted reports them as deleted at deleted_date (now by default)"""
+        ids = set(record_ids)
+        self.records[object_name] = [record for record in self.records.get(object_name, []) if record["Id"] not in ids]
+        self.deleted.setdefault(object_name, []).extend(
+            {"id": record_id, "deletedDate": salesforce_datetime(deleted_date)} for record_id in record_ids)
+
+    def write_record(self, object_name: str, values: Dict[str, Any], external_id_field: Optional[str] = None):
+        """Update the record with values' Id, or upsert by external_id_field; returns a Collections result"""
+        records = self.records.setdefault(object_name, [])
+        key_field = external_id_field or "Id"
+        matches = [record for record in records if record.get(key_field) == values.get(key_field)]
+        if len(matches) > 1:
+            return {"id": None, "success": False, "errors": [
+                {"statusCode": "DUPLICATE_EXTERNAL_ID", "message": f"{key_field}: more than one record found", "fields": []}]}
+        if not matches and (external_id_field is None or key_field == "Id"):
+            return {"id": values.get("Id"), "success": False, "errors": [
+                {"statusCode": "INVALID_CROSS_REFERENCE_KEY", "message": "invalid cross reference id", "fields": []}]}
+        changes = {name: value for name, value in values.items() if name != "attributes"}
+        changes["SystemModstamp"] = salesforce_datetime()
+        if matches:
+            matches[0].update(changes)
+            return {"id": matches[0]["Id"], "success": True, "errors": [], "created": False}
+        record_id = f"{KEY_PREFIXES.get(object_name, 'a00')}{len(records) + 10 ** 9:015d}"
+        records.append({"Id": record_id, **changes})
+        return {"id": record_id, "success": True, "errors": [], "created": True}
+
+    def run_query(self, query: str):
+        """Selected field names and matching rows for a SELECT ... FROM ... [LIMIT n] query"""
+        match = _SELECT.match(query)
+        if not match:
+            raise ValueError(f"Unsupported query: {query}")
+        fields = [field.strip() for field in match.group(1).split(",")]
+        records = self.records.get(match.group(2), [])
+        since = _MODSTAMP_SINCE.search(query)
+        if since:
+            start = datetime.fromisoformat(since.group(1))
+            records = [r for r in records if r.get("SystemModstamp") and datetime.fromisoformat(r["SystemModstamp"]) >= start]
+        if _ORDER_BY_MODSTAMP.search(query):
+            records = sorted(records, key=lambda r: (datetime.fromisoformat(r["SystemModstamp"]), r["Id"]))
+        limit = _LIMIT.search(query)
+        if limit:
+            records = records[:int(limit.group(1))]
+        return fields, [[record.get(field) for field in fields] for record in records]
+
+    def explain(self, query: str) -> Dict[str, Any]:
+        """Query plan: an index lookup when filtering on Id, otherwise a table scan costed by object size"""
+        match = _SELECT.match(query)
+        object_name = match.group(2) if match else ""
+        cardinality = len(self.records.get(object_name, []))
+        if re.search(r'\bWHERE\s+Id\s*(=|IN\b)', query, re.IGNORECASE):
+            plan = {"leadingOperationType": "Index", "relativeCost": 0.0, "cardinality": 1, "fields": ["Id"]}
+        else:
+            plan = {"leadingOperationType": "TableScan", "relativeCost": 0.5 + cardinality / 1000,
+                    "cardinality": cardinality, "fields": []}
+        return {"plans": [{**plan, "notes": [], "sobjectCardinality": cardinality, "sobjectType": object_name}]}
+
+    @staticmethod
+    def _with_attributes(object_name: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        attributes = {"type": object_name, "url": f"/services/data/v{API_VERSION}/sobjects/{object_name}/{record.get('Id')}"}
+        return {"attributes": attributes, **record}
+
+    def _query_page(self, records: List[Dict[str, Any]], offset: int, page_size: int, cursor: str) -> Dict[str, Any]:
+        page = records[offset:offset + page_size]
+        result = {"totalSize": len(records), "done": offset + len(page) >= len(records), "records": page}
+        if not result["done"]:
+            result["nextRecordsUrl"] = f"/services/data/v{API_VERSION}/query/{cursor}-{offset + len(page)}"
+        return result
+
+    def _start_query(self, query: str, page_size: int):
+        """Status code and first result page of a SOQL query"""
+        try:
+            fields, rows = self.run_query(query)
+        except ValueError as e:
+            return 400, [{"errorCode": "MALFORMED_QUERY", "message": str(e)}]
+        object_name = _SELECT.match(query).group(2)
+        records = [self._with_attributes(object_name, dict(zip(fields, row))) for row in rows]
+        cursor = f"01gMOCK{len(self._query_cursors):08d}"
+        self._query_cursors[cursor] = records
+        return 200, self._query_page(records, 0, page_size, cursor)
+
+    def _get_record(self, object_name: str, record_id: str):
+        """Status code and body of an sObject get"""
+        for record in self.records.get(object_name, []):
+            if record.get("Id") == record_id:
+                return 200, self._with_attributes(object_name, record)
+        return 404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}]
+
+    def _get_resource(self, url: str):
+        """Status code and body for a GET subrequest of a Composite request"""
+        parts = urlsplit(url)
+        path = parts.path.strip("/").split("/")
+        if path[:2] == ["services", "data"]:
+            path = path[2:]
+        path = path[1:]  # API version
+        if len(path) == 3 and path[0] == "sobjects" and path[2] == "describe":
+            return 200, generate_describe(path[1], self.field_count)
+        if len(path) == 3 and path[0] == "sobjects":
+            return self._get_record(path[1], path[2])
+        if path == ["query"]:
+            query = parse_qs(parts.query).get("q", [""])[0]
+            return self._start_query(query, self.query_page_size)
+        return 404, [{"errorCode": "NOT_FOUND", "message": "The requested resource does not exist"}]
+
+    @property
+    def api_requests_used(self) -> int:
+        return self.api_requests_before + self.request_count
+
+    def fail_next(self, count: int = 1, status: int = 503, error_code: str = "SERVER_UNAVAILABLE"):
+        """Answer the next count requests with an error response, e.g. 403 REQUEST_LIMIT_EXCEEDED"""
+        self._failures.extend([(status, error_code)] * count)
+
+    async def _begin(self) -> Optional[JSONResponse]:
+        """Count the request, apply latency and return an injected failure if one is queued"""
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._failures:
+            status, error_code = self._failures.pop(0)
+            return self._json([{"errorCode": error_code, "message": f"Injected {error_code}"}], status)
+        return None
+
+    def _json(self, content: Any, status_code: int = 200) -> JSONResponse:
+        """JSON response carrying the Sforce-Limit-Info header real orgs send"""
+        headers = {"Sforce-Limit-Info": f"api-usage={self.api_requests_used}/{self.daily_api_limit}"}
+        return JSONResponse(content, status_code=status_code, headers=headers)
+
+    async def handle_login(self, request: Request) -> Response:
+        self.request_count += 1
+        await asyncio.sleep(self.latency + self.login_latency)
+        body = (await request.body()).decode()
+        username = _SOAP_USERNAME.search(body)
+        password = _SOAP_PASSWORD.search(body)
+        if self.credentials is not None and (
+                not username or not password or self.credentials.get(username.group(1)) != password.group(1)):
+            return Response(LOGIN_FAULT, status_code=500, media_type="text/xml")
+        self.logins += 1
+        session_id = f"00Dmock!session{self.logins}"
+        return Response(LOGIN_RESPONSE.format(instance_url=MOCK_INSTANCE_URL, version=API_VERSION,
+                                              session_id=session_id), media_type="text/xml")
+
+    async def handle_limits(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        return self._json({"DailyApiRequests": {
+            "Max": self.daily_api_limit, "Remaining": max(0, self.daily_api_limit - self.api_requests_used),
+        }})
+
+    async def handle_global_describe(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        return self._json({"sobjects": [{"name": name, "keyPrefix": prefix} for name, prefix in KEY_PREFIXES.items()]})
+
+    async def handle_describe(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        return self._json(generate_describe(request.path_params["name"], self.field_count))
+
+    async def handle_deleted(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        try:
+            start = datetime.fromisoformat(request.query_params["start"])
+            end = datetime.fromisoformat(request.query_params["end"])
+        except (KeyError, ValueError):
+            return self._json([{"errorCode": "MISSING_ARGUMENT", "message": "start and end are required"}], 400)
+        # Like Salesforce, the window is covered to whole minutes
+        covered = end.replace(second=0, microsecond=0)
+        earliest = datetime.now(timezone.utc) - timedelta(days=30)
+        if start < earliest or covered <= start.replace(second=0, microsecond=0):
+            return self._json([{"errorCode": "INVALID_REPLICATION_DATE", "message": "invalid start or end date"}], 400)
+        deleted = [record for record in self.deleted.get(request.path_params["name"], [])
+                   if start <= datetime.fromisoformat(record["deletedDate"]) < covered]
+        return self._json({"deletedRecords": deleted, "earliestDateAvailable": salesforce_datetime(earliest),
+                           "latestDateCovered": salesforce_datetime(covered)})
+
+    async def handle_record(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        status, body = self._get_record(request.path_params["name"], request.path_params["record_id"])
+        return self._json(body, status)
+
+    async def handle_query(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        if "explain" in request.query_params:
+            return self._json(self.explain(request.query_params["explain"]))
+        options = request.headers.get("sforce-query-options", "")
+        page_size = int(options.split("=", 1)[1]) if options.startswith("batchSize=") else self.query_page_size
+        status, body = self._start_query(request.query_params.get("q", ""), page_size)
+        return self._json(body, status)
+
+    async def handle_query_more(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        cursor, _, offset = request.path_params["locator"].rpartition("-")
+        records = self._query_cursors.get(cursor)
+        if records is None or not offset.isdigit():
+            return self._json([{"errorCode": "INVALID_QUERY_LOCATOR", "message": "invalid query locator"}], 400)
+        options = request.headers.get("sforce-query-options", "")
+        page_size = int(options.split("=", 1)[1]) if options.startswith("batchSize=") else self.query_page_size
+        return self._json(self._query_page(records, int(offset), page_size, cursor))
+
+    async def handle_composite(self, request: Request) -> JSONResponse:
+        """Composite requests made of independent GET subrequests"""
+        failure = await self._begin()
+        if failure:
+            return failure
+        body = await request.json()
+        responses = []
+        for sub in body.get("compositeRequest", []):
+            if sub.get("method", "GET") == "GET":
+                status, result = self._get_resource(sub["url"])
+            else:
+                status, result = 405, [{"errorCode": "METHOD_NOT_ALLOWED", "message": "Only GET is mocked"}]
+            responses.append({"body": result, "httpHeaders": {}, "httpStatusCode": status,
+                              "referenceId": sub.get("referenceId")})
+        return self._json({"compositeResponse": responses})
+
+    async def handle_composite_batch(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        body = await request.json()
+        results = []
+        for sub in body.get("batchRequests", []):
+            if sub.get("method", "GET") == "GET":
+                status, result = self._get_resource(sub["url"])
+            else:
+                status, result = 405, [{"errorCode": "METHOD_NOT_ALLOWED", "message": "Only GET is mocked"}]
+            results.append({"statusCode": status, "result": result})
+        has_errors = any(r["statusCode"] >= 400 for r in results)
+        return self._json({"hasErrors": has_errors, "results": results})
+
+    async def handle_collection_retrieve(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        name = request.path_params["name"]
+        body = await request.json()
+        if len(body["ids"]) > 2000:
+            return self._json([{"errorCode": "EXCEEDED_ID_LIMIT", "message": "Too many ids"}], 400)
+        by_id = {record["Id"]: record for record in self.records.get(name, [])}
+        known_fields = set().union(*by_id.values()) if by_id else {"Id"}
+        unknown = [field for field in body["fields"] if field not in known_fields]
+        if unknown:
+            return self._json([{"errorCode": "INVALID_FIELD", "message": f"No such column '{unknown[0]}' on {name}"}], 400)
+        results = []
+        for record_id in body["ids"]:
+            record = by_id.get(record_id)
+            if record is None:
+                results.append(None)
+            else:
+                attributes = {"type": name, "url": f"/services/data/v{API_VERSION}/sobjects/{name}/{record_id}"}
+                results.append({"attributes": attributes, **{field: record.get(field) for field in body["fields"]}})
+        return self._json(results)
+
+    async def handle_collection_write(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        body = await request.json()
+        if len(body["records"]) > 200:
+            return self._json([{"errorCode": "EXCEEDED_ID_LIMIT", "message": "Too many records"}], 400)
+        external_id_field = request.path_params.get("field")
+        snapshot = copy.deepcopy(self.records)
+        results = [self.write_record(request.path_params.get("name") or record["attributes"]["type"], record,
+                                     external_id_field) for record in body["records"]]
+        if body.get("allOrNone") and not all(result["success"] for result in results):
+            self.records = snapshot
+            rolled_back = {"statusCode": "ALL_OR_NONE_OPERATION_ROLLED_BACK",
+                           "message": "Record rolled back because not all records were valid", "fields": []}
+            results = [result if not result["success"] else {"id": None, "success": False, "errors": [rolled_back]}
+                       for result in results]
+        if external_id_field is None:
+            for result in results:
+                result.pop("created", None)
+        return self._json(results)
+
+    async def handle_ingest_create(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        body = await request.json()
+        job_id = f"750mockI{len(self.ingest_jobs):010d}"
+        self.ingest_jobs[job_id] = {"id": job_id, "object": body["object"], "operation": body["operation"],
+                                    "externalIdFieldName": body.get("externalIdFieldName"), "state": "Open",
+                                    "polls": 0, "data": "", "successful": [], "failed": []}
+        return self._json({"id": job_id, "object": body["object"], "operation": body["operation"], "state": "Open"})
+
+    async def handle_ingest_upload(self, request: Request) -> Response:
+        failure = await self._begin()
+        if failure:
+            return failure
+        job = self.ingest_jobs.get(request.path_params["job_id"])
+        if job is None or job["state"] != "Open":
+            return self._json([{"errorCode": "INVALIDJOBSTATE", "message": "Job is not open"}], 400)
+        job["data"] += (await request.body()).decode("utf-8")
+        return Response(status_code=201)
+
+    def _process_ingest_job(self, job: Dict[str, Any]):
+        """Apply the uploaded rows like Salesforce does: empty values are left out, #N/A clears a field"""
+        rows = list(csv.reader(io.StringIO(job["data"])))
+        header, rows = rows[0], rows[1:]
+        for row in rows:
+            values = {}
+            for name, value in zip(header, row):
+                if value != "":
+                    values[name] = None if value == "#N/A" else value
+            result = self.write_record(job["object"], values, job["externalIdFieldName"] if job["operation"] == "upsert" else None)
+            if result["success"]:
+                job["successful"].append([result["id"], str(result["created"]).lower()] + row)
+            else:
+                error = result["errors"][0]
+                job["failed"].append([result["id"] or "", f"{error['statusCode']}:{error['message']}:--"] + row)
+        job["header"] = header
+        job["state"] = "JobComplete"
+
+    async def handle_ingest_job(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        job = self.ingest_jobs.get(request.path_params["job_id"])
+        if job is None:
+            return self._json([{"errorCode": "NOT_FOUND", "message": "Job not found"}], 404)
+        if request.method == "PATCH":
+            job["state"] = (await request.json())["state"]
+        elif job["state"] in ("UploadComplete", "InProgress"):
+            job["polls"] += 1
+            if job["polls"] > self.bulk_polls:
+                self._process_ingest_job(job)
+            else:
+                job["state"] = "InProgress"
+        return self._json({"id": job["id"], "object": job["object"], "operation": job["operation"],
+                           "state": job["state"], "numberRecordsProcessed": len(job["successful"]) + len(job["failed"]),
+                           "numberRecordsFailed": len(job["failed"])})
+
+    async def handle_ingest_results(self, request: Request) -> Response:
+        failure = await self._begin()
+        if failure:
+            return failure
+        job = self.ingest_jobs.get(request.path_params["job_id"])
+        kind = request.path_params["kind"]
+        if job is None or job["state"] != "JobComplete" or kind not in ("successfulResults", "failedResults"):
+            return self._json([{"errorCode": "INVALIDJOBSTATE", "message": "Job is not complete"}], 400)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if kind == "successfulResults":
+            writer.writerow(["sf__Id", "sf__Created"] + job["header"])
+            writer.writerows(job["successful"])
+        else:
+            writer.writerow(["sf__Id", "sf__Error"] + job["header"])
+            writer.writerows(job["failed"])
+        return Response(buffer.getvalue(), media_type="text/csv", headers={
+            "Sforce-Limit-Info": f"api-usage={self.api_requests_used}/{self.daily_api_limit}",
+        })
+
+    async def handle_bulk_create(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        body = await request.json()
+        try:
+            fields, rows = self.run_query(body["query"])
+        except ValueError as e:
+            return self._json([{"errorCode": "MALFORMED_QUERY", "message": str(e)}], 400)
+        job_id = f"750mock{len(self.bulk_jobs):011d}"
+        self.bulk_jobs[job_id] = {"id": job_id, "state": "UploadComplete", "polls": 0, "fields": fields, "rows": rows}
+        return self._json({"id": job_id, "operation": "query", "state": "UploadComplete"})
+
+    async def handle_bulk_job(self, request: Request) -> JSONResponse:
+        failure = await self._begin()
+        if failure:
+            return failure
+        job = self.bulk_jobs.get(request.path_params["job_id"])
+        if job is None:
+            return self._json([{"errorCode": "NOT_FOUND", "message": "Job not found"}], 404)
+        if request.method == "PATCH":
+            job["state"] = (await request.json())["state"]
+        elif job["state"] in ("UploadComplete", "InProgress"):
+            job["polls"] += 1
+            job["state"] = "JobComplete" if job["polls"] > self.bulk_polls else "InProgress"
+        return self._json({"id": job["id"], "state": job["state"], "numberRecordsProcessed": len(job["rows"])})
+
+    async def handle_bulk_results(self, request: Request) -> Response:
+        failure = await self._begin()
+        if failure:
+            return failure
+        job = self.bulk_jobs.get(request.path_params["job_id"])
+        if job is None or job["state"] != "JobComplete":
+            return self._json([{"errorCode": "INVALIDJOBSTATE", "message": "Job is not complete"}], 400)
+        offset = int(request.query_params.get("locator") or 0)
+        page_size = int(request.query_params.get("maxRecords") or 50000)
+        page = job["rows"][offset:offset + page_size]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(job["fields"])
+        writer.writerows(page)
+        next_offset = offset + len(page)
+        return Response(buffer.getvalue(), media_type="text/csv", headers={
+            "Sforce-Locator": str(next_offset) if next_offset < len(job["rows"]) else "null",
+            "Sforce-NumberOfRecords": str(len(page)),
+            "Sforce-Limit-Info": f"api-usage={self.api_requests_used}/{self.daily_api_limit}",
+        })
+
+    def start(self) -> "MockSalesforce":
+        """Start serving on a free local port in a background thread"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+        self.base_url = f"http://{host}:{port}"
+
+        config = uvicorn.Config(self.app, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        """Stop the background server"""
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def session(self, config: Optional[TransportConfig] = None) -> requests.Session:
+        """A requests session that routes the mock instance's https URLs to the local server"""
+        return redirect_session(requests.Session(), self.base_url, config)
+
+    def salesforce(self, config: Optional[TransportConfig] = None) -> Salesforce:
+        """A simple_salesforce client connected to this mock org"""
+        return Salesforce(instance_url=MOCK_INSTANCE_URL, session_id="00Dmock!session", version=API_VERSION,
+                          session=self.session(config))
+
+    def __enter__(self) -> "MockSalesforce":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class LocalRedirectAdapter(PooledAdapter):
+    """Pooled transport adapter that rewrites every request to a local plain-HTTP base URL
+
+    simple_salesforce always builds https:// URLs from the instance name, so the mock
+    is reached by swapping scheme and host on the way out.
+    """
+
+    def __init__(self, base_url: str, config: TransportConfig):
+        self.target = urlsplit(base_url)
+        super().__init__(config)
+
+    def _send_once(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = urlunsplit((self.target.scheme, self.target.netloc, parts.path, parts.query, parts.fragment))
+        return super()._send_once(request, **kwargs)
+
+
+def redirect_session(session: requests.Session, base_url: str,
+                     config: Optional[TransportConfig] = None) -> requests.Session:
+    """Route every https request of session, login included, to the mock server at base_url"""
+    if config is None:
+        config = getattr(session.get_adapter("https://"), "transport_config", None) or TransportConfig()
+    session.mount("https://", LocalRedirectAdapter(base_url, config))
+    return session
+
+
+class MockOrgConfig(OrgConfig):
+    """Org config that logs in to the mock org at base_url with a SOAP login over the client's session"""
+
+    def __init__(self, base_url: str, alias: str = DEFAULT_ORG, username: str = "user@example.com",
+                 password: str = "mock"):
+        super().__init__(alias=alias, username=username, password=password, security_token="")
+        self.base_url = base_url
+
+    def connect(self, session) -> Salesforce:
+        return super().connect(redirect_session(session, self.base_url))
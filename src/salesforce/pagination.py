@@ -0,0 +1,89 @@
+"""
+Cursor and budget helpers for paginated SOQL results
+"""
+
+from typing import Any, Dict, Optional
+import base64
+import json
+
+CURSOR_VERSION = 1
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Encode pagination state as an opaque, URL-safe cursor string"""
+    payload = json.dumps({"v": CURSOR_VERSION, **state}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(state, dict) or state.get("v") != CURSOR_VERSION:
+        raise ValueError("Invalid cursor")
+    next_url = state.get("next")
+    if next_url is not None and not str(next_url).startswith("/services/data/"):
+        raise ValueError("Invalid cursor")
+    if next_url is None and not state.get("query"):
+        raise ValueError("Invalid cursor")
+    state.pop("v")
+    return state
+
+
+def record_size(record: Any) -> int:
+    """Approximate serialized size of a record in bytes"""
+    return len(json.dumps(record, default=str).encode("utf-8"))
+
+
+class RecordBudget:
+    """Tracks a record cap and byte budget for a single tool response
+
+    The first record is always admitted so every page request makes progress.
+    """
+
+    def __init__(self, max_records: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.records = 0
+        self.bytes = 0
+        self.exhausted = False
+
+    @property
+    def full(self) -> bool:
+        """True once the record cap has been reached"""
+        if self.max_records is not None and self.records >= self.max_records:
+            self.exhausted = True
+            return True
+        return False
+
+    def take(self, record: Any) -> bool:
+        """Admit a record if it fits within the budget"""
+        if self.max_records is not None and self.records >= self.max_records:
+            self.exhausted = True
+            return False
+        if self.max_bytes is not None:
+            size = record_size(record)
+            if self.records and self.bytes + size > self.max_bytes:
+                self.exhausted = True
+                return False
+            self.bytes += size
+        self.records += 1
+        return True
+
+
+def positive_int(arguments: Dict[str, Any], name: str) -> Optional[int]:
+    """Read an optional positive integer argument"""
+    value = arguments.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a positive integer")
+    if value <= 0:
+        raise ValueError(f"'{name}' must be a positive integer")
+    return value
@@ -0,0 +1,292 @@
+"""
+API-limit aware admission control for Salesforce calls
+Token buckets per org and per MCP session, a priority queue for calls waiting on the org bucket,
+and a guard that keeps part of the org's daily API requests for integrations other than this server
+"""
+
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import heapq
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Interactive lookups go first when the org bucket is contended; bulk extracts wait
+TOOL_PRIORITIES = {
+    "get_record": PRIORITY_HIGH,
+    "get_object_fields": PRIORITY_HIGH,
+    "get_objects_fields": PRIORITY_HIGH,
+    "bulk_query": PRIORITY_LOW,
+    "replica_refresh": PRIORITY_LOW,
+}
+
+MAX_TRACKED_SESSIONS = 10000
+
+# Key of the MCP session handling the current request, set by the transport handlers
+current_session: ContextVar[Optional[str]] = ContextVar("mcp_session", default=None)
+
+
+def tool_priority(tool: Optional[str]) -> int:
+    return TOOL_PRIORITIES.get(tool, PRIORITY_NORMAL)
+
+
+class RateLimitExceeded(ValueError):
+    """Raised instead of sending a call; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"{reason}; retry after {retry_after:.1f}s")
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens per second up to capacity
+
+    Tokens may go negative through reserve(), which hands out future tokens as a wait time.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available without taking it"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Take a token now or from the future; returns the wait before using it, or None if over max_wait"""
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+    def refund(self):
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class RateLimitConfig:
+    """Rates, queue bounds and API quota reserve for one org's rate limiter
+
+    A rate of 0 disables that bucket, and both buckets are off unless configured, so a workload
+    that stays within the org's quota is never slowed down. A reserve of 0 disables the quota guard
+    and the /limits reads that feed it.
+    """
+
+    def __init__(self, org_rate: float = 0.0, org_burst: float = 50.0, session_rate: float = 0.0,
+                 session_burst: float = 30.0, reserve_fraction: float = 0.1, max_wait: float = 5.0,
+                 max_queue: int = 100, limits_refresh: float = 300.0):
+        self.org_rate = org_rate
+        self.org_burst = org_burst
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.reserve_fraction = reserve_fraction
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.limits_refresh = limits_refresh
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        """Build a config from SALESFORCE_RATE_LIMIT*, SALESFORCE_SESSION_RATE_* and SALESFORCE_API_RESERVE"""
+        return cls(
+            org_rate=float(os.getenv('SALESFORCE_RATE_LIMIT', 0.0)),
+            org_burst=float(os.getenv('SALESFORCE_RATE_BURST', 50.0)),
+            session_rate=float(os.getenv('SALESFORCE_SESSION_RATE_LIMIT', 0.0)),
+            session_burst=float(os.getenv('SALESFORCE_SESSION_RATE_BURST', 30.0)),
+            reserve_fraction=float(os.getenv('SALESFORCE_API_RESERVE', 0.1)),
+            max_wait=float(os.getenv('SALESFORCE_RATE_LIMIT_MAX_WAIT', 5.0)),
+            max_queue=int(os.getenv('SALESFORCE_RATE_LIMIT_MAX_QUEUE', 100)),
+            limits_refresh=float(os.getenv('SALESFORCE_LIMITS_REFRESH', 300.0)),
+        )
+
+
+class RateLimiter:
+    """Admits Salesforce calls for one org
+
+    A call is rejected at once when the daily API quota is down to the reserve, or when its session
+    is over its own rate by more than max_wait. It then takes a token from the org bucket, queueing
+    by priority while the bucket is empty; a call that cannot get one within max_wait is rejected.
+    Rejections carry a retry-after hint.
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None, clock: Callable[[], float] = time.monotonic):
+        self.config = config or RateLimitConfig()
+        self._clock = clock
+        self._org = TokenBucket(self.config.org_rate, self.config.org_burst, clock) if self.config.org_rate > 0 else None
+        self._sessions: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._heap: List[list] = []
+        self._sequence = 0
+        self._loop = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.api_usage: Optional[tuple] = None
+        self._limits_checked: Optional[float] = None
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected_quota = 0
+        self.rejected_session = 0
+        self.rejected_org = 0
+
+    def observe_usage(self, used: int, limit: int):
+        """Record daily API usage, e.g. from a Sforce-Limit-Info header"""
+        self.api_usage = (used, limit)
+
+    def observe_limits(self, limits: Dict[str, Any]):
+        """Record daily API usage from a /limits resource response"""
+        daily = limits.get("DailyApiRequests") or {}
+        if "Max" in daily and "Remaining" in daily:
+            self.observe_usage(daily["Max"] - daily["Remaining"], daily["Max"])
+
+    def limits_due(self) -> bool:
+        """True, once per limits_refresh interval, when the /limits resource should be read again"""
+        if self.config.reserve_fraction <= 0:
+            return False
+        now = self._clock()
+        if self._limits_checked is not None and now - self._limits_checked < self.config.limits_refresh:
+            return False
+        self._limits_checked = now
+        return True
+
+    def _check_quota(self):
+        if self.api_usage is None:
+            return
+        used, limit = self.api_usage
+        if limit and used >= limit * (1 - self.config.reserve_fraction):
+            self.rejected_quota += 1
+            # Usage is next read from /limits once the refresh interval has passed
+            since = self._clock() - self._limits_checked if self._limits_checked is not None else 0.0
+            raise RateLimitExceeded(
+                f"Daily API requests are down to the {self.config.reserve_fraction:.0%} reserved for other "
+                f"integrations ({used}/{limit} used)", max(0.0, self.config.limits_refresh - since))
+
+    def _session_bucket(self, session: str) -> TokenBucket:
+        bucket = self._sessions.get(session)
+        if bucket is None:
+            bucket = TokenBucket(self.config.session_rate, self.config.session_burst, self._clock)
+            self._sessions[session] = bucket
+            while len(self._sessions) > MAX_TRACKED_SESSIONS:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session)
+        return bucket
+
+    async def acquire(self, session: Optional[str] = None, priority: int = PRIORITY_NORMAL):
+        """Wait until a call may be sent, or raise RateLimitExceeded"""
+        self._check_quota()
+
+        bucket = None
+        if session is not None and self.config.session_rate > 0:
+            bucket = self._session_bucket(session)
+            wait = bucket.reserve(self.config.max_wait)
+            if wait is None:
+                self.rejected_session += 1
+                raise RateLimitExceeded(
+                    f"Session is over its rate of {self.config.session_rate:g} Salesforce calls per second",
+                    (1 - bucket.tokens) / self.config.session_rate)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        if self._org is not None:
+            try:
+                await self._acquire_org(priority)
+            except RateLimitExceeded:
+                # The call is not sent, so it does not count against its session
+                if bucket is not None:
+                    bucket.refund()
+                raise
+        self.admitted += 1
+
+    async def _acquire_org(self, priority: int):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and tasks are bound to one loop; start afresh when a new loop takes over
+            self._loop = loop
+            self._heap = []
+            self._dispatcher = None
+            self.waiting = 0
+
+        if not self.waiting and self._org.try_acquire() == 0:
+            return
+
+        estimate = (self.waiting + 1) / self._org.rate
+        if self.waiting >= self.config.max_queue or estimate > self.config.max_wait:
+            self.rejected_org += 1
+            raise RateLimitExceeded(
+                f"Org is at its rate of {self._org.rate:g} Salesforce calls per second with "
+                f"{self.waiting} calls queued", estimate)
+
+        future = loop.create_future()
+        self._sequence += 1
+        heapq.heappush(self._heap, [priority, self._sequence, future])
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await asyncio.wait_for(future, self.config.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected_org += 1
+            raise RateLimitExceeded("Timed out queueing for the org's Salesforce call rate",
+                                    self.waiting / self._org.rate)
+        finally:
+            self.waiting -= 1
+
+    async def _dispatch(self):
+        """Hand out org tokens to queued calls, highest priority first, as the bucket refills"""
+        while self._heap:
+            wait = self._org.try_acquire()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            while self._heap:
+                future = heapq.heappop(self._heap)[2]
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                # Every remaining waiter gave up; keep the token for the next caller
+                self._org.refund()
+
+    def stats(self) -> Dict[str, Any]:
+        """Admission counters, queue depth and the daily API usage the limiter is working from"""
+        stats = {
+            "admitted": self.admitted,
+            "rejected_quota": self.rejected_quota,
+            "rejected_session": self.rejected_session,
+            "rejected_org": self.rejected_org,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "sessions": len(self._sessions),
+        }
+        if self._org is not None:
+            stats["org_tokens"] = round(self._org.tokens, 2)
+        if self.api_usage is not None:
+            used, limit = self.api_usage
+            stats.update(api_requests_used=used, api_requests_limit=limit,
+                         api_requests_reserved=int(limit * self.config.reserve_fraction))
+        return stats
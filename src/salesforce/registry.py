@@ -0,0 +1,74 @@
+"""
+Registry of Salesforce clients, one per configured org
+The org for a tool call is taken from the current_org context variable, which the
+transport handlers set per MCP session.
+"""
+
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+
+from .client import DEFAULT_ORG, OrgConfig, SalesforceClient
+
+logger = logging.getLogger(__name__)
+
+# Org alias selected for the MCP session handling the current request (None means the default org)
+current_org: ContextVar[Optional[str]] = ContextVar("salesforce_org", default=None)
+
+
+class ClientRegistry:
+    """Creates SalesforceClient instances lazily and hands out the one for a given org alias"""
+
+    def __init__(self, configs: Dict[str, OrgConfig], default_alias: str = DEFAULT_ORG):
+        self.configs = configs
+        self.default_alias = default_alias
+        self._clients: Dict[str, SalesforceClient] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ClientRegistry":
+        """Build a registry from the default SALESFORCE_* credentials plus every alias listed in SALESFORCE_ORGS"""
+        configs = {DEFAULT_ORG: OrgConfig.from_env(DEFAULT_ORG)}
+        for alias in os.getenv('SALESFORCE_ORGS', '').split(','):
+            alias = alias.strip().lower()
+            if alias and alias != DEFAULT_ORG:
+                configs[alias] = OrgConfig.from_env(alias)
+        default_alias = os.getenv('SALESFORCE_DEFAULT_ORG', DEFAULT_ORG).strip().lower()
+        if default_alias not in configs:
+            logger.warning(f"SALESFORCE_DEFAULT_ORG '{default_alias}' is not configured, using '{DEFAULT_ORG}'")
+            default_alias = DEFAULT_ORG
+        return cls(configs, default_alias)
+
+    def __contains__(self, alias: str) -> bool:
+        return alias.lower() in self.configs
+
+    def aliases(self) -> List[str]:
+        return list(self.configs)
+
+    def get(self, alias: Optional[str] = None) -> SalesforceClient:
+        """Return the client for alias, creating it on first use
+
+        New clients do not log in here; that happens on the executor with their first call.
+        """
+        alias = (alias or self.default_alias).lower()
+        client = self._clients.get(alias)
+        if client is not None:
+            return client
+        if alias not in self.configs:
+            raise ValueError(f"Unknown Salesforce org '{alias}'")
+        with self._lock:
+            client = self._clients.get(alias)
+            if client is None:
+                client = SalesforceClient(self.configs[alias], connect=False)
+                self._clients[alias] = client
+        return client
+
+    def current(self) -> SalesforceClient:
+        """Client for the org selected by the current MCP session"""
+        return self.get(current_org.get())
+
+    def clients(self) -> Dict[str, SalesforceClient]:
+        """Clients created so far, by alias"""
+        return dict(self._clients)
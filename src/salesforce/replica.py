@@ -0,0 +1,588 @@
+"""
+Local replica of reference objects
+Mirrors configured objects of an org into an embedded sqlite database, kept current in the background
+with incremental syncs, so simple SOQL against them is answered locally without an API call
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .metrics import current_tool
+from .soql import SoqlParseError
+from .sync import MemorySyncStore, SqliteSyncStore, read_changes
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SECONDS = 300.0
+DEFAULT_MAX_RECORDS = 50000
+
+# Tool name the background refresh runs under, so the rate limiter queues it behind tool calls
+REFRESH_TOOL = "replica_refresh"
+
+# Subscriber name of the replica's own sync positions
+SUBSCRIBER = "replica"
+
+# Compound and binary fields are not mirrored
+SKIPPED_TYPES = frozenset({"address", "location", "base64"})
+INTEGER_TYPES = frozenset({"boolean", "int"})
+REAL_TYPES = frozenset({"double", "currency", "percent"})
+# Comparisons on these need SOQL date literals, which are left to Salesforce
+DATE_TYPES = frozenset({"date", "datetime", "time"})
+# Record Ids are case-sensitive, and a filter may give them in their 15-character form
+ID_TYPES = frozenset({"id", "reference"})
+_ID_SUFFIX = "ABCDEFGHIJKLMNOPQRSTUVWXYZ012345"
+_SHORT_ID = re.compile(r'^[A-Za-z0-9]{15}$')
+
+
+class ReplicaConfig:
+    """Objects to mirror and how often to refresh them"""
+
+    def __init__(self, objects: Optional[List[str]] = None, refresh_interval: float = DEFAULT_REFRESH_SECONDS,
+                 max_staleness: Optional[float] = None, path: str = ":memory:",
+                 max_records: int = DEFAULT_MAX_RECORDS):
+        self.objects = objects or []
+        self.refresh_interval = refresh_interval
+        # Past this age a mirrored object is not answered locally; by default three missed refreshes
+        self.max_staleness = max_staleness if max_staleness is not None else refresh_interval * 3
+        self.path = path
+        self.max_records = max_records
+
+    @classmethod
+    def from_env(cls, org_alias: str = "default") -> "ReplicaConfig":
+        """Build a config from SALESFORCE_REPLICA_* environment variables
+
+        Orgs other than the default get their own database file, e.g. replica.acme.db.
+        """
+        path = os.getenv('SALESFORCE_REPLICA_PATH') or ":memory:"
+        if path != ":memory:" and org_alias != "default":
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{org_alias}{ext}"
+        max_staleness = os.getenv('SALESFORCE_REPLICA_MAX_STALENESS')
+        return cls(
+            objects=[name.strip() for name in os.getenv('SALESFORCE_REPLICA_OBJECTS', '').split(',') if name.strip()],
+            refresh_interval=float(os.getenv('SALESFORCE_REPLICA_REFRESH', DEFAULT_REFRESH_SECONDS)),
+            max_staleness=float(max_staleness) if max_staleness else None,
+            path=path,
+            max_records=int(os.getenv('SALESFORCE_REPLICA_MAX_RECORDS', DEFAULT_MAX_RECORDS)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.objects)
+
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<string>'(?:[^'\\]|\\.)*')
+  | (?P<number>-?\d+(?:\.\d+)?)(?![\w.:-])
+  | (?P<op><=|>=|!=|<>|=|<|>|\(|\)|,)
+  | (?P<word>[A-Za-z_]\w*(?![\w.:]))
+)""", re.VERBOSE)
+
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "b": "\b", "f": "\f", "'": "'", '"': '"', "\\": "\\"}
+
+_KEYWORDS = frozenset({"SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "LIKE", "ORDER", "BY", "ASC", "DESC",
+                       "NULLS", "FIRST", "LAST", "LIMIT", "OFFSET", "NULL", "TRUE", "FALSE"})
+
+
+def id18(value: str) -> str:
+    """The 18-character form of a 15-character record Id, which Salesforce always returns; other values as given"""
+    if len(value) == 18 and _SHORT_ID.match(value[:15]):
+        # The suffix is a checksum of letter case, and Salesforce accepts it in either case
+        return value[:15] + value[15:].upper()
+    if not _SHORT_ID.match(value):
+        return value
+    suffix = ""
+    for start in range(0, 15, 5):
+        bits = sum(1 << i for i, char in enumerate(value[start:start + 5]) if "A" <= char <= "Z")
+        suffix += _ID_SUFFIX[bits]
+    return value + suffix
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    tokens, position = [], 0
+    query = query.rstrip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if not match or match.end() == position:
+            raise SoqlParseError(f"Not answerable locally near: {query[position:position + 20]}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "word" and value.upper() in _KEYWORDS:
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Translator:
+    """Recursive-descent translation of SELECT fields FROM object [WHERE] [ORDER BY] [LIMIT] [OFFSET] to SQL
+
+    Anything else (relationships, functions, aggregates, subqueries, date literals, binds, aliases)
+    raises SoqlParseError so the query is sent to Salesforce instead.
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]], columns_for: Callable[[str], Optional[Dict[str, Any]]]):
+        self.tokens = tokens
+        self.position = 0
+        self.columns_for = columns_for
+        self.columns: Dict[str, Any] = {}
+        self.params: List[Any] = []
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _next(self) -> Tuple[Optional[str], Optional[str]]:
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token_kind, token_value = self._peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: Optional[str] = None) -> str:
+        token_kind, token_value = self._next()
+        if token_kind != kind or (value is not None and token_value != value):
+            raise SoqlParseError(f"Not answerable locally: expected {value or kind}, found {token_value}")
+        return token_value
+
+    def _column(self, name: str) -> Tuple[str, str]:
+        column = self.columns.get(name.lower())
+        if column is None:
+            raise SoqlParseError(f"Not answerable locally: '{name}' is not a mirrored field")
+        return column
+
+    def _field(self) -> Tuple[str, str]:
+        return self._column(self._expect("word"))
+
+    def translate(self) -> Tuple[str, List[Any], str, List[str], List[str]]:
+        self._expect("keyword", "SELECT")
+        selected = [self._expect("word")]
+        while self._accept("op", ","):
+            selected.append(self._expect("word"))
+        self._expect("keyword", "FROM")
+        object_name = self._expect("word")
+        columns = self.columns_for(object_name)
+        if columns is None:
+            raise SoqlParseError(f"Not answerable locally: {object_name} is not mirrored")
+        self.columns = columns
+        fields = [self._column(name)[0] for name in selected]
+        object_name = columns["__object__"]
+
+        sql = f'SELECT {", ".join(_quote(field) for field in fields)} FROM {_quote(object_name)}'
+        if self._accept("keyword", "WHERE"):
+            sql += " WHERE " + self._or()
+        if self._accept("keyword", "ORDER"):
+            self._expect("keyword", "BY")
+            items = [self._order_item()]
+            while self._accept("op", ","):
+                items.append(self._order_item())
+            sql += " ORDER BY " + ", ".join(items)
+        limit, offset = None, None
+        if self._accept("keyword", "LIMIT"):
+            limit = int(self._expect("number"))
+        if self._accept("keyword", "OFFSET"):
+            offset = int(self._expect("number"))
+        if self._peek()[0] is not None:
+            raise SoqlParseError(f"Not answerable locally: unsupported clause {self._peek()[1]}")
+        if limit is not None or offset is not None:
+            sql += " LIMIT ? OFFSET ?"
+            self.params.extend([limit if limit is not None else -1, offset or 0])
+        booleans = [field for field in fields if self._column(field)[1] == "boolean"]
+        return sql, self.params, object_name, fields, booleans
+
+    def _order_item(self) -> str:
+        name, _ = self._field()
+        item = _quote(name)
+        if self._accept("keyword", "DESC"):
+            item += " DESC"
+        else:
+            self._accept("keyword", "ASC")
+        if self._accept("keyword", "NULLS"):
+            item += " NULLS FIRST" if self._accept("keyword", "FIRST") else " NULLS " + self._expect("keyword", "LAST")
+        return item
+
+    def _or(self) -> str:
+        parts = [self._and()]
+        while self._accept("keyword", "OR"):
+            parts.append(self._and())
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def _and(self) -> str:
+        parts = [self._not()]
+        while self._accept("keyword", "AND"):
+            parts.append(self._not())
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+
+    def _not(self) -> str:
+        if self._accept("keyword", "NOT"):
+            return f"NOT ({self._not()})"
+        if self._accept("op", "("):
+            condition = self._or()
+            self._expect("op", ")")
+            return condition
+        return self._condition()
+
+    def _value(self, field_type: str) -> Any:
+        kind, value = self._next()
+        if kind == "string" and field_type not in INTEGER_TYPES | REAL_TYPES:
+            text = re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(0)), value[1:-1])
+            return id18(text) if field_type in ID_TYPES else text
+        if kind == "number" and (field_type == "int" or field_type in REAL_TYPES):
+            return float(value) if "." in value else int(value)
+        if kind == "keyword" and value in ("TRUE", "FALSE") and field_type == "boolean":
+            return 1 if value == "TRUE" else 0
+        raise SoqlParseError(f"Not answerable locally: unsupported value {value} for a {field_type} field")
+
+    def _condition(self) -> str:
+        name, field_type = self._field()
+        if field_type in DATE_TYPES:
+            raise SoqlParseError(f"Not answerable locally: filter on {field_type} field {name}")
+        column = _quote(name)
+        negate = self._accept("keyword", "NOT")
+        if self._accept("keyword", "IN"):
+            self._expect("op", "(")
+            values = [self._value(field_type)]
+            while self._accept("op", ","):
+                values.append(self._value(field_type))
+            self._expect("op", ")")
+            self.params.extend(values)
+            placeholders = ', '.join('?' * len(values))
+            # Like !=, a SOQL NOT IN also matches nulls
+            if negate:
+                return f"({column} IS NULL OR {column} NOT IN ({placeholders}))"
+            return f"{column} IN ({placeholders})"
+        if negate:
+            raise SoqlParseError("Not answerable locally: NOT must precede a condition or IN")
+        if self._accept("keyword", "LIKE"):
+            if field_type in INTEGER_TYPES | REAL_TYPES | ID_TYPES:
+                raise SoqlParseError(f"Not answerable locally: LIKE on {field_type} field {name}")
+            self.params.append(self._value(field_type))
+            # SOQL LIKE has no escape for _ and %, and like sqlite's it ignores case
+            return f"{column} LIKE ?"
+        kind, operator = self._next()
+        if kind != "op" or operator not in ("=", "!=", "<>", "<", "<=", ">", ">="):
+            raise SoqlParseError(f"Not answerable locally: unsupported operator {operator}")
+        if self._accept("keyword", "NULL"):
+            if operator == "=":
+                return f"{column} IS NULL"
+            if operator in ("!=", "<>"):
+                return f"{column} IS NOT NULL"
+            raise SoqlParseError("Not answerable locally: ordering comparison with null")
+        self.params.append(self._value(field_type))
+        # A SOQL != also matches nulls
+        if operator in ("!=", "<>"):
+            return f"({column} IS NULL OR {column} != ?)"
+        return f"{column} {operator} ?"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def translate_soql(query: str, columns_for: Callable[[str], Optional[Dict[str, Any]]]):
+    """SQL, parameters, object name, selected fields and boolean fields for a simple SOQL query
+
+    columns_for returns, for a mirrored object, its (name, type) columns by lower-case field name plus
+    the object's own name under '__object__', or None. Raises SoqlParseError if the query cannot be
+    answered from the mirror.
+    """
+    return _Translator(_tokenize(query), columns_for).translate()
+
+
+class Replica:
+    """sqlite mirror of the configured objects of one org
+
+    Each object is loaded in full once, then kept current with the same SystemModstamp and getDeleted
+    reads sync_changes uses. Queries are answered locally only while their object is younger than
+    max_staleness; otherwise, or when the query is not simple enough, query() returns None.
+    """
+
+    def __init__(self, client, config: ReplicaConfig):
+        self.client = client
+        self.config = config
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(config.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS replica_objects (name TEXT PRIMARY KEY, fields TEXT NOT NULL, refreshed REAL NOT NULL)"
+        )
+        # A file-backed replica keeps its sync positions next to the data, so a restart resumes incrementally
+        self.sync_store = MemorySyncStore() if config.path == ":memory:" else SqliteSyncStore(config.path)
+        self._objects: Dict[str, Dict[str, Any]] = {}
+        # Objects written through this server since their last refresh
+        self._written: Set[str] = set()
+        tables = dict(self._connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'"))
+        for name, fields, refreshed in self._connection.execute("SELECT name, fields, refreshed FROM replica_objects"):
+            fields = json.loads(fields)
+            # Tables created with other column definitions, e.g. by an older version, are loaded again in full
+            if tables.get(name) == _create_table_sql(name, fields):
+                self._objects[name.lower()] = {"name": name, "fields": fields, "refreshed": refreshed}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def _columns_for(self, object_name: str) -> Optional[Dict[str, Any]]:
+        entry = self._objects.get(object_name.lower())
+        if entry is None:
+            return None
+        columns = {name.lower(): (name, field_type) for name, field_type in entry["fields"]}
+        columns["__object__"] = entry["name"]
+        return columns
+
+    def staleness(self, object_name: str) -> Optional[float]:
+        """Seconds since the mirror of object_name was last brought up to date, or None if it is not mirrored"""
+        entry = self._objects.get(object_name.lower())
+        return time.time() - entry["refreshed"] if entry is not None else None
+
+    def invalidate(self, object_name: str):
+        """Send queries against object_name to Salesforce until its next refresh, e.g. after records were written"""
+        self._written.add(object_name.lower())
+
+    def _replace(self, name: str, fields: List[Tuple[str, str]], records: List[Dict[str, Any]], refreshed: float):
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+                self._connection.execute(_create_table_sql(name, fields))
+                self._write(name, fields, records, [])
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO replica_objects (name, fields, refreshed) VALUES (?, ?, ?)",
+                    (name, json.dumps(fields), refreshed)
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _apply(self, name: str, fields: List[Tuple[str, str]], records: List[Dict[str, Any]], deleted_ids: List[str],
+               refreshed: Optional[float]):
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._write(name, fields, records, deleted_ids)
+                if refreshed is not None:
+                    self._connection.execute("UPDATE replica_objects SET refreshed = ? WHERE name = ?", (refreshed, name))
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _write(self, name: str, fields: List[Tuple[str, str]], records: List[Dict[str, Any]], deleted_ids: List[str]):
+        names = [field for field, _ in fields]
+        if records:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO {_quote(name)} ({', '.join(_quote(n) for n in names)}) "
+                f"VALUES ({', '.join('?' * len(names))})",
+                ([_to_sql(record.get(n)) for n in names] for record in records)
+            )
+        if deleted_ids:
+            self._connection.executemany(f"DELETE FROM {_quote(name)} WHERE Id = ?", ([i] for i in deleted_ids))
+
+    def _select(self, sql: str, params: List[Any]) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    async def _mirrored_fields(self, object_name: str) -> List[Tuple[str, str]]:
+        fields = [(field['name'], field['type']) for field in await self.client.object_fields(object_name)
+                  if field['type'] not in SKIPPED_TYPES]
+        if not any(name == "SystemModstamp" for name, _ in fields):
+            raise ValueError(f"{object_name} has no SystemModstamp field and cannot be mirrored")
+        return fields
+
+    async def _load(self, object_name: str, fields: List[Tuple[str, str]]):
+        """Mirror every record of object_name, after recording the sync position later refreshes start from"""
+        await read_changes(self.client, self.sync_store, object_name, subscriber=SUBSCRIBER, reset=True)
+        refreshed = time.time()
+        query = f"SELECT {', '.join(name for name, _ in fields)} FROM {object_name}"
+        page = await self.client.run(self.client.query_page, query=query)
+        if page.get('totalSize', 0) > self.config.max_records:
+            raise ValueError(f"{object_name} has {page['totalSize']} records, more than the replica limit "
+                             f"of {self.config.max_records}")
+        records = list(page['records'])
+        while not page.get('done', True):
+            page = await self.client.run(self.client.query_page, next_url=page['nextRecordsUrl'])
+            records.extend(page['records'])
+        await asyncio.to_thread(self._replace, object_name, fields, records, refreshed)
+        logger.info(f"Replica of {object_name} for org '{self.client.alias}' loaded with {len(records)} records")
+        return refreshed
+
+    async def _catch_up(self, object_name: str, fields: List[Tuple[str, str]]):
+        """Apply the changes and deletions since the last refresh"""
+        refreshed = time.time()
+        while True:
+            changes = await read_changes(self.client, self.sync_store, object_name, [name for name, _ in fields],
+                                         subscriber=SUBSCRIBER)
+            for warning in changes.get("warnings", []):
+                logger.warning(f"Replica of {object_name}: {warning}")
+            await asyncio.to_thread(self._apply, object_name, fields, changes["changed"],
+                                    [deleted["Id"] for deleted in changes["deleted"]],
+                                    None if changes["has_more"] else refreshed)
+            if not changes["has_more"]:
+                return refreshed
+
+    async def refresh(self, object_name: str):
+        """Bring the mirror of object_name up to date, loading it in full if it is new or its fields changed"""
+        token = current_tool.set(REFRESH_TOOL)
+        try:
+            with TRACER.span("replica.refresh", {"salesforce.object": object_name}):
+                await self._refresh(object_name)
+            self.refreshes += 1
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            current_tool.reset(token)
+
+    async def _refresh(self, object_name: str):
+        # Writes that finish from here on may be missed by this refresh, so they mark the object again
+        written = object_name.lower() in self._written
+        self._written.discard(object_name.lower())
+        try:
+            fields = await self._mirrored_fields(object_name)
+            entry = self._objects.get(object_name.lower())
+            stored = await asyncio.to_thread(self.sync_store.get,
+                                             f"{self.client.alias}:{object_name.lower()}:{SUBSCRIBER}")
+            if entry is None or stored is None or [tuple(f) for f in entry["fields"]] != fields:
+                refreshed = await self._load(object_name, fields)
+            else:
+                refreshed = await self._catch_up(object_name, fields)
+        except BaseException:
+            if written:
+                self._written.add(object_name.lower())
+            raise
+        self._objects[object_name.lower()] = {"name": object_name, "fields": [list(f) for f in fields],
+                                              "refreshed": refreshed}
+
+    async def refresh_all(self):
+        for object_name in self.config.objects:
+            try:
+                await self.refresh(object_name)
+            except Exception as e:
+                logger.warning(f"Replica refresh of {object_name} for org '{self.client.alias}' failed: {e}")
+
+    def start(self):
+        """Refresh every configured object now and then every refresh_interval seconds in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(self.config.refresh_interval)
+
+    async def query(self, query: str, max_records: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Result of query from the mirror, shaped like a REST query result plus a 'replica' staleness entry
+
+        Returns None when the query has to go to Salesforce. With max_records the result is cut to that
+        many records and marked truncated; totalSize still counts every match, as in a REST result.
+        """
+        try:
+            sql, params, object_name, fields, booleans = translate_soql(query, self._columns_for)
+        except SoqlParseError as e:
+            self.misses += 1
+            logger.debug(f"Replica miss: {e}")
+            return None
+        entry = self._objects[object_name.lower()]
+        staleness = time.time() - entry["refreshed"]
+        if staleness > self.config.max_staleness or object_name.lower() in self._written:
+            self.misses += 1
+            return None
+
+        limited = f"SELECT * FROM ({sql}) LIMIT {max_records + 1}" if max_records is not None else sql
+        rows = await asyncio.to_thread(self._select, limited, params)
+        total_size = len(rows)
+        truncated = max_records is not None and len(rows) > max_records
+        if truncated:
+            rows = rows[:max_records]
+            [(total_size,)] = await asyncio.to_thread(self._select, f"SELECT COUNT(*) FROM ({sql})", params)
+        url = f"/services/data/v{self.client.sf.sf_version}/sobjects/{object_name}/" if self.client.sf else None
+        records = []
+        for row in rows:
+            record = {"attributes": {"type": object_name}}
+            for field, value in zip(fields, row):
+                record[field] = bool(value) if field in booleans and value is not None else value
+            if url and record.get("Id"):
+                record["attributes"]["url"] = url + record["Id"]
+            records.append(record)
+        self.hits += 1
+        result = {
+            "records": records,
+            "totalSize": total_size,
+            "done": True,
+            "replica": {
+                "refreshed_at": datetime.fromtimestamp(entry["refreshed"], timezone.utc).isoformat(),
+                "staleness_seconds": round(staleness, 3),
+            },
+        }
+        if truncated:
+            result["truncated"] = True
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = sum(self._connection.execute(f"SELECT COUNT(*) FROM {_quote(entry['name'])}").fetchone()[0]
+                       for entry in self._objects.values())
+        stalest = max((self.staleness(name) for name in self._objects), default=0.0)
+        return {
+            "objects": len(self._objects),
+            "rows": rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "max_staleness_seconds": round(stalest, 3),
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def _column_sql(field: Tuple[str, str]) -> str:
+    name, field_type = field
+    if field_type in INTEGER_TYPES:
+        affinity = "INTEGER"
+    elif field_type in REAL_TYPES:
+        affinity = "REAL"
+    elif field_type in ID_TYPES:
+        affinity = "TEXT"
+    else:
+        # SOQL compares text case-insensitively
+        affinity = "TEXT COLLATE NOCASE"
+    constraint = " PRIMARY KEY" if name == "Id" else ""
+    return f"{_quote(name)} {affinity}{constraint}"
+
+
+def _create_table_sql(name: str, fields: List[Tuple[str, str]]) -> str:
+    return f"CREATE TABLE {_quote(name)} ({', '.join(_column_sql(tuple(f)) for f in fields)})"
+
+
+def _to_sql(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
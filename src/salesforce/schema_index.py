@@ -0,0 +1,155 @@
+"""
+Compact schema index for field lookup
+Keeps each object's fields in parallel arrays with an inverted index over the words of field names
+and labels, so a search touches a few postings instead of scanning and serializing every field
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import difflib
+import re
+import threading
+
+DEFAULT_MAX_OBJECTS = 200
+DEFAULT_LIMIT = 20
+
+_CAMEL = re.compile(r'([a-z0-9])([A-Z])')
+_WORD = re.compile(r'[a-z0-9]+')
+# Custom field and relationship suffixes carry no meaning for a search
+_SUFFIX_TOKENS = frozenset({"c", "r"})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case words of a field name or label: 'BillingPostalCode' -> ['billing', 'postal', 'code']"""
+    return [word for word in _WORD.findall(_CAMEL.sub(r'\1 \2', text or '').lower()) if word not in _SUFFIX_TOKENS]
+
+
+class FieldIndex:
+    """Fields of one object in parallel arrays, with postings from word to field positions"""
+
+    __slots__ = ("object_name", "source", "names", "labels", "types", "type_names", "updateable",
+                 "picklists", "_lower_names", "_lower_labels", "_postings", "_vocabulary")
+
+    def __init__(self, object_name: str, fields: Sequence[Dict[str, Any]]):
+        self.object_name = object_name
+        self.source = fields
+        self.names = [field['name'] for field in fields]
+        self.labels = [field.get('label') or '' for field in fields]
+        self.type_names: List[str] = []
+        type_ids: Dict[str, int] = {}
+        self.types = array('H')
+        self.updateable = array('b')
+        self.picklists: Dict[int, List[Dict[str, Any]]] = {}
+        postings: Dict[str, array] = {}
+        for position, field in enumerate(fields):
+            field_type = field.get('type') or ''
+            if field_type not in type_ids:
+                type_ids[field_type] = len(self.type_names)
+                self.type_names.append(field_type)
+            self.types.append(type_ids[field_type])
+            self.updateable.append(1 if field.get('updateable') else 0)
+            if field.get('picklistValues'):
+                self.picklists[position] = field['picklistValues']
+            for word in set(tokenize(field['name']) + tokenize(self.labels[position])):
+                postings.setdefault(word, array('H')).append(position)
+        self._lower_names = [name.lower() for name in self.names]
+        self._lower_labels = [label.lower() for label in self.labels]
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _word_matches(self, word: str) -> Dict[int, int]:
+        """Score by field position for one query word: exact word 3, word prefix 2, close spelling 1"""
+        scores: Dict[int, int] = {}
+        start = bisect_left(self._vocabulary, word)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(word):
+                break
+            for position in self._postings[candidate]:
+                scores[position] = max(scores.get(position, 0), 3 if candidate == word else 2)
+        if not scores and len(word) >= 3:
+            for candidate in difflib.get_close_matches(word, self._vocabulary, n=5, cutoff=0.75):
+                for position in self._postings[candidate]:
+                    scores[position] = 1
+        return scores
+
+    def search(self, query: str = '', types: Optional[Iterable[str]] = None, limit: int = DEFAULT_LIMIT,
+               include_picklist: bool = False) -> List[Dict[str, Any]]:
+        """Fields matching every word of query (all fields for an empty query), best matches first
+
+        A name or label that starts with the whole query ranks above word matches.
+        """
+        type_ids = None
+        if types:
+            wanted = {t.lower() for t in types}
+            type_ids = {i for i, name in enumerate(self.type_names) if name.lower() in wanted}
+
+        lowered = query.strip().lower()
+        if lowered:
+            scores: Optional[Dict[int, int]] = None
+            for word in tokenize(query):
+                matches = self._word_matches(word)
+                scores = matches if scores is None else {p: s + matches[p] for p, s in scores.items() if p in matches}
+            scores = scores or {}
+            for position, name in enumerate(self._lower_names):
+                if name.startswith(lowered) or self._lower_labels[position].startswith(lowered):
+                    scores[position] = scores.get(position, 0) + (100 if name == lowered else 50)
+            ranked = sorted(scores, key=lambda position: (-scores[position], self._lower_names[position]))
+        else:
+            ranked = range(len(self.names))
+
+        results = []
+        for position in ranked:
+            if type_ids is not None and self.types[position] not in type_ids:
+                continue
+            results.append(self.describe(position, include_picklist))
+            if len(results) >= limit:
+                break
+        return results
+
+    def describe(self, position: int, include_picklist: bool = False) -> Dict[str, Any]:
+        """Compact description of the field at position"""
+        field = {
+            "name": self.names[position],
+            "label": self.labels[position],
+            "type": self.type_names[self.types[position]],
+            "updateable": bool(self.updateable[position]),
+        }
+        if include_picklist and position in self.picklists:
+            field["picklistValues"] = [value['value'] for value in self.picklists[position] if value.get('active', True)]
+        return field
+
+
+class SchemaIndex:
+    """Field indexes by object, rebuilt when the describe they were built from is replaced"""
+
+    def __init__(self, max_objects: int = DEFAULT_MAX_OBJECTS):
+        self.max_objects = max_objects
+        self._indexes: "OrderedDict[str, FieldIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, object_name: str, fields: Sequence[Dict[str, Any]]) -> FieldIndex:
+        """Index of object_name for this describe's field list, building it if needed"""
+        with self._lock:
+            index = self._indexes.get(object_name)
+            if index is not None and index.source is fields:
+                self._indexes.move_to_end(object_name)
+                return index
+        index = FieldIndex(object_name, fields)
+        with self._lock:
+            self.builds += 1
+            self._indexes[object_name] = index
+            self._indexes.move_to_end(object_name)
+            while len(self._indexes) > self.max_objects:
+                self._indexes.popitem(last=False)
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"objects": len(self._indexes), "fields": sum(len(i) for i in self._indexes.values()),
+                    "builds": self.builds}
@@ -0,0 +1,146 @@
+"""
+Session stores for the Streamable HTTP transport
+Keep the messages sent on each session's streams so a client whose connection drops can resume
+with Last-Event-ID instead of losing in-flight responses
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from mcp.server.streamable_http import EventCallback, EventId, EventMessage, EventStore, StreamId
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EVENTS = 10000
+DEFAULT_EVENT_TTL_SECONDS = 3600.0
+
+
+class MemorySessionStore(EventStore):
+    """Keeps the most recent events of all streams in process memory"""
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self.max_events = max_events
+        self._events: "OrderedDict[EventId, tuple]" = OrderedDict()
+
+    async def store_event(self, stream_id: StreamId, message: Optional[JSONRPCMessage]) -> EventId:
+        event_id = uuid.uuid4().hex
+        self._events[event_id] = (stream_id, message)
+        while len(self._events) > self.max_events:
+            self._events.popitem(last=False)
+        return event_id
+
+    async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> Optional[StreamId]:
+        if last_event_id not in self._events:
+            logger.warning(f"Event {last_event_id} is no longer stored, nothing to replay")
+            return None
+        stream_id = self._events[last_event_id][0]
+        replaying = False
+        for event_id, (event_stream_id, message) in list(self._events.items()):
+            if replaying and event_stream_id == stream_id and message is not None:
+                await send_callback(EventMessage(message, event_id))
+            replaying = replaying or event_id == last_event_id
+        return stream_id
+
+    def stats(self):
+        return {"backend": "memory", "events": len(self._events)}
+
+    def close(self):
+        self._events.clear()
+
+
+class SqliteSessionStore(EventStore):
+    """Keeps events in a sqlite file that outlives the process and can be shared by local workers
+
+    Events older than ttl seconds are pruned as new ones are stored.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_EVENT_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS mcp_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, stream_id TEXT NOT NULL, message TEXT, created REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS mcp_events_stream ON mcp_events (stream_id, id)")
+        self._stored = 0
+
+    def _store(self, stream_id: StreamId, payload: Optional[str]) -> EventId:
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO mcp_events (stream_id, message, created) VALUES (?, ?, ?)", (stream_id, payload, now)
+            )
+            self._stored += 1
+            if self._stored % 100 == 0:
+                self._connection.execute("DELETE FROM mcp_events WHERE created < ?", (now - self.ttl,))
+            return str(cursor.lastrowid)
+
+    def _events_after(self, last_event_id: EventId):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stream_id FROM mcp_events WHERE id = ?", (int(last_event_id),)
+            ).fetchone()
+            if row is None:
+                return None, []
+            events = self._connection.execute(
+                "SELECT id, message FROM mcp_events WHERE stream_id = ? AND id > ? ORDER BY id",
+                (row[0], int(last_event_id))
+            ).fetchall()
+        return row[0], events
+
+    async def store_event(self, stream_id: StreamId, message: Optional[JSONRPCMessage]) -> EventId:
+        payload = message.model_dump_json(by_alias=True, exclude_none=True) if message is not None else None
+        return await asyncio.to_thread(self._store, stream_id, payload)
+
+    async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> Optional[StreamId]:
+        if not last_event_id.isdigit():
+            return None
+        stream_id, events = await asyncio.to_thread(self._events_after, last_event_id)
+        if stream_id is None:
+            logger.warning(f"Event {last_event_id} is no longer stored, nothing to replay")
+            return None
+        for event_id, payload in events:
+            if payload is not None:
+                await send_callback(EventMessage(JSONRPCMessage.model_validate_json(payload), str(event_id)))
+        return stream_id
+
+    def stats(self):
+        with self._lock:
+            count = self._connection.execute("SELECT COUNT(*) FROM mcp_events").fetchone()[0]
+        return {"backend": "sqlite", "events": count}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def session_store_from_env() -> Optional[EventStore]:
+    """Build the store selected by MCP_SESSION_STORE: memory (default), sqlite or none
+
+    The sqlite file is MCP_SESSION_STORE_PATH (default: mcp_sessions.db in the working directory).
+    """
+    backend = os.getenv('MCP_SESSION_STORE', 'memory').strip().lower()
+    if backend == 'none':
+        return None
+    if backend == 'sqlite':
+        return SqliteSessionStore(
+            os.getenv('MCP_SESSION_STORE_PATH', 'mcp_sessions.db'),
+            ttl=float(os.getenv('MCP_SESSION_STORE_TTL', DEFAULT_EVENT_TTL_SECONDS)),
+        )
+    if backend != 'memory':
+        logger.warning(f"Unknown MCP_SESSION_STORE '{backend}', using memory")
+    return MemorySessionStore(int(os.getenv('MCP_SESSION_STORE_MAX_EVENTS', DEFAULT_MAX_EVENTS)))
@@ -0,0 +1,82 @@
+"""
+Response shaping for SOQL results
+Strips the per-record 'attributes' block and reshapes records into flat rows, columns or CSV
+so less of the payload sent to the client is metadata
+"""
+
+from typing import Any, Dict, List
+import csv
+import io
+import json
+
+OUTPUT_FORMATS = ("raw", "flat", "columnar", "csv")
+
+
+def output_format(arguments: Dict[str, Any]) -> str:
+    """Validated 'format' argument of a tool call, defaulting to raw"""
+    value = arguments.get("format") or "raw"
+    if value not in OUTPUT_FORMATS:
+        raise ValueError(f"'format' must be one of {', '.join(OUTPUT_FORMATS)}")
+    return value
+
+
+def flatten_record(record: Dict[str, Any], drop_nulls: bool = True) -> Dict[str, Any]:
+    """Copy of a record with 'attributes' removed and parent relationships flattened to dotted keys
+
+    {'Account': {'attributes': ..., 'Name': 'Acme'}} becomes {'Account.Name': 'Acme'}. Child
+    relationship subqueries become lists of flattened records. The input is not modified.
+    """
+    flat: Dict[str, Any] = {}
+    _flatten_into(flat, "", record, drop_nulls)
+    return flat
+
+
+def _flatten_into(flat: Dict[str, Any], prefix: str, record: Dict[str, Any], drop_nulls: bool):
+    for key, value in record.items():
+        if key == "attributes":
+            continue
+        if isinstance(value, dict):
+            if "records" in value and "totalSize" in value:
+                flat[prefix + key] = [flatten_record(child, drop_nulls) for child in value["records"]]
+            else:
+                _flatten_into(flat, f"{prefix}{key}.", value, drop_nulls)
+        elif value is not None or not drop_nulls:
+            flat[prefix + key] = value
+
+
+def _columns(rows: List[Dict[str, Any]]) -> List[str]:
+    return list(dict.fromkeys(key for row in rows for key in row))
+
+
+def shape_records(records: List[Dict[str, Any]], fmt: str) -> Any:
+    """Records in the requested format
+
+    raw: unchanged; flat: list of flattened records without nulls; columnar: a field list plus one
+    value array per record; csv: a CSV document with a header row (child lists are JSON-encoded).
+    """
+    if fmt == "raw":
+        return records
+    if fmt == "flat":
+        return [flatten_record(record) for record in records]
+
+    rows = [flatten_record(record, drop_nulls=False) for record in records]
+    fields = _columns(rows)
+    if fmt == "columnar":
+        return {"fields": fields, "rows": [[row.get(field) for field in fields] for row in rows]}
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow([
+            json.dumps(value, separators=(',', ':')) if isinstance(value, list) else value
+            for value in (row.get(field) for field in fields)
+        ])
+    return buffer.getvalue()
+
+
+def shape_result(result: Dict[str, Any], fmt: str) -> Dict[str, Any]:
+    """Query result with its records reshaped; returns a new dict, so cached results stay intact"""
+    if fmt == "raw":
+        return result
+    return {**result, "records": shape_records(result["records"], fmt)}
@@ -0,0 +1,276 @@
+"""
+SOQL pre-flight checks
+A lightweight parser that pulls the object and field references out of a query so they can be checked
+against cached describes before the query is sent, and helpers for REST query explain plans
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import difflib
+import os
+import re
+
+DEFAULT_MAX_COST = 1.0
+
+# Functions whose arguments are field references
+FIELD_FUNCTIONS = frozenset({
+    "AVG", "COUNT", "COUNT_DISTINCT", "MAX", "MIN", "SUM", "GROUPING",
+    "CALENDAR_MONTH", "CALENDAR_QUARTER", "CALENDAR_YEAR", "DAY_IN_MONTH", "DAY_IN_WEEK", "DAY_IN_YEAR",
+    "DAY_ONLY", "FISCAL_MONTH", "FISCAL_QUARTER", "FISCAL_YEAR", "HOUR_IN_DAY", "WEEK_IN_MONTH",
+    "WEEK_IN_YEAR", "CONVERTTIMEZONE", "CONVERTCURRENCY", "FORMAT", "TOLABEL",
+})
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_CLAUSE = re.compile(r'\b(SELECT|FROM|WHERE|WITH|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|OFFSET|FOR)\b', re.IGNORECASE)
+_PATH = r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*'
+_IS_PATH = re.compile(rf'^{_PATH}$')
+_CALL = re.compile(rf'\b([A-Za-z_]\w*)\s*\(\s*({_PATH})?\s*[,)]')
+_CONDITION = re.compile(
+    rf'(?<![\w.:])({_PATH})\s*(?:=|!=|<>|<=|>=|<|>|\b(?:NOT\s+)?(?:LIKE|IN|INCLUDES|EXCLUDES)\b)', re.IGNORECASE)
+
+
+class SoqlParseError(ValueError):
+    """The query is not in a form the pre-flight parser understands; it is sent unchecked"""
+
+
+class SoqlValidationError(ValueError):
+    """The query references objects or fields that do not exist; problems lists each one"""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("Invalid SOQL query: " + "; ".join(problems))
+
+
+class ParsedQuery:
+    """Object and field references of one SELECT, plus the semi-join subqueries of its filters"""
+
+    def __init__(self, object_name: str, alias: Optional[str], fields: List[str], aliases: List[str],
+                 subqueries: List["ParsedQuery"]):
+        self.object_name = object_name
+        self.alias = alias
+        self.fields = fields
+        self.aliases = aliases
+        self.subqueries = subqueries
+
+    def object_names(self) -> List[str]:
+        names = [self.object_name]
+        for subquery in self.subqueries:
+            names.extend(subquery.object_names())
+        return names
+
+
+def _depths(text: str) -> List[int]:
+    depths, depth = [], 0
+    for char in text:
+        if char == '(':
+            depth += 1
+        depths.append(depth)
+        if char == ')':
+            depth -= 1
+    return depths
+
+
+def _split_top_level(text: str, separator: str = ',') -> List[str]:
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def _clauses(text: str) -> Dict[str, str]:
+    """Top-level clause bodies by upper-case keyword"""
+    depths = _depths(text)
+    found = [m for m in _CLAUSE.finditer(text) if depths[m.start()] == 0]
+    clauses = {}
+    for i, match in enumerate(found):
+        keyword = ' '.join(match.group(1).upper().split())
+        end = found[i + 1].start() if i + 1 < len(found) else len(text)
+        clauses.setdefault(keyword, text[match.end():end].strip())
+    return clauses
+
+
+def _extract_subqueries(text: str, subqueries: List[ParsedQuery]) -> str:
+    """Parse (SELECT ...) groups in a filter into subqueries and blank them out of the text"""
+    result, i = [], 0
+    while i < len(text):
+        match = re.match(r'\(\s*SELECT\b', text[i:], re.IGNORECASE)
+        if not match:
+            result.append(text[i])
+            i += 1
+            continue
+        depth, j = 0, i
+        while j < len(text):
+            depth += {'(': 1, ')': -1}.get(text[j], 0)
+            if depth == 0:
+                break
+            j += 1
+        subqueries.append(_parse(text[i + 1:j]))
+        result.append('()')
+        i = j + 1
+    return ''.join(result)
+
+
+def _function_fields(text: str) -> List[str]:
+    return [m.group(2) for m in _CALL.finditer(text) if m.group(2) and m.group(1).upper() in FIELD_FUNCTIONS]
+
+
+def _parse(text: str) -> ParsedQuery:
+    clauses = _clauses(text)
+    if 'SELECT' not in clauses or 'FROM' not in clauses:
+        raise SoqlParseError("Expected SELECT ... FROM ...")
+
+    from_tokens = clauses['FROM'].split()
+    if not from_tokens or not _IS_PATH.match(from_tokens[0]) or '.' in from_tokens[0]:
+        raise SoqlParseError(f"Unsupported FROM clause: {clauses['FROM']}")
+    alias = from_tokens[1] if len(from_tokens) > 1 and from_tokens[1].upper() != 'USING' else None
+
+    fields, aliases, subqueries = [], [], []
+    for item in _split_top_level(clauses['SELECT']):
+        head = re.match(r'\w*', item).group().upper()
+        if item.startswith('(') or head in ('TYPEOF', 'FIELDS'):
+            # Child relationship subqueries, polymorphic TYPEOF and FIELDS() are not checked
+            continue
+        if '(' in item:
+            fields.extend(_function_fields(item))
+            tail = item[item.rfind(')') + 1:].split()
+            aliases.extend(tail[:1])
+            continue
+        tokens = item.split()
+        if not _IS_PATH.match(tokens[0]):
+            raise SoqlParseError(f"Unsupported SELECT item: {item}")
+        fields.append(tokens[0])
+
+    for keyword in ('WHERE', 'HAVING'):
+        if keyword in clauses:
+            condition = _extract_subqueries(clauses[keyword], subqueries)
+            fields.extend(m.group(1) for m in _CONDITION.finditer(condition))
+            fields.extend(_function_fields(condition))
+
+    for keyword in ('GROUP BY', 'ORDER BY'):
+        for item in _split_top_level(re.sub(r'^(ROLLUP|CUBE)\s*\((.*)\)$', r'\2', clauses.get(keyword, ''),
+                                            flags=re.IGNORECASE | re.DOTALL)):
+            if '(' in item:
+                fields.extend(_function_fields(item))
+            elif _IS_PATH.match(item.split()[0]):
+                fields.append(item.split()[0])
+
+    return ParsedQuery(from_tokens[0], alias, list(dict.fromkeys(fields)), aliases, subqueries)
+
+
+def parse_soql(query: str) -> ParsedQuery:
+    """Parse the object and field references of a SOQL query; raises SoqlParseError if it cannot"""
+    return _parse(_STRING.sub("''", query).strip())
+
+
+def suggest(name: str, candidates: Iterable[str]) -> str:
+    """' Did you mean ...?' naming the candidates closest to name, or an empty string"""
+    by_lower = {candidate.lower(): candidate for candidate in candidates}
+    matches = difflib.get_close_matches(name.lower(), list(by_lower), n=3)
+    if not matches:
+        return ""
+    return " Did you mean " + " or ".join(f"'{by_lower[match]}'" for match in matches) + "?"
+
+
+def relationship_names(fields: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Relationship name by lower-case name, derived from the lookup fields (AccountId -> Account, Foo__c -> Foo__r)"""
+    relationships = {}
+    for field in fields:
+        if field.get('type') != 'reference':
+            continue
+        name = field['name']
+        if name.endswith('__c'):
+            relationships[name[:-3].lower() + '__r'] = name[:-3] + '__r'
+        elif name.lower().endswith('id') and len(name) > 2:
+            relationships[name[:-2].lower()] = name[:-2]
+    return relationships
+
+
+def validate_query(parsed: ParsedQuery, fields_for: Callable[[str], Optional[List[Dict[str, Any]]]],
+                   object_names: Optional[Iterable[str]] = None) -> List[str]:
+    """Problems with the object and field references of parsed, with close-match suggestions
+
+    fields_for returns the cached describe fields of an object, or None when the object is not
+    cached, in which case its fields are not checked. object_names, when known, are all the org's
+    objects. Only the first hop of a relationship path is checked.
+    """
+    problems = []
+    known_objects = {name.lower(): name for name in object_names} if object_names is not None else None
+    fields = fields_for(parsed.object_name)
+    if fields is None and known_objects is not None and parsed.object_name.lower() not in known_objects:
+        problems.append(f"Unknown object '{parsed.object_name}'.{suggest(parsed.object_name, known_objects.values())}")
+
+    if fields is not None:
+        names = {field['name'].lower() for field in fields}
+        relationships = relationship_names(fields)
+        allowed = {alias.lower() for alias in parsed.aliases}
+        prefixes = {parsed.object_name.lower()} | ({parsed.alias.lower()} if parsed.alias else set())
+        for path in parsed.fields:
+            parts = path.split('.')
+            if len(parts) > 1 and parts[0].lower() in prefixes and parts[0].lower() not in relationships:
+                parts = parts[1:]
+            head = parts[0].lower()
+            if len(parts) == 1 and (head in names or head in allowed):
+                continue
+            if len(parts) > 1 and head in relationships:
+                continue
+            if len(parts) > 1:
+                problems.append(f"No relationship '{parts[0]}' on {parsed.object_name}."
+                                f"{suggest(parts[0], relationships.values())}")
+            else:
+                problems.append(f"No such field '{parts[0]}' on {parsed.object_name}."
+                                f"{suggest(parts[0], [field['name'] for field in fields])}")
+
+    for subquery in parsed.subqueries:
+        problems.extend(validate_query(subquery, fields_for, object_names))
+    return problems
+
+
+EXPLAIN_MODES = ("warn", "reject")
+
+
+def explain_mode(arguments: Dict[str, Any]) -> Optional[str]:
+    """Validated 'explain' argument of a tool call: None, 'warn' or 'reject' (true means 'warn')"""
+    value = arguments.get("explain")
+    if not value:
+        return None
+    if value is True:
+        return "warn"
+    if value not in EXPLAIN_MODES:
+        raise ValueError(f"'explain' must be one of {', '.join(EXPLAIN_MODES)}")
+    return value
+
+
+def max_cost_from_env() -> float:
+    """Relative cost above which an explained query counts as non-selective (SALESFORCE_EXPLAIN_MAX_COST)"""
+    return float(os.getenv('SALESFORCE_EXPLAIN_MAX_COST', DEFAULT_MAX_COST))
+
+
+def plan_summary(explain_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The plan Salesforce would pick (lowest relative cost) from a REST query explain response"""
+    plans = explain_result.get('plans') or []
+    if not plans:
+        return None
+    best = min(plans, key=lambda plan: plan.get('relativeCost', 0))
+    return {
+        "leadingOperationType": best.get('leadingOperationType'),
+        "relativeCost": best.get('relativeCost'),
+        "cardinality": best.get('cardinality'),
+        "sobjectCardinality": best.get('sobjectCardinality'),
+        "fields": best.get('fields', []),
+        "notes": [note.get('description') for note in best.get('notes', []) if note.get('description')],
+    }
+
+
+def plan_warning(plan: Optional[Dict[str, Any]], max_cost: float) -> Optional[str]:
+    """Warning for a plan above max_cost, or None if the query is selective enough"""
+    if plan is None or (plan.get('relativeCost') or 0) <= max_cost:
+        return None
+    return (f"Query is not selective: {plan['leadingOperationType']} over about {plan.get('sobjectCardinality')} "
+            f"records with relative cost {plan['relativeCost']:g} (threshold {max_cost:g}); "
+            f"filter on an indexed field such as Id, Name, a lookup or an external ID")
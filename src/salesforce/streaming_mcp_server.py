@@ -12,26 +12,39 @@ import logging
 import os
 import uuid
 import argparse
+import re
 import sys
+import time
+from contextlib import asynccontextmanager
 
-import httpx
-from simple_salesforce import Salesforce
-from mcp.server.fastmcp import FastMCP
+from mcp import types
+from mcp.server.fastmcp import Context, FastMCP
 from mcp.server import Server
-import mcp.types as types
 from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.routing import Mount, Route
 from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 import uvicorn
 from dotenv import load_dotenv
 
-from datetime import datetime
-from zoneinfo import ZoneInfo
-
-# Load environment variables first to ensure they're available when needed
-load_dotenv()
+from .bulk import BULK_MODES, BulkConfig, FileSink, SampleSink, SummarySink, prune_output, run_bulk_query
+from .cache import is_cacheable_query, normalize_soql
+from .client import SalesforceClient
+from .metrics import (CONTENT_TYPE, REGISTRY, SSE_SESSIONS, TOOL_RESPONSE_BYTES, content_size, exposition, instrument,
+                      package_version, render_stats)
+from .ratelimit import current_session
+from .registry import ClientRegistry, current_org
+from .transport import session_stats
+from .pagination import RecordBudget, decode_cursor, encode_cursor, positive_int
+from .schema_index import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from .session_store import session_store_from_env
+from .soql import explain_mode, max_cost_from_env, plan_summary, plan_warning
+from .shaping import flatten_record, output_format, shape_records, shape_result
+from .sync import DEFAULT_MAX_RECORDS as DEFAULT_SYNC_MAX_RECORDS, read_changes, sync_store_from_env
+from .tracing import KIND_SERVER, TRACER, JsonLinesExporter
+from .writes import WriteConfig, write_records
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -46,67 +59,69 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
+# Helper modules in this package log through the package logger
+package_logger = logging.getLogger(__package__)
+package_logger.setLevel(logging.INFO)
+if package_logger.hasHandlers():
+    package_logger.handlers.clear()
+package_logger.addHandler(handler)
+package_logger.propagate = False
+logger.propagate = False
+
 # Initialize FastMCP server for Salesforce tools with SSE support
 mcp = FastMCP("salesforce-ss")
 
-# Salesforce Client
-class SalesforceClient:
-    """Salesforce client wrapper"""
-    
-    def __init__(self):
-        self.sf = None
-        self.sobjects_cache = {}
-        self._initialize()
-        
-    def _initialize(self):
-        """Initialize Salesforce connection using environment variables"""
-        try:
-            access_token = os.getenv('SALESFORCE_ACCESS_TOKEN')
-            instance_url = os.getenv('SALESFORCE_INSTANCE_URL')
-            
-            if access_token and instance_url:
-                self.sf = Salesforce(
-                    instance_url=instance_url,
-                    session_id=access_token
-                )
-            else:
-                self.sf = Salesforce(
-                    username=os.getenv('SALESFORCE_USERNAME'),
-                    password=os.getenv('SALESFORCE_PASSWORD'),
-                    security_token=os.getenv('SALESFORCE_SECURITY_TOKEN')
-                )
-            logger.info("Connected to Salesforce successfully")
-        except Exception as e:
-            now_cet = datetime.now(ZoneInfo("Europe/Paris")).strftime("%Y-%m-%d %H:%M:%S")
-            logger.error(f"[{now_cet} CET] Salesforce connection failed: {e}")
-            self.sf = None
-    
-    def get_object_fields(self, object_name):
-        """Get fields for a specific object"""
-        if not self.sf:
-            raise ValueError("Salesforce connection not established.")
-       
-        if object_name not in self.sobjects_cache:
-            sf_object = getattr(self.sf, object_name)
-            fields = sf_object.describe()['fields']
-            filtered_fields = []
-            for field in fields:
-                filtered_fields.append({
-                    'label': field['label'],
-                    'name': field['name'],
-                    'updateable': field['updateable'],
-                    'type': field['type'],
-                    'length': field['length'],
-                    'picklistValues': field['picklistValues']
-                })
-            self.sobjects_cache[object_name] = filtered_fields
-            
-        return self.sobjects_cache[object_name]
-
-# Initialize Salesforce client
-sf_client = SalesforceClient()
+# Salesforce clients, one per configured org. Built on first use rather than at import, so that
+# importing this module neither reads the environment nor logs in.
+registry: Optional[ClientRegistry] = None
+
+# Polling and output settings for bulk_query, also read on first use
+bulk_config: Optional[BulkConfig] = None
+
+# Watermarks of sync_changes subscribers, opened on first use
+sync_store = None
+
+# Routing and job settings for update_records and upsert_records, read on first use
+write_config: Optional[WriteConfig] = None
+
+
+def get_registry() -> ClientRegistry:
+    """Client registry, built from the environment on first use"""
+    global registry
+    if registry is None:
+        registry = ClientRegistry.from_env()
+    return registry
+
+def get_bulk_config() -> BulkConfig:
+    global bulk_config
+    if bulk_config is None:
+        bulk_config = BulkConfig.from_env()
+    return bulk_config
+
+def get_sync_store():
+    global sync_store
+    if sync_store is None:
+        sync_store = sync_store_from_env()
+    return sync_store
+
+def get_write_config() -> WriteConfig:
+    global write_config
+    if write_config is None:
+        write_config = WriteConfig.from_env()
+    return write_config
+
+def __getattr__(name: str):
+    # sf_client, the default org's client, used to be a module global; keep it reachable
+    if name == "sf_client":
+        return get_registry().get()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_client() -> SalesforceClient:
+    """Salesforce client for the org selected by the current MCP session"""
+    return get_registry().current()
 
 @mcp.tool()
+@instrument
 async def get_object_fields(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Retrieves field Names, labels and types for a specific Salesforce object
     
@@ -118,40 +133,297 @@ async def get_object_fields(arguments: Dict[str, Any]) -> Dict[str, Any]:
     if not object_name:
         raise ValueError("Missing 'object_name' argument")
     
-    if not sf_client.sf:
-        raise ValueError("Salesforce connection not established.")
-    
+    client = get_client()
     try:
-        results = sf_client.get_object_fields(object_name)
+        results = await client.object_fields(object_name)
         # The results are already a Python object, not a JSON string
         return {"fields": results}
     except Exception as e:
         logger.error(f"Error getting object fields: {e}")
         raise ValueError(f"Error getting object fields: {e}")
 
+async def read_query_pages(client: SalesforceClient, ctx: Optional[Context], *, query: Optional[str] = None, next_url: Optional[str] = None,
+                           skip: int = 0, page_limit: Optional[int] = None, budget: RecordBudget,
+                           batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Read SOQL result pages one at a time until done, page_limit is reached or the budget is spent
+
+    Each page is reported to the client as a progress notification as soon as it arrives.
+    When reading stops early the result carries a cursor that resumes at the next unread record.
+    """
+    records = []
+    total_size = None
+    cursor_state = None
+    pages = 0
+    fetch_url = next_url
+
+    while True:
+        page = await client.run(client.query_page, query, fetch_url, batch_size)
+        pages += 1
+        total_size = page.get('totalSize', total_size)
+
+        consumed = skip
+        for record in page['records'][skip:]:
+            if not budget.take(record):
+                # Resume by re-reading this page and skipping what was already returned
+                cursor_state = {"next": fetch_url, "skip": consumed} if fetch_url else {"query": query, "skip": consumed}
+                break
+            records.append(record)
+            consumed += 1
+        skip = 0
+
+        if ctx is not None:
+            try:
+                await ctx.report_progress(
+                    len(records), total_size,
+                    message=f"Fetched page {pages}: {len(records)} of {total_size} records"
+                )
+            except Exception as e:
+                # The result may be shared with other callers, so a gone client must not fail the read
+                logger.debug(f"Could not report query progress: {e}")
+
+        if cursor_state or page.get('done', True):
+            break
+        fetch_url = page['nextRecordsUrl']
+        if budget.full or (page_limit is not None and pages >= page_limit):
+            cursor_state = {"next": fetch_url, "skip": 0}
+            break
+
+    result = {
+        "records": records,
+        "totalSize": total_size,
+        "done": cursor_state is None,
+    }
+    if budget.exhausted:
+        result["truncated"] = True
+    if cursor_state:
+        if batch_size:
+            cursor_state["batch_size"] = batch_size
+        result["cursor"] = encode_cursor(cursor_state)
+    return result
+
+@mcp.tool()
+@instrument
+async def get_objects_fields(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieves field Names, labels and types for several Salesforce objects in one call
+    
+    Args:
+        arguments: Dictionary containing:
+            - object_names: List of Salesforce object names (e.g., ['Account', 'Contact'])
+    """
+    object_names = arguments.get("object_names")
+    if isinstance(object_names, str):
+        object_names = [name.strip() for name in object_names.split(",")]
+    if not object_names:
+        raise ValueError("Missing 'object_names' argument")
+    
+    client = get_client()
+    try:
+        fields_by_object, errors = await client.get_objects_fields([name for name in object_names if name])
+        results = {"objects": {name: {"fields": fields} for name, fields in fields_by_object.items()}}
+        if errors:
+            results["errors"] = errors
+        return results
+    except Exception as e:
+        logger.error(f"Error getting object fields: {e}")
+        raise ValueError(f"Error getting object fields: {e}")
+
+@mcp.tool()
+@instrument
+async def search_fields(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Finds fields of a Salesforce object by name or label, returning a short list of compact matches
+    
+    Args:
+        arguments: Dictionary containing:
+            - object_name: The name of the Salesforce object (e.g., 'Account', 'Contact')
+            - query: Optional words to match against field names and labels; prefixes and close spellings
+              match too (e.g., 'billing post' finds BillingPostalCode). Empty lists all fields
+            - types: Optional list of field types to keep (e.g., ['picklist', 'reference'])
+            - include_picklist: Optional; if true, include the active picklist values of matching fields
+            - limit: Optional maximum number of matches (default 20)
+    """
+    object_name = arguments.get("object_name")
+    if not object_name:
+        raise ValueError("Missing 'object_name' argument")
+    types = arguments.get("types")
+    if isinstance(types, str):
+        types = [t.strip() for t in types.split(",") if t.strip()]
+    
+    client = get_client()
+    try:
+        index = await client.field_index(object_name)
+        matches = index.search(arguments.get("query") or "", types=types,
+                               limit=positive_int(arguments, "limit") or DEFAULT_SEARCH_LIMIT,
+                               include_picklist=bool(arguments.get("include_picklist")))
+        return {"object_name": object_name, "total_fields": len(index), "fields": matches}
+    except Exception as e:
+        logger.error(f"Error searching fields: {e}")
+        raise ValueError(f"Error searching fields: {e}")
+
 @mcp.tool()
-async def run_soql_query(arguments: Dict[str, Any]) -> Dict[str, Any]:
+@instrument
+async def run_soql_query(arguments: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
     """Executes a SOQL query against Salesforce
     
     Args:
         arguments: Dictionary containing:
             - query: The SOQL query to execute
+            - paginate: Optional; if true, return only the first batch plus a 'cursor' for fetch_more_records
+            - batch_size: Optional number of records per batch (200-2000)
+            - max_records: Optional cap on the number of records returned
+            - max_bytes: Optional budget for the serialized size of returned records
+            - bypass_cache: Optional; if true, skip the query result cache and the local replica for this call
+            - invalidate_cache: Optional; if true, drop all cached query results for this org user first
+            - format: Optional output format: 'raw' (default), 'flat' (no attributes or nulls, parent fields
+              as dotted keys), 'columnar' (field list plus value arrays) or 'csv'
+            - validate: Optional; if false, skip checking object and field names against cached describes
+            - explain: Optional; 'warn' adds the query plan and a warning for non-selective queries to the
+              result, 'reject' refuses to run them (costs one extra API call)
+            - max_cost: Optional relative plan cost above which a query counts as non-selective (default 1.0)
     """
     query = arguments.get("query")
     if not query:
         raise ValueError("Missing 'query' argument")
+    fmt = output_format(arguments)
+    explain = explain_mode(arguments)
+    
+    client = get_client()
+    max_records = positive_int(arguments, "max_records")
+    max_bytes = positive_int(arguments, "max_bytes")
+    batch_size = positive_int(arguments, "batch_size")
+    page_limit = 1 if arguments.get("paginate") else None
+    
+    def fetch(progress_ctx):
+        budget = RecordBudget(max_records, max_bytes)
+        return read_query_pages(client, progress_ctx, query=query, page_limit=page_limit, budget=budget, batch_size=batch_size)
     
-    if not sf_client.sf:
-        raise ValueError("Salesforce connection not established.")
+    query_cache = client.query_cache
+    if arguments.get("invalidate_cache"):
+        query_cache.invalidate(client.identity)
+    
+    cache_key = None
+    if query_cache.enabled and page_limit is None:
+        normalized = normalize_soql(query)
+        if arguments.get("bypass_cache"):
+            query_cache.bypasses += 1
+        elif is_cacheable_query(normalized):
+            cache_key = query_cache.key(client.identity, normalized, max_records, max_bytes)
     
     try:
-        results = sf_client.sf.query_all(query)
+        if arguments.get("validate", True):
+            await client.check_query(query)
+        
+        # Simple queries against mirrored objects are answered from the local replica
+        if client.replica is not None and page_limit is None and max_bytes is None and not arguments.get("bypass_cache"):
+            local = await client.replica.query(query, max_records)
+            if local is not None:
+                return shape_result(local, fmt)
+        
+        if cache_key is not None:
+            cached, fresh = query_cache.get(cache_key)
+            if cached is not None:
+                if not fresh:
+                    query_cache.refresh_in_background(cache_key, lambda: fetch(None))
+                return shape_result(cached, fmt)
+        
+        plan, warning = None, None
+        if explain:
+            explained = await client.run_shared(("explain", normalize_soql(query)), client.explain_query, query)
+            plan = plan_summary(explained)
+            max_cost = arguments.get("max_cost")
+            warning = plan_warning(plan, float(max_cost) if max_cost is not None else max_cost_from_env())
+            if warning and explain == "reject":
+                raise ValueError(warning)
+        
+        async def fetch_and_cache():
+            results = await fetch(ctx)
+            # Only complete results are cached; cursors point at server-side state that expires
+            if cache_key is not None and "cursor" not in results:
+                query_cache.put(cache_key, results)
+            return results
+        
+        # Identical queries already running share their result; progress goes to the first caller only
+        flight_key = ("query", normalize_soql(query), max_records, max_bytes, batch_size, page_limit)
+        results = shape_result(await client.inflight.run(flight_key, fetch_and_cache), fmt)
+        if plan is not None:
+            results = {**results, "plan": plan}
+            if warning:
+                results["warnings"] = [warning]
         return results
     except Exception as e:
         logger.error(f"Error executing SOQL query: {e}")
         raise ValueError(f"Error executing SOQL query: {e}")
 
 @mcp.tool()
+@instrument
+async def fetch_more_records(arguments: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+    """Fetches the next batch of a paginated SOQL query
+    
+    Args:
+        arguments: Dictionary containing:
+            - cursor: The cursor returned by run_soql_query or a previous fetch_more_records call
+            - max_records: Optional cap on the number of records returned
+            - max_bytes: Optional budget for the serialized size of returned records
+            - format: Optional output format: 'raw' (default), 'flat', 'columnar' or 'csv'
+    """
+    cursor = arguments.get("cursor")
+    if not cursor:
+        raise ValueError("Missing 'cursor' argument")
+    fmt = output_format(arguments)
+    
+    client = get_client()
+    state = decode_cursor(cursor)
+    budget = RecordBudget(positive_int(arguments, "max_records"), positive_int(arguments, "max_bytes"))
+    
+    try:
+        results = await read_query_pages(
+            client, ctx, query=state.get("query"), next_url=state.get("next"), skip=int(state.get("skip", 0)),
+            page_limit=1, budget=budget, batch_size=state.get("batch_size")
+        )
+        return shape_result(results, fmt)
+    except Exception as e:
+        logger.error(f"Error fetching more records: {e}")
+        raise ValueError(f"Error fetching more records: {e}")
+
+@mcp.tool()
+@instrument
+async def bulk_query(arguments: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+    """Runs a SOQL query as a Bulk API 2.0 job, for extracts too large to return inline
+    
+    Args:
+        arguments: Dictionary containing:
+            - query: The SOQL query to execute
+            - mode: Optional; 'summary' (default) returns per-column statistics, 'sample' returns a random
+              subset of the rows, 'file' saves the rows to a CSV file on the server and returns its path
+            - sample_size: Optional number of rows returned in 'sample' mode (default 100)
+            - page_size: Optional maximum number of rows per result page
+    """
+    query = arguments.get("query")
+    if not query:
+        raise ValueError("Missing 'query' argument")
+    mode = arguments.get("mode", "summary")
+    if mode not in BULK_MODES:
+        raise ValueError(f"'mode' must be one of {', '.join(BULK_MODES)}")
+    
+    config = get_bulk_config()
+    if mode == "sample":
+        sink = SampleSink(positive_int(arguments, "sample_size") or 100)
+    elif mode == "file":
+        await asyncio.to_thread(prune_output, config)
+        sink = FileSink(config.output_path(uuid.uuid4().hex))
+    else:
+        sink = SummarySink()
+    
+    client = get_client()
+    try:
+        await client.check_query(query)
+        return await run_bulk_query(client, query, sink, config, ctx=ctx,
+                                    page_size=positive_int(arguments, "page_size"))
+    except Exception as e:
+        logger.error(f"Error running bulk query: {e}")
+        raise ValueError(f"Error running bulk query: {e}")
+
+@mcp.tool()
+@instrument
 async def get_record(arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Retrieves a specific record by ID
     
@@ -159,34 +431,296 @@ async def get_record(arguments: Dict[str, Any]) -> Dict[str, Any]:
         arguments: Dictionary containing:
             - object_name: The name of the Salesforce object (e.g., 'Account', 'Contact')
             - record_id: The ID of the record to retrieve
+            - format: Optional; 'flat' drops attributes and nulls and flattens parent fields to dotted keys
     """
     object_name = arguments.get("object_name")
     record_id = arguments.get("record_id")
     
     if not object_name or not record_id:
         raise ValueError("Missing 'object_name' or 'record_id' argument")
+    fmt = output_format(arguments)
+    if fmt not in ("raw", "flat"):
+        raise ValueError("get_record supports the 'raw' and 'flat' formats")
     
-    if not sf_client.sf:
-        raise ValueError("Salesforce connection not established.")
-    
+    client = get_client()
     try:
-        sf_object = getattr(sf_client.sf, object_name)
-        results = sf_object.get(record_id)
-        return results
+        results = await client.run_shared(("record", object_name, record_id), client.get_record, object_name, record_id)
+        return flatten_record(results) if fmt == "flat" else results
     except Exception as e:
         logger.error(f"Error retrieving record: {e}")
         raise ValueError(f"Error retrieving record: {e}")
 
-def create_starlette_app(mcp_server: Server, *, debug: bool = False) -> Starlette:
-    """Create a Starlette application that can serve the provided mcp server with SSE."""
+@mcp.tool()
+@instrument
+async def get_records(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieves several records by ID in as few API calls as possible
+    
+    Args:
+        arguments: Dictionary containing:
+            - record_ids: List of record IDs, from one or several objects
+            - fields: List of field names to return, or a dictionary of field lists by object name
+            - object_name: Optional; the object all IDs belong to (resolved from each ID's prefix when omitted)
+            - format: Optional output format for the records: 'raw' (default), 'flat', 'columnar' or 'csv'
+    """
+    record_ids = arguments.get("record_ids")
+    fields = arguments.get("fields")
+    if isinstance(record_ids, str):
+        record_ids = [record_id.strip() for record_id in record_ids.split(",")]
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    if not record_ids or not fields:
+        raise ValueError("Missing 'record_ids' or 'fields' argument")
+    fmt = output_format(arguments)
+    
+    client = get_client()
+    try:
+        record_ids = [record_id for record_id in record_ids if record_id]
+        records, errors = await client.get_records(record_ids, fields, arguments.get("object_name"))
+        ordered = [records[record_id] for record_id in dict.fromkeys(record_ids) if record_id in records]
+        results = {"records": shape_records(ordered, fmt)}
+        if errors:
+            results["errors"] = errors
+        return results
+    except Exception as e:
+        logger.error(f"Error retrieving records: {e}")
+        raise ValueError(f"Error retrieving records: {e}")
+
+@mcp.tool()
+@instrument
+async def sync_changes(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the records of an object changed or deleted since the previous sync_changes call
+    
+    Args:
+        arguments: Dictionary containing:
+            - object_name: The name of the Salesforce object (e.g., 'Account', 'Contact')
+            - fields: Optional list of fields to return for changed records; Id and SystemModstamp are always included
+            - subscriber: Optional name under which the position is kept, so several consumers can sync the
+              same object independently (default 'default')
+            - since: Optional ISO 8601 timestamp the first call starts from; without it the first call only
+              records the current position and returns no records
+            - reset: Optional; if true, forget the saved position and start over
+            - include_deleted: Optional; if false, do not report deleted records (saves one API call)
+            - max_records: Optional cap on changed records per call (default 2000); 'has_more' is true when
+              more remain for the next call
+            - format: Optional output format for the changed records: 'raw' (default), 'flat', 'columnar' or 'csv'
+    """
+    object_name = arguments.get("object_name")
+    if not object_name:
+        raise ValueError("Missing 'object_name' argument")
+    fields = arguments.get("fields") or []
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+    fmt = output_format(arguments)
+    
+    client = get_client()
+    try:
+        result = await read_changes(
+            client, get_sync_store(), object_name, fields,
+            subscriber=arguments.get("subscriber") or "default",
+            since=arguments.get("since"),
+            reset=bool(arguments.get("reset")),
+            include_deleted=arguments.get("include_deleted", True) is not False,
+            max_records=positive_int(arguments, "max_records") or DEFAULT_SYNC_MAX_RECORDS,
+        )
+        return {**result, "changed": shape_records(result["changed"], fmt)}
+    except Exception as e:
+        logger.error(f"Error syncing changes: {e}")
+        raise ValueError(f"Error syncing changes: {e}")
+
+async def submit_write(arguments: Dict[str, Any], operation: str, key_field: str, ctx: Optional[Context]) -> Dict[str, Any]:
+    """Shared body of update_records and upsert_records"""
+    object_name = arguments.get("object_name")
+    records = arguments.get("records")
+    if isinstance(records, str):
+        try:
+            records = json.loads(records)
+        except ValueError:
+            raise ValueError("'records' must be a list of records")
+    if not object_name or not records:
+        raise ValueError("Missing 'object_name' or 'records' argument")
+    if not isinstance(records, list):
+        raise ValueError("'records' must be a list of records")
+    background = arguments.get("background")
+    
+    client = get_client()
+    try:
+        return await write_records(
+            client, operation, object_name, records, key_field,
+            config=get_write_config(), bulk_config=get_bulk_config(),
+            all_or_none=bool(arguments.get("all_or_none")), api=arguments.get("api") or "auto",
+            background=None if background is None else bool(background), ctx=ctx,
+        )
+    except Exception as e:
+        logger.error(f"Error writing records: {e}")
+        raise ValueError(f"Error writing records: {e}")
+
+@mcp.tool()
+@instrument
+async def update_records(arguments: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+    """Updates records of one Salesforce object by ID, batching them into as few API calls as possible
+    
+    Args:
+        arguments: Dictionary containing:
+            - object_name: The name of the Salesforce object (e.g., 'Account', 'Contact')
+            - records: List of records, each with its Id and the fields to change
+              (e.g., [{'Id': '001...', 'Phone': '555-0100'}]); null clears a field
+            - all_or_none: Optional; if true, each request of up to 200 records is rolled back when any of its records fails
+            - api: Optional; 'auto' (default) sends up to 2000 records as sObject Collections requests of 200 and
+              more as a Bulk API 2.0 job; 'collections' or 'bulk' force one
+            - background: Optional; if true, return a job_id at once and write in the background; poll it with
+              get_write_job. By default Bulk API writes and writes of more than 1000 records run in the background
+    """
+    return await submit_write(arguments, "update", "Id", ctx)
+
+@mcp.tool()
+@instrument
+async def upsert_records(arguments: Dict[str, Any], ctx: Context = None) -> Dict[str, Any]:
+    """Creates or updates records of one Salesforce object matched by an external ID field
+    
+    Args:
+        arguments: Dictionary containing:
+            - object_name: The name of the Salesforce object (e.g., 'Account', 'Contact')
+            - external_id_field: The external ID field records are matched on (e.g., 'External_Id__c'), or 'Id'
+            - records: List of records, each with its external ID and the fields to set; a lookup can be set by
+              the parent's external ID (e.g., {'Account': {'External_Id__c': 'A-1'}})
+            - all_or_none: Optional; if true, each request of up to 200 records is rolled back when any of its records fails
+            - api: Optional; 'auto' (default), 'collections' or 'bulk', as for update_records
+            - background: Optional; if true, return a job_id at once and write in the background, as for update_records
+    """
+    external_id_field = arguments.get("external_id_field")
+    if not external_id_field:
+        raise ValueError("Missing 'external_id_field' argument")
+    return await submit_write(arguments, "upsert", external_id_field, ctx)
+
+@mcp.tool()
+@instrument
+async def get_write_job(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the state of a background update_records or upsert_records job, with its result once it has finished
+    
+    Args:
+        arguments: Dictionary containing:
+            - job_id: The job_id returned by update_records or upsert_records
+    """
+    job_id = arguments.get("job_id")
+    if not job_id:
+        raise ValueError("Missing 'job_id' argument")
+    
+    job = get_client().write_jobs.get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown write job '{job_id}'; jobs are kept by the server process that started them")
+    return job.to_dict()
+
+# JSON-RPC id of a response in an SSE message: data: {"jsonrpc":"2.0","id":7,"result":...
+_RESPONSE_ID = re.compile(rb'"id":("?)([^,"]*)\1,"(?:result|error)"')
+
+def trace_tool_calls(mcp_server: Server):
+    """Trace each tools/call request from the MCP request handler down, including argument validation
+    and result conversion; on SSE sessions the trace also covers writing the response
+
+    The size of each successful result is counted here, from the content FastMCP already encoded,
+    so results are not serialized a second time to measure them.
+    """
+    handler = mcp_server.request_handlers.get(types.CallToolRequest)
+    if handler is None or getattr(handler, "traced", False):
+        return
+    
+    async def traced(request: types.CallToolRequest):
+        session = current_session.get()
+        attributes = {"mcp.tool": request.params.name, "mcp.session": session, "salesforce.org": current_org.get() or "default"}
+        with TRACER.span("tools/call", attributes, KIND_SERVER) as span:
+            if session and session.startswith("sse:"):
+                try:
+                    span.trace.write_key = (session, str(mcp_server.request_context.request_id))
+                except LookupError:
+                    pass
+            result = await handler(request)
+            if getattr(result.root, "isError", False):
+                span.error = next((content.text for content in result.root.content if content.type == "text"), "error")
+            else:
+                size = content_size(result.root.content)
+                span.set_attribute("response.bytes", size)
+                TOOL_RESPONSE_BYTES.inc(size, tool=request.params.name)
+        return result
+    
+    traced.traced = True
+    mcp_server.request_handlers[types.CallToolRequest] = traced
+
+def requested_org(request: Request) -> Optional[str]:
+    """Org alias a client asked for with ?org=<alias> or an X-Salesforce-Org header"""
+    org = request.query_params.get("org") or request.headers.get("x-salesforce-org")
+    return org.lower() if org else None
+
+def unknown_org_response(org: str) -> Response:
+    return Response(
+        content=json.dumps({"status": "error", "message": f"Unknown Salesforce org '{org}'"}),
+        status_code=404,
+        media_type="application/json"
+    )
+
+class StreamableHTTPEndpoint:
+    """ASGI endpoint handing /mcp requests to the session manager with the requested org selected"""
+
+    def __init__(self, session_manager: StreamableHTTPSessionManager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send):
+        org = requested_org(Request(scope, receive))
+        if org and org not in get_registry():
+            await unknown_org_response(org)(scope, receive, send)
+            return
+        
+        # A new session's server task is started from this request, so it keeps the org for its lifetime.
+        # The rate limiter keys sessions by their initializing connection; stateless requests by their own.
+        org_token = current_org.set(org)
+        client = scope.get("client") or ("unknown", 0)
+        session_token = current_session.set(f"http:{client[0]}:{client[1]}")
+        try:
+            await self.session_manager.handle_request(scope, receive, send)
+        finally:
+            current_session.reset(session_token)
+            current_org.reset(org_token)
+
+def create_starlette_app(mcp_server: Server, *, debug: bool = False, stateless: bool = False,
+                         enable_sse: bool = True) -> Starlette:
+    """Create a Starlette application that serves the provided mcp server over SSE and Streamable HTTP.
+    
+    In stateless mode every /mcp request is handled by a fresh transport, so requests can be spread
+    across workers and replicas without sticky sessions.
+    """
+    TRACER.configure_from_env()
+    trace_tool_calls(mcp_server)
     sse = SseServerTransport("/messages/")
+    event_store = None if stateless else session_store_from_env()
+    session_manager = StreamableHTTPSessionManager(
+        app=mcp_server,
+        event_store=event_store,
+        stateless=stateless,
+    )
 
     async def handle_sse(request: Request) -> Response:
+        # Clients pick an org with /sse?org=<alias> or an X-Salesforce-Org header
+        org = requested_org(request)
+        if org and org not in get_registry():
+            return unknown_org_response(org)
+        
+        session = f"sse:{uuid.uuid4().hex}"
+        org_token = current_org.set(org)
+        session_token = current_session.set(session)
+        
+        async def send(message):
+            await request._send(message)
+            # Close the trace of a tool call once its response is on the wire
+            if message["type"] == "http.response.body" and TRACER.awaiting_writes:
+                match = _RESPONSE_ID.search(message.get("body", b"")[:300])
+                if match:
+                    TRACER.written((session, match.group(2).decode()), time.time_ns())
+        
+        SSE_SESSIONS.inc()
         try:
             async with sse.connect_sse(
                     request.scope,
                     request.receive,
-                    request._send,
+                    send,
             ) as (read_stream, write_stream):
                 await mcp_server.run(
                     read_stream,
@@ -195,17 +729,39 @@ def create_starlette_app(mcp_server: Server, *, debug: bool = False) -> Starlett
                 )
         except Exception as e:
             logger.error(f"SSE handler crashed: {e}")
+        finally:
+            SSE_SESSIONS.dec()
+            current_session.reset(session_token)
+            current_org.reset(org_token)
         return Response(status_code=204)  # No Content
     
+    def readiness() -> Optional[Dict[str, str]]:
+        """None once the default org is connected and describe warmups are done, else the reason why not"""
+        registry = get_registry()
+        if registry.get().sf is None:
+            return {"status": "starting", "message": "Salesforce connection not established"}
+        if not all(client.warmup_complete for client in registry.clients().values()):
+            return {"status": "starting", "message": "Describe cache warmup in progress"}
+        return None
+    
     async def handle_health_check(request: Request) -> Response:
-        """Health check endpoint for Docker container health checks"""
-        # Check if Salesforce connection is active
-        if sf_client.sf is None:
-            return Response(
-                content=json.dumps({"status": "error", "message": "Salesforce connection not established"}),
-                status_code=503,
-                media_type="application/json"
-            )
+        """Liveness endpoint for Docker container health checks; answers as soon as the server runs"""
+        return Response(
+            content=json.dumps({
+                "status": "ok",
+                "service": "mcp-salesforce-server",
+                "ready": readiness() is None,
+                "timestamp": datetime.now().isoformat()
+            }),
+            status_code=200,
+            media_type="application/json"
+        )
+    
+    async def handle_readiness_check(request: Request) -> Response:
+        """Readiness endpoint; 503 until the Salesforce login and describe warmup have finished"""
+        not_ready = readiness()
+        if not_ready is not None:
+            return Response(content=json.dumps(not_ready), status_code=503, media_type="application/json")
         
         return Response(
             content=json.dumps({"status": "ok", "service": "mcp-salesforce-server", "timestamp": datetime.now().isoformat()}),
@@ -213,63 +769,206 @@ def create_starlette_app(mcp_server: Server, *, debug: bool = False) -> Starlett
             media_type="application/json"
         )
     
-    async def handle_metrics(request: Request) -> Response:
-        """Metrics endpoint for monitoring in Docker environment"""
+    async def handle_debug_slow(request: Request) -> Response:
+        """Slowest recent tool calls with their time breakdown; ?limit=N returns the N slowest"""
+        limit = request.query_params.get("limit")
         return Response(
             content=json.dumps({
-                "service": "mcp-salesforce-server",
-                "status": "active",
-                "timestamp": datetime.now().isoformat(),
-                "salesforce_connected": sf_client.sf is not None,
-                "version": "0.1.8"  # Get this from package version
-            }),
+                "threshold_seconds": TRACER.slow_threshold,
+                "stats": TRACER.stats(),
+                "calls": TRACER.slow_calls(int(limit) if limit and limit.isdigit() else None),
+            }, default=str),
             status_code=200,
             media_type="application/json"
         )
+    
+    async def handle_metrics(request: Request) -> Response:
+        """Prometheus metrics endpoint; /metrics?format=json returns the raw per-org stats"""
+        registry = get_registry()
+        clients = registry.clients()
+        components = {
+            "client": {alias: client.stats() for alias, client in clients.items()},
+            "executor": {alias: client.executor.stats() for alias, client in clients.items()},
+            "describe_cache": {alias: client.describe_cache.stats() for alias, client in clients.items()},
+            "query_cache": {alias: client.query_cache.stats() for alias, client in clients.items()},
+            "transport": {alias: session_stats(client.session) for alias, client in clients.items()},
+            "rate_limit": {alias: client.rate_limiter.stats() for alias, client in clients.items()},
+            "coalesce": {alias: client.inflight.stats() for alias, client in clients.items()},
+            "schema_index": {alias: client.schema_index.stats() for alias, client in clients.items()},
+            "replica": {alias: client.replica.stats() for alias, client in clients.items() if client.replica},
+            "write_jobs": {alias: client.write_jobs.stats() for alias, client in clients.items()},
+        }
+        # The session store is shared by all orgs of the process, so it is not labelled by org
+        session_store = await asyncio.to_thread(event_store.stats) if event_store is not None else None
+        
+        if request.query_params.get("format") == "json":
+            return Response(
+                content=json.dumps({
+                    "service": "mcp-salesforce-server",
+                    "status": "active",
+                    "timestamp": datetime.now().isoformat(),
+                    "salesforce_connected": registry.get().sf is not None,
+                    "orgs": {
+                        alias: {component: stats[alias] for component, stats in components.items() if alias in stats}
+                        for alias in clients
+                    },
+                    "session_store": session_store,
+                    "version": package_version()
+                }),
+                status_code=200,
+                media_type="application/json"
+            )
+        
+        info = [
+            "# HELP mcp_salesforce_info Server build information",
+            "# TYPE mcp_salesforce_info gauge",
+            f'mcp_salesforce_info{{version="{package_version()}"}} 1',
+        ]
+        sections = [info, REGISTRY.render()]
+        if session_store is not None:
+            sections.append([
+                "# HELP mcp_session_store_events Stream events kept for /mcp resumption",
+                "# TYPE mcp_session_store_events gauge",
+                f'mcp_session_store_events{{backend="{session_store["backend"]}"}} {session_store["events"]}',
+            ])
+        sections.extend(render_stats(component, stats) for component, stats in components.items())
+        return Response(content=exposition(sections), status_code=200, media_type=CONTENT_TYPE)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        # The default org logs in and warms up in the background so the server starts serving at once
+        registry = get_registry()
+        registry.get()
+        warmup_objects = [name.strip() for name in os.getenv('SALESFORCE_DESCRIBE_WARMUP', '').split(',') if name.strip()]
+        startup_tasks = []
+        for client in registry.clients().values():
+            client.warmup_complete = not warmup_objects
+
+            async def start(client=client):
+                try:
+                    if await client.connect() and warmup_objects:
+                        await client.warm_up(warmup_objects)
+                finally:
+                    client.warmup_complete = True
+                # Refreshes that fail, e.g. before the login succeeds, are retried on the next interval
+                if client.replica is not None:
+                    client.replica.start()
 
-    return Starlette(
-        debug=debug,
-        routes=[
+            startup_tasks.append(asyncio.create_task(start()))
+
+        async def flush_describe_caches(interval: float):
+            # Clients of other orgs are created on first use, so every pass looks them up again
+            while True:
+                await asyncio.sleep(interval)
+                for client in registry.clients().values():
+                    await asyncio.to_thread(client.describe_cache.flush)
+
+        startup_tasks.append(asyncio.create_task(flush_describe_caches(registry.get().describe_cache.flush_interval)))
+        try:
+            async with session_manager.run():
+                yield
+        finally:
+            for task in startup_tasks:
+                task.cancel()
+            for client in registry.clients().values():
+                await client.write_jobs.close()
+                if client.replica is not None:
+                    await client.replica.stop()
+                await asyncio.to_thread(client.describe_cache.flush)
+            if event_store is not None:
+                await asyncio.to_thread(event_store.close)
+
+    routes = [
+        Route("/mcp", endpoint=StreamableHTTPEndpoint(session_manager)),
+        Route("/health", endpoint=handle_health_check),
+        Route("/health/ready", endpoint=handle_readiness_check),
+        Route("/metrics", endpoint=handle_metrics),
+        Route("/debug/slow", endpoint=handle_debug_slow),
+    ]
+    if enable_sse:
+        routes += [
             Route("/sse", endpoint=handle_sse),
-            Route("/health", endpoint=handle_health_check),
-            Route("/metrics", endpoint=handle_metrics),
             Mount("/messages/", app=sse.handle_post_message),
-        ],
-    )
+        ]
+    return Starlette(debug=debug, lifespan=lifespan, routes=routes)
 
 def setup_app() -> Starlette:
     """
     Set up and return the Starlette application for the Salesforce MCP Server.
     This function can be used both for direct execution and for WSGI/ASGI servers in Docker.
+    
+    With MCP_WORKERS > 1 each worker process builds its own app, so /mcp runs stateless and /sse,
+    whose sessions live in a single process, is not served.
     """
+    load_dotenv()
+    
     # Get the actual MCP server from the FastMCP wrapper
     mcp_server = mcp._mcp_server
     
-    # Bind SSE request handling to MCP server
-    return create_starlette_app(mcp_server, debug=True)
+    workers = int(os.getenv('MCP_WORKERS', '1') or 1)
+    stateless = workers > 1 or os.getenv('MCP_STATELESS_HTTP', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Bind SSE and Streamable HTTP request handling to MCP server
+    return create_starlette_app(mcp_server, debug=True, stateless=stateless, enable_sse=workers == 1)
 
 def main():
     """Main entry point for the application"""
+    # Load environment variables before anything reads them; worker processes inherit them
+    load_dotenv()
+    
     parser = argparse.ArgumentParser(description='Run Salesforce MCP SSE-based server')
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
     parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
     parser.add_argument('--log-level', default='info', help='Logging level (debug, info, warning, error)')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MCP_WORKERS', '1') or 1),
+                        help='Number of worker processes; more than one implies --stateless and disables /sse')
+    parser.add_argument('--stateless', action='store_true',
+                        help='Serve /mcp without server-side sessions so requests can go to any worker or replica')
+    parser.add_argument('--transport', choices=['http', 'stdio'], default='http',
+                        help='Serve over HTTP (/mcp and /sse) or over stdin/stdout for local MCP clients')
     args = parser.parse_args()
     
+    # Worker processes build their own app through setup_app(), so settings travel via the environment
+    os.environ['MCP_WORKERS'] = str(max(1, args.workers))
+    if args.stateless:
+        os.environ['MCP_STATELESS_HTTP'] = 'true'
+    
     # Configure logging level
     log_level = getattr(logging, args.log_level.upper(), logging.INFO)
     logger.setLevel(log_level)
     
+    package_logger.setLevel(log_level)
+    
     # Also set root logger level
     logging.getLogger().setLevel(log_level)
     
-    starlette_app = setup_app()
+    if args.transport == 'stdio':
+        # stdout carries the protocol, so logs and exported traces go to stderr
+        handler.setStream(sys.stderr)
+        TRACER.configure_from_env()
+        if TRACER.exporter is not None and TRACER.exporter.target == "stdout":
+            TRACER.exporter = JsonLinesExporter("stderr")
+        trace_tool_calls(mcp._mcp_server)
+        try:
+            mcp.run('stdio')
+        finally:
+            for client in get_registry().clients().values():
+                client.describe_cache.flush()
+        return
     
     print(f"Starting Salesforce MCP Server with streaming on http://{args.host}:{args.port}")
-    print(f"SSE endpoint available at http://{args.host}:{args.port}/sse")
+    print(f"Streamable HTTP endpoint available at http://{args.host}:{args.port}/mcp")
+    if args.workers > 1:
+        logger.warning(f"Running {args.workers} stateless workers; the /sse endpoint is disabled")
+    else:
+        print(f"SSE endpoint available at http://{args.host}:{args.port}/sse")
 
     try:
-        uvicorn.run(starlette_app, host=args.host, port=args.port)
+        if args.workers > 1:
+            uvicorn.run(f"{__package__}.streaming_mcp_server:setup_app", factory=True, host=args.host,
+                        port=args.port, workers=args.workers)
+        else:
+            uvicorn.run(setup_app(), host=args.host, port=args.port)
     except KeyboardInterrupt:
         print("Server stopped by user")
         sys.exit(0)
@@ -0,0 +1,280 @@
+"""
+Incremental change tracking
+Keeps a watermark per object and subscriber so each sync returns only the records changed (read with a
+SystemModstamp filter) or deleted (read with getDeleted) since that subscriber's previous sync
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+from simple_salesforce.exceptions import SalesforceError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RECORDS = 2000
+
+# Seconds re-read behind the watermark, so changes that commit with an earlier SystemModstamp than
+# ones already returned are still picked up
+DEFAULT_OVERLAP_SECONDS = 60.0
+
+# getDeleted only reaches back this far and works in whole minutes
+DELETED_RETENTION = timedelta(days=30)
+DELETED_MIN_INTERVAL = timedelta(minutes=1)
+
+# One lock per subscription, held from reading its position to saving the new one
+_subscription_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _subscription_lock(key: str) -> asyncio.Lock:
+    lock = _subscription_locks.get(key)
+    if lock is None:
+        lock = _subscription_locks[key] = asyncio.Lock()
+    return lock
+
+
+def parse_datetime(value: str) -> datetime:
+    """Aware datetime from a Salesforce or ISO 8601 timestamp, e.g. '2024-05-01T12:00:00.000+0000' or '...Z'"""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def soql_datetime(value: datetime) -> str:
+    """SOQL datetime literal, which has no fractional seconds"""
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class SyncState:
+    """Where one subscriber's sync of one object stands
+
+    watermark is the latest SystemModstamp returned. seen holds the SystemModstamp of each record
+    returned within the overlap window behind it, so re-read records are not returned twice; older
+    entries are compacted away, so the state grows with the change rate rather than the object size.
+    """
+
+    __slots__ = ("watermark", "deleted_watermark", "seen")
+
+    def __init__(self, watermark: datetime, deleted_watermark: datetime, seen: Optional[Dict[str, str]] = None):
+        self.watermark = watermark
+        self.deleted_watermark = deleted_watermark
+        self.seen = seen or {}
+
+    def window_start(self, overlap: float) -> datetime:
+        """Where the next read starts: overlap seconds behind the watermark, in whole seconds"""
+        return (self.watermark - timedelta(seconds=overlap)).replace(microsecond=0)
+
+    def compact(self, overlap: float):
+        start = self.window_start(overlap)
+        self.seen = {record_id: stamp for record_id, stamp in self.seen.items() if parse_datetime(stamp) >= start}
+
+    def to_json(self) -> str:
+        return json.dumps({"watermark": self.watermark.isoformat(), "deleted_watermark": self.deleted_watermark.isoformat(),
+                           "seen": self.seen}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "SyncState":
+        data = json.loads(payload)
+        return cls(parse_datetime(data["watermark"]), parse_datetime(data["deleted_watermark"]), data["seen"])
+
+
+class MemorySyncStore:
+    """Keeps sync states in process memory"""
+
+    def __init__(self):
+        self._states: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[SyncState]:
+        payload = self._states.get(key)
+        return SyncState.from_json(payload) if payload is not None else None
+
+    def put(self, key: str, state: SyncState):
+        self._states[key] = state.to_json()
+
+    def delete(self, key: str):
+        self._states.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "subscriptions": len(self._states),
+                "bytes": sum(len(payload) for payload in self._states.values())}
+
+
+class SqliteSyncStore:
+    """Keeps sync states in a sqlite file, one row per subscription, so watermarks survive restarts and
+    are shared by local workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[SyncState]:
+        with self._lock:
+            row = self._connection.execute("SELECT state FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return SyncState.from_json(row[0]) if row is not None else None
+
+    def put(self, key: str, state: SyncState):
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO sync_state (key, state, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                (key, state.to_json(), time.time())
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, size = self._connection.execute("SELECT COUNT(*), TOTAL(LENGTH(state)) FROM sync_state").fetchone()
+        return {"backend": "sqlite", "subscriptions": count, "bytes": int(size)}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def sync_store_from_env():
+    """Build the store selected by SALESFORCE_SYNC_STORE: memory (default) or sqlite
+
+    The sqlite file is SALESFORCE_SYNC_STORE_PATH (default: salesforce_sync.db in the working directory).
+    """
+    backend = os.getenv('SALESFORCE_SYNC_STORE', 'memory').strip().lower()
+    if backend == 'sqlite':
+        return SqliteSyncStore(os.getenv('SALESFORCE_SYNC_STORE_PATH', 'salesforce_sync.db'))
+    if backend != 'memory':
+        logger.warning(f"Unknown SALESFORCE_SYNC_STORE '{backend}', using memory")
+    return MemorySyncStore()
+
+
+def overlap_from_env() -> float:
+    """Seconds re-read behind each watermark (SALESFORCE_SYNC_OVERLAP)"""
+    return float(os.getenv('SALESFORCE_SYNC_OVERLAP', DEFAULT_OVERLAP_SECONDS))
+
+
+def changes_query(object_name: str, fields: List[str], since: datetime) -> str:
+    """SOQL for the records of object_name modified at or after since, oldest first"""
+    select = ", ".join(dict.fromkeys(["Id", "SystemModstamp", *fields]))
+    return (f"SELECT {select} FROM {object_name} WHERE SystemModstamp >= {soql_datetime(since)} "
+            f"ORDER BY SystemModstamp, Id")
+
+
+async def _read_changed(client, state: SyncState, query: str,
+                        max_records: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Records of query not yet returned to the subscriber, advancing the watermark past each one
+
+    Returns the records and whether more may remain.
+    """
+    changed = []
+    page = await client.run(client.query_page, query=query)
+    while True:
+        for record in page['records']:
+            stamp = record['SystemModstamp']
+            if state.seen.get(record['Id']) == stamp:
+                continue
+            if max_records is not None and len(changed) >= max_records:
+                return changed, True
+            state.seen[record['Id']] = stamp
+            state.watermark = max(state.watermark, parse_datetime(stamp))
+            changed.append(record)
+        if page.get('done', True) or not page.get('nextRecordsUrl'):
+            return changed, False
+        page = await client.run(client.query_page, next_url=page['nextRecordsUrl'])
+
+
+async def _read_deleted(client, state: SyncState, object_name: str, now: datetime,
+                        warnings: List[str]) -> List[Dict[str, Any]]:
+    """Records deleted since the deleted watermark, advancing it to the end of the window Salesforce covered"""
+    start = state.deleted_watermark
+    if now - start < DELETED_MIN_INTERVAL:
+        return []
+    if now - start > DELETED_RETENTION:
+        start = now - DELETED_RETENTION + DELETED_MIN_INTERVAL
+        warnings.append(f"getDeleted only covers the last 30 days; deletions before {start.isoformat()} are not reported")
+    try:
+        result = await client.run(client.get_deleted, object_name, start, now)
+    except SalesforceError as e:
+        warnings.append(f"Deleted records of {object_name} could not be read: {e}")
+        return []
+    earliest = result.get('earliestDateAvailable')
+    if earliest and parse_datetime(earliest) > start:
+        warnings.append(f"Deleted records are only available from {earliest}; earlier deletions may be missing")
+    covered = result.get('latestDateCovered')
+    state.deleted_watermark = parse_datetime(covered) if covered else now
+    return [{"Id": deleted['id'], "deletedDate": deleted['deletedDate']} for deleted in result.get('deletedRecords', [])]
+
+
+async def read_changes(client, store, object_name: str, fields: Optional[List[str]] = None, *,
+                       subscriber: str = "default", since: Optional[str] = None, reset: bool = False,
+                       include_deleted: bool = True, max_records: Optional[int] = DEFAULT_MAX_RECORDS,
+                       overlap: Optional[float] = None) -> Dict[str, Any]:
+    """Changes to object_name since subscriber's previous call, then save the subscriber's new position
+
+    The first call starts at since if given. Without it, the first call only records the current
+    position and returns no records. State is saved only after a call succeeds, so a failed call
+    is repeated in full by the next one. Concurrent calls for one subscription with the same
+    arguments share one read; calls with other arguments wait for it and continue from its position.
+    """
+    key = f"{client.alias}:{object_name.lower()}:{subscriber}"
+    overlap = overlap_from_env() if overlap is None else overlap
+
+    async def sync():
+        async with _subscription_lock(key):
+            return await read()
+
+    async def read():
+        if reset:
+            await asyncio.to_thread(store.delete, key)
+        state = await asyncio.to_thread(store.get, key)
+        now = datetime.now(timezone.utc)
+        initialized = state is None
+        if state is None:
+            start = parse_datetime(since) if since else now
+            state = SyncState(start, start)
+
+        warnings: List[str] = []
+        deleted: List[Dict[str, Any]] = []
+        if initialized and not since:
+            # Mark what changed just before now as seen, so the next call does not return it
+            await _read_changed(client, state, changes_query(object_name, [], state.window_start(overlap)), None)
+            changed, has_more = [], False
+        else:
+            query = changes_query(object_name, fields or [], state.window_start(overlap))
+            await client.check_query(query)
+            changed, has_more = await _read_changed(client, state, query, max_records)
+            if include_deleted:
+                deleted = await _read_deleted(client, state, object_name, now, warnings)
+
+        state.compact(overlap)
+        await asyncio.to_thread(store.put, key, state)
+        result = {
+            "object_name": object_name,
+            "subscriber": subscriber,
+            "initialized": initialized,
+            "changed": changed,
+            "deleted": deleted,
+            "has_more": has_more,
+            "watermark": state.watermark.isoformat(),
+            "deleted_watermark": state.deleted_watermark.isoformat(),
+        }
+        if warnings:
+            result["warnings"] = warnings
+        return result
+
+    # Calls that ask for other fields, limits or a different start must not receive this read's result
+    arguments = (tuple(fields or []), since, reset, include_deleted, max_records, overlap)
+    return await client.inflight.run(("sync", key, arguments), sync)
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+import asyncio
+import csv
+import os
+import time
+
+import pytest
+
+from . import streaming_mcp_server as server
+from .bulk import BulkConfig, iter_csv_lines, prune_output
+from .mock_salesforce import MockSalesforce
+
+
+@pytest.fixture
+def mock(monkeypatch, tmp_path):
+    with MockSalesforce() as mock:
+        mock.add_records("Opportunity", [
+            {"Id": f"006{i:015d}", "Name": f"Deal, \"{i}\"\nline two", "Amount": i * 10} for i in range(250)
+        ])
+        monkeypatch.setattr(server.sf_client, "sf", mock.salesforce())
+        monkeypatch.setattr(server, "bulk_config", BulkConfig(poll_interval=0.01, timeout=5, output_dir=str(tmp_path)))
+        yield mock
+
+
+def test_csv_lines_survive_chunk_boundaries():
+    text = 'Id,Name\n1,"a\nb"\n2,c\n'
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert list(csv.reader(iter_csv_lines(chunks))) == [["Id", "Name"], ["1", "a\nb"], ["2", "c"]]
+
+
+def test_summary_streams_every_page(mock):
+    result = asyncio.run(server.bulk_query({"query": "SELECT Id, Name, Amount FROM Opportunity", "page_size": 100}))
+
+    assert result["totalSize"] == 250
+    assert result["pages"] == 3
+    assert result["columns"] == ["Id", "Name", "Amount"]
+    assert result["summary"]["Amount"] == {"non_empty": 250, "distinct": 250, "min": 0, "max": 2490, "sum": 311250}
+    assert "min" not in result["summary"]["Name"]
+
+
+def test_sample_and_file_modes(mock):
+    query = "SELECT Id, Name FROM Opportunity"
+    sample = asyncio.run(server.bulk_query({"query": query, "mode": "sample", "sample_size": 5}))
+    assert len(sample["records"]) == 5
+    assert all(record["Name"].endswith("\nline two") for record in sample["records"])
+
+    saved = asyncio.run(server.bulk_query({"query": query, "mode": "file", "page_size": 100}))
+    with open(saved["path"], newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Id", "Name"]
+    assert rows[1:] == [[f"006{i:015d}", f"Deal, \"{i}\"\nline two"] for i in range(250)]
+
+
+def test_progress_failures_do_not_fail_the_job(mock):
+    async def report_progress(*args, **kwargs):
+        raise RuntimeError("client went away")
+
+    mock.bulk_polls = 3
+    ctx = SimpleNamespace(report_progress=report_progress)
+    result = asyncio.run(server.bulk_query({"query": "SELECT Id FROM Opportunity"}, ctx))
+    assert result["totalSize"] == 250
+
+
+def test_old_and_excess_result_files_are_pruned(tmp_path):
+    config = BulkConfig(output_dir=str(tmp_path), output_max_age=3600, output_max_bytes=25)
+    now = time.time()
+    for name, age in [("expired", 7200), ("oldest", 300), ("older", 200), ("newest", 100)]:
+        with open(config.output_path(name), "w") as f:
+            f.write("x" * 10)
+        os.utime(config.output_path(name), (now - age, now - age))
+    (tmp_path / "notes.csv").write_text("kept")
+
+    assert prune_output(config) == 2
+    assert sorted(os.listdir(tmp_path)) == ["bulk-newest.csv", "bulk-older.csv", "notes.csv"]
+
+
+def test_job_is_aborted_when_polling_times_out(mock, monkeypatch):
+    mock.bulk_polls = 1000
+    monkeypatch.setattr(server, "bulk_config", BulkConfig(poll_interval=0.01, timeout=0.05))
+    with pytest.raises(ValueError, match="did not complete"):
+        asyncio.run(server.bulk_query({"query": "SELECT Id FROM Opportunity"}))
+    assert [job["state"] for job in mock.bulk_jobs.values()] == ["Aborted"]
@@ -0,0 +1,159 @@
+from types import SimpleNamespace
+import asyncio
+import os
+
+from simple_salesforce.exceptions import SalesforceGeneralError
+
+from . import streaming_mcp_server as server
+from .cache import DescribeCache, QueryCache, is_cacheable_query, normalize_soql
+from .mock_salesforce import MockSalesforce
+
+
+def describe_payload(*names):
+    return {"fields": [
+        {"label": name, "name": name, "updateable": True, "type": "string", "length": 80, "picklistValues": []}
+        for name in names
+    ]}
+
+
+class DescribeSalesforce:
+    """Answers describe calls, honouring If-Modified-Since like the REST API"""
+
+    base_url = "https://example.my.salesforce.com/services/data/v59.0/"
+
+    def __init__(self):
+        self.requests = []
+
+    def _call_salesforce(self, method, url, name="", headers=None):
+        self.requests.append(headers or {})
+        if headers and headers.get("If-Modified-Since"):
+            raise SalesforceGeneralError(url, 304, name, b"")
+        return SimpleNamespace(
+            json=lambda: describe_payload("Id", "Name"),
+            headers={"Last-Modified": "Tue, 01 Oct 2024 00:00:00 GMT"},
+        )
+
+
+def test_lru_eviction():
+    cache = DescribeCache(max_entries=2)
+    cache.put("Account", [1])
+    cache.put("Contact", [2])
+    cache.get("Account")
+    cache.put("Lead", [3])
+    assert cache.names() == ["Account", "Lead"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "describe_cache.json")
+    cache = DescribeCache(snapshot_path=path)
+    cache.put("Account", [{"name": "Id"}], "Tue, 01 Oct 2024 00:00:00 GMT")
+    # Changes are written by the periodic flush, not by every put
+    assert not os.path.exists(path)
+    assert cache.flush() is True
+    assert cache.flush() is False
+
+    restored = DescribeCache(snapshot_path=path)
+    assert restored.load_snapshot() == 1
+    assert restored.get_fresh("Account") == [{"name": "Id"}]
+    assert restored.get("Account").last_modified == "Tue, 01 Oct 2024 00:00:00 GMT"
+
+    cache.put("Lead", [{"name": "Id"}])
+    cache.flush()
+    assert DescribeCache(max_entries=1, snapshot_path=path).load_snapshot() == 1
+
+
+def test_expired_entry_is_revalidated_with_if_modified_since(monkeypatch):
+    fake = DescribeSalesforce()
+    monkeypatch.setattr(server.sf_client, "sf", fake)
+    monkeypatch.setattr(server.sf_client, "describe_cache", DescribeCache(ttl=0))
+
+    first = server.sf_client.get_object_fields("Account")
+    second = server.sf_client.get_object_fields("Account")
+
+    assert first == second
+    assert fake.requests == [{}, {"If-Modified-Since": "Tue, 01 Oct 2024 00:00:00 GMT"}]
+    assert server.sf_client.describe_cache.stats()["revalidations"] == 1
+
+
+def test_get_objects_fields_batches_cache_misses(monkeypatch):
+    with MockSalesforce() as mock:
+        monkeypatch.setattr(server.sf_client, "sf", mock.salesforce())
+        monkeypatch.setattr(server.sf_client, "describe_cache", DescribeCache())
+        server.sf_client.get_object_fields("Account")
+        # The background /limits read would be counted among the requests below
+        monkeypatch.setattr(server.sf_client.rate_limiter, "limits_due", lambda: False)
+        before = mock.request_count
+
+        names = ["Account"] + [f"Object_{i}__c" for i in range(30)]
+        result = asyncio.run(server.get_objects_fields({"object_names": names}))
+
+    assert list(result["objects"]) == names
+    assert "errors" not in result
+    # 30 misses fit in two Composite batches; Account came from the cache
+    assert mock.request_count - before == 2
+
+
+class CountingSalesforce:
+    """Answers every query with a single-page result and counts the calls"""
+
+    sf_instance = "example.my.salesforce.com"
+    session_id = "00Dexample!session"
+
+    def __init__(self):
+        self.queries = 0
+
+    def query(self, query, headers=None):
+        self.queries += 1
+        return {"totalSize": 1, "done": True, "records": [{"Id": "001000000000001AAA", "Call": self.queries}]}
+
+
+def test_normalize_soql_ignores_whitespace_and_keyword_case():
+    a = normalize_soql("select Id,  Name\n  from Account where Name = 'Acme  Corp' limit 5")
+    b = normalize_soql("SELECT Id, Name FROM Account WHERE Name = 'Acme  Corp' LIMIT 5")
+    assert a == b
+    assert normalize_soql("SELECT Id FROM Account WHERE Name = 'acme'") != \
+        normalize_soql("SELECT Id FROM Account WHERE Name = 'ACME'")
+    assert not is_cacheable_query(normalize_soql("SELECT Id FROM Account FOR VIEW"))
+
+
+def test_query_cache_hits_bypass_and_stale_while_revalidate(monkeypatch):
+    fake = CountingSalesforce()
+    monkeypatch.setattr(server.sf_client, "sf", fake)
+    monkeypatch.setattr(server.sf_client, "query_cache", QueryCache(ttl=60, stale_ttl=60))
+
+    async def scenario():
+        await server.run_soql_query({"query": "SELECT Id FROM Account"})
+        await server.run_soql_query({"query": "select Id\n  from Account"})
+        assert fake.queries == 1
+        await server.run_soql_query({"query": "SELECT Id FROM Account", "bypass_cache": True})
+        assert fake.queries == 2
+
+        # Age the entry past its TTL: the stale result is served while a refresh runs
+        server.sf_client.query_cache.ttl = 1e-9
+        stale = await server.run_soql_query({"query": "SELECT Id FROM Account"})
+        await asyncio.sleep(0.1)
+        return stale
+
+    stale = asyncio.run(scenario())
+    assert stale["records"][0]["Call"] == 1
+    assert fake.queries == 3
+    stats = server.sf_client.query_cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["bypasses"], stats["refreshes"]) == (1, 1, 1, 1)
+
+
+def test_failed_background_refresh_is_logged_and_released(caplog):
+    cache = QueryCache(ttl=60, stale_ttl=60)
+
+    async def fetch():
+        raise RuntimeError("org unavailable")
+
+    async def scenario():
+        cache.refresh_in_background(("user", "select id from account"), fetch)
+        assert len(cache._tasks) == 1
+        await asyncio.gather(*cache._tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert not cache._tasks and not cache._refreshing
+    assert "org unavailable" in caplog.text and cache.stats()["refreshes"] == 0
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+import pytest
+from simple_salesforce.exceptions import SalesforceExpiredSession
+
+from . import streaming_mcp_server as server
+from .client import OrgConfig, SalesforceClient
+from .mock_salesforce import MockSalesforce
+from .registry import ClientRegistry, current_org
+
+
+class FakeSession:
+    """simple_salesforce stand-in whose session can be expired from the test"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.sf_instance = "example.my.salesforce.com"
+        self.expired = False
+
+    def query(self, query, headers=None):
+        if self.expired:
+            raise SalesforceExpiredSession("url", 401, "query", b"INVALID_SESSION_ID")
+        return {"totalSize": 0, "done": True, "records": [], "session": self.session_id}
+
+
+class FakeOrgConfig(OrgConfig):
+    """Org config whose logins are counted instead of going over the network"""
+
+    def __init__(self, alias="default", login_delay=0.0):
+        super().__init__(alias=alias, username="user@example.com", password="secret")
+        self.login_count = 0
+        self.login_delay = login_delay
+        self._lock = threading.Lock()
+
+    def connect(self, session):
+        with self._lock:
+            self.login_count += 1
+            count = self.login_count
+        threading.Event().wait(self.login_delay)
+        return FakeSession(f"session-{count}")
+
+
+def test_concurrent_expiries_trigger_a_single_login():
+    config = FakeOrgConfig(login_delay=0.1)
+    client = SalesforceClient(config)
+    client.sf.expired = True
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: client._with_session(lambda: client.query_page("SELECT Id FROM Account")),
+                                range(10)))
+
+    assert config.login_count == 2  # the initial login plus one refresh
+    assert {r["session"] for r in results} == {"session-2"}
+    assert client.stats()["session_refreshes"] == 1
+
+
+def test_expired_access_token_cannot_be_refreshed():
+    config = FakeOrgConfig()
+    config.password = None
+    client = SalesforceClient(config)
+    client.sf.expired = True
+
+    with pytest.raises(ValueError, match="cannot be refreshed"):
+        client._with_session(lambda: client.query_page("SELECT Id FROM Account"))
+
+
+def test_registry_resolves_the_session_org():
+    registry = ClientRegistry({"default": FakeOrgConfig(), "acme": FakeOrgConfig("acme")})
+    assert registry.current().alias == "default"
+    assert registry.clients().keys() == {"default"}
+
+    token = current_org.set("acme")
+    try:
+        acme = registry.current()
+    finally:
+        current_org.reset(token)
+    assert acme.alias == "acme"
+    assert acme.session is not registry.get().session
+    with pytest.raises(ValueError, match="Unknown Salesforce org"):
+        registry.get("globex")
+
+
+def test_get_records_batches_ids_across_objects(monkeypatch):
+    accounts = [{"Id": f"001{i:015d}", "Name": f"Account {i}"} for i in range(450)]
+    contacts = [{"Id": f"003{i:015d}", "Name": f"Contact {i}"} for i in range(3)]
+    with MockSalesforce() as mock:
+        mock.add_records("Account", accounts)
+        mock.add_records("Contact", contacts)
+        monkeypatch.setattr(server.sf_client, "sf", mock.salesforce())
+        monkeypatch.setattr(server.sf_client, "_key_prefixes", None)
+        # The background /limits read would be counted among the requests below
+        monkeypatch.setattr(server.sf_client.rate_limiter, "limits_due", lambda: False)
+
+        missing = "001999999999999999"
+        ids = [contacts[2]["Id"]] + [a["Id"] for a in reversed(accounts)] + [contacts[0]["Id"], missing,
+                                                                           accounts[0]["Id"], "a00000000000000AAA"]
+        before = mock.request_count
+        result = asyncio.run(server.get_records({"record_ids": ids, "fields": ["Id", "Name"]}))
+        requests = mock.request_count - before
+
+        bad_field = asyncio.run(server.get_records({"record_ids": [accounts[0]["Id"]], "fields": "Id, Industry"}))
+
+    expected = [contacts[2]] + list(reversed(accounts)) + [contacts[0]]
+    assert [record["Id"] for record in result["records"]] == [record["Id"] for record in expected]
+    assert "attributes" in result["records"][0]
+    assert set(result["errors"]) == {missing, "a00000000000000AAA"}
+    # Global describe, three Account chunks of up to 200 and one Contact chunk
+    assert requests == 5
+    assert bad_field["records"] == []
+    assert "INVALID_FIELD" in bad_field["errors"][accounts[0]["Id"]]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from .client import SalesforceClient
+from .coalesce import SingleFlight
+from .mock_salesforce import MockOrgConfig, MockSalesforce
+
+
+def test_concurrent_callers_share_one_call_and_its_error():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) > 1:
+            raise RuntimeError("upstream failed")
+        return {"value": 1}
+
+    async def scenario():
+        first = await asyncio.gather(*(flight.run("k", call) for _ in range(5)))
+        second = await asyncio.gather(*(flight.run("k", call) for _ in range(3)), return_exceptions=True)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert all(result is first[0] for result in first)
+    assert all(isinstance(error, RuntimeError) for error in second)
+    assert flight.stats() == {"in_flight": 0, "calls": 2, "coalesced": 6, "failures": 1, "coalesced_ratio": 0.75}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.run("k", call))
+        follower = asyncio.create_task(flight.run("k", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_concurrent_describes_send_one_request():
+    with MockSalesforce(latency=0.05) as mock:
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+        before = mock.request_count
+
+        async def scenario():
+            single = asyncio.gather(*(client.object_fields("Account") for _ in range(8)))
+            await asyncio.sleep(0)
+            batch = await client.get_objects_fields(["Account", "Contact"])
+            return await single, batch
+
+        single, (fields_by_object, errors) = asyncio.run(scenario())
+        assert all(fields is single[0] for fields in single)
+        assert fields_by_object["Account"] is single[0] and "Contact" in fields_by_object and not errors
+        # One describe for Account, joined by the batch, plus one Composite batch for Contact
+        assert mock.request_count - before == 2
+        assert client.inflight.stats()["coalesced"] == 8
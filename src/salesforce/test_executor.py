@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+from .executor import BoundedExecutor
+
+
+def test_calls_run_off_the_event_loop():
+    """Blocking calls must not stall other coroutines on the loop"""
+    executor = BoundedExecutor(max_concurrency=2)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+        return ticks
+
+    assert asyncio.run(scenario()) == 10
+    executor.shutdown()
+
+
+def test_concurrency_is_bounded_and_queue_depth_reported():
+    """Calls beyond max_concurrency wait and are counted as queued"""
+    executor = BoundedExecutor(max_concurrency=2)
+    release = threading.Event()
+    running = []
+
+    def blocking_call(i):
+        running.append(i)
+        release.wait(timeout=5)
+        return i
+
+    async def scenario():
+        tasks = [asyncio.create_task(executor.run(blocking_call, i)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        snapshot = executor.stats()
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return snapshot, results
+
+    snapshot, results = asyncio.run(scenario())
+    assert snapshot["active"] == 2
+    assert snapshot["queue_depth"] == 3
+    assert len(running) == 5
+    assert results == [0, 1, 2, 3, 4]
+    assert executor.stats()["completed"] == 5
+    executor.shutdown()
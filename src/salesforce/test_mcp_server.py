@@ -6,6 +6,8 @@ import time
 import select
 import uuid
 
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 class MCPServerTest:
     """Test harness for MCP Server interactions"""
     
@@ -16,11 +18,10 @@ class MCPServerTest:
         
     def start_server(self):
         """Start the MCP server process"""
-        server_path = "src/salesforce/server.py"
-        
         # Start the server subprocess with more debug information
         self.proc = subprocess.Popen(
-            [sys.executable, server_path],
+            [sys.executable, "-m", "src.salesforce.streaming_mcp_server", "--transport", "stdio"],
+            cwd=REPO_ROOT,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -97,7 +98,8 @@ class MCPServerTest:
         # First check stderr for errors
         ready_stderr, _, _ = select.select([self.proc.stderr], [], [], 0.1)
         if ready_stderr:
-            stderr_output = self.proc.stderr.read()
+            # read() would block until the server exits, so only take what is already available
+            stderr_output = os.read(self.proc.stderr.fileno(), 65536).decode(errors="replace")
             if stderr_output:
                 print(f"Server stderr before response: {stderr_output}")
         
@@ -166,6 +168,7 @@ def test_initialize():
         if "error" in response:
             print("❌ Initialize failed")
             return False
+        assert response["result"]["serverInfo"]["name"] == "salesforce-ss"
         print("✅ Initialize test passed")
         return True
     except Exception as e:
@@ -226,7 +229,9 @@ def test_list_tools():
             "params": {}
         }
         response = test.send_recv(list_tools_msg, timeout=10)
-        # Just return the raw response
+        tool_names = [tool["name"] for tool in response.get("result", {}).get("tools", [])]
+        assert "run_soql_query" in tool_names, response
+        # Return the raw response for run_all_tests
         return response
     except Exception as e:
         print(f"❌ List tools test failed: {e}")
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from mcp.server.fastmcp import Context, FastMCP
+
+from .metrics import MetricsRegistry, TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY, instrument, render_stats
+from .mock_salesforce import DAILY_API_LIMIT, MockSalesforce
+from .transport import parse_limit_info, session_stats
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("tool_seconds", "Latency", ("tool",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, tool="get_record")
+
+    lines = registry.render()
+    assert 'tool_seconds_bucket{tool="get_record",le="0.1"} 1' in lines
+    assert 'tool_seconds_bucket{tool="get_record",le="1"} 3' in lines
+    assert 'tool_seconds_bucket{tool="get_record",le="+Inf"} 4' in lines
+    assert 'tool_seconds_count{tool="get_record"} 4' in lines
+    with pytest.raises(ValueError):
+        latency.observe(1.0, org="default")
+
+
+def test_stats_are_rendered_as_labelled_gauges():
+    lines = render_stats("describe_cache", {"default": {"hit_ratio": 0.75, "size": 3}, "acme": {"hit_ratio": 0.5}})
+    assert "# TYPE salesforce_describe_cache_hit_ratio gauge" in lines
+    assert 'salesforce_describe_cache_hit_ratio{org="acme"} 0.5' in lines
+    assert 'salesforce_describe_cache_size{org="default"} 3' in lines
+
+
+def test_instrumented_tool_keeps_its_schema_and_context():
+    mcp = FastMCP("metrics-test")
+
+    @mcp.tool()
+    @instrument
+    async def metrics_probe(arguments: dict, ctx: Context = None) -> dict:
+        if arguments.get("fail"):
+            raise ValueError("boom")
+        return {"has_context": ctx is not None}
+
+    tool = mcp._tool_manager.get_tool("metrics_probe")
+    assert tool.context_kwarg == "ctx"
+    assert list(tool.parameters["properties"]) == ["arguments"]
+
+    asyncio.run(mcp.call_tool("metrics_probe", {"arguments": {}}))
+    with pytest.raises(Exception):
+        asyncio.run(mcp.call_tool("metrics_probe", {"arguments": {"fail": True}}))
+    assert TOOL_CALLS.value(tool="metrics_probe") == 2
+    assert TOOL_ERRORS.value(tool="metrics_probe") == 1
+    assert TOOL_LATENCY.count(tool="metrics_probe") == 2
+
+
+def test_api_usage_is_read_from_limit_info():
+    assert parse_limit_info("api-usage=25/15000") == (25, 15000)
+    assert parse_limit_info(None) is None
+
+    with MockSalesforce() as mock:
+        sf = mock.salesforce()
+        sf.restful("sobjects/Account/describe")
+        sf.restful("sobjects/Contact/describe")
+        stats = session_stats(sf.session)
+    assert stats["api_requests_used"] == 2
+    assert stats["api_requests_limit"] == DAILY_API_LIMIT
@@ -0,0 +1,44 @@
+import pytest
+from simple_salesforce.exceptions import SalesforceAuthenticationFailed, SalesforceResourceNotFound
+
+from .client import SalesforceClient
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records
+
+
+@pytest.fixture
+def mock():
+    with MockSalesforce(query_page_size=2) as mock:
+        mock.add_records("Account", generate_records("Account", 5, field_count=2, value_size=8))
+        yield mock
+
+
+def test_login_and_paginated_query(mock):
+    client = SalesforceClient(MockOrgConfig(mock.base_url))
+    assert mock.logins == 1
+
+    first = client.sf.query("SELECT Id, Custom_Field_1__c FROM Account")
+    assert first["totalSize"] == 5 and not first["done"] and len(first["records"]) == 2
+    result = client.sf.query_all("SELECT Id, Custom_Field_1__c FROM Account LIMIT 3")
+    assert [r["Id"] for r in result["records"]] == ["001000000000000000", "001000000000000001", "001000000000000002"]
+    assert result["records"][2]["Custom_Field_1__c"] == "2-1-xxxx"
+
+
+def test_record_get_and_composite(mock):
+    sf = SalesforceClient(MockOrgConfig(mock.base_url)).sf
+    assert sf.Account.get("001000000000000004")["Name"] == "Account 4"
+    with pytest.raises(SalesforceResourceNotFound):
+        sf.Account.get("001000000000000009")
+
+    body = sf.restful("composite", method="POST", json={"compositeRequest": [
+        {"method": "GET", "url": "/services/data/v59.0/sobjects/Account/001000000000000001", "referenceId": "a"},
+        {"method": "GET", "url": "/services/data/v59.0/sobjects/Contact/describe", "referenceId": "b"},
+    ]})
+    responses = {r["referenceId"]: r for r in body["compositeResponse"]}
+    assert responses["a"]["body"]["Id"] == "001000000000000001"
+    assert responses["b"]["httpStatusCode"] == 200 and responses["b"]["body"]["name"] == "Contact"
+
+
+def test_login_rejects_unknown_credentials(mock):
+    mock.credentials = {"user@example.com": "secret"}
+    with pytest.raises(SalesforceAuthenticationFailed):
+        MockOrgConfig(mock.base_url).connect(mock.session())
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from . import streaming_mcp_server as server
+from .pagination import RecordBudget, decode_cursor, encode_cursor
+
+
+class PagedSalesforce:
+    """Serves a fixed record set in pages the way the REST query endpoint does"""
+
+    def __init__(self, total, page_size):
+        self.records = [{"Id": f"001{i:015d}", "Name": f"Account {i}"} for i in range(total)]
+        self.page_size = page_size
+        self.calls = 0
+
+    def _page(self, offset):
+        self.calls += 1
+        end = offset + self.page_size
+        page = {"totalSize": len(self.records), "done": end >= len(self.records), "records": self.records[offset:end]}
+        if not page["done"]:
+            page["nextRecordsUrl"] = f"/services/data/v59.0/query/01gLOCATOR-{end}"
+        return page
+
+    def query(self, query, headers=None):
+        return self._page(0)
+
+    def query_more(self, next_url, identifier_is_url=False, headers=None):
+        return self._page(int(next_url.rsplit("-", 1)[1]))
+
+
+@pytest.fixture
+def paged_sf(monkeypatch):
+    fake = PagedSalesforce(total=25, page_size=10)
+    monkeypatch.setattr(server.sf_client, "sf", fake)
+    return fake
+
+
+def test_cursor_round_trip():
+    state = {"next": "/services/data/v59.0/query/01gLOCATOR-10", "skip": 3}
+    assert decode_cursor(encode_cursor(state)) == state
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor({"next": "https://evil.example.com/", "skip": 0}))
+
+
+def test_budget_admits_first_record_even_if_oversized():
+    budget = RecordBudget(max_bytes=1)
+    assert budget.take({"Id": "001"})
+    assert not budget.take({"Id": "002"})
+    assert budget.exhausted
+
+
+def test_unpaginated_query_reads_every_page(paged_sf):
+    result = asyncio.run(server.run_soql_query({"query": "SELECT Id FROM Account"}))
+    assert len(result["records"]) == 25
+    assert result["done"] and "cursor" not in result
+    assert paged_sf.calls == 3
+
+
+def test_cursor_walks_all_records_without_gaps(paged_sf):
+    async def walk():
+        seen = []
+        result = await server.run_soql_query({"query": "SELECT Id FROM Account", "paginate": True, "max_records": 7})
+        seen.extend(result["records"])
+        while not result["done"]:
+            result = await server.fetch_more_records({"cursor": result["cursor"], "max_records": 7})
+            seen.extend(result["records"])
+        return seen
+
+    seen = asyncio.run(walk())
+    assert [r["Id"] for r in seen] == [r["Id"] for r in paged_sf.records]
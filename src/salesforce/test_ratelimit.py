@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from .client import SalesforceClient
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records
+from .ratelimit import PRIORITY_HIGH, PRIORITY_LOW, RateLimitConfig, RateLimitExceeded, RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_over_its_rate_is_rejected_with_a_retry_hint():
+    clock = FakeClock()
+    limiter = RateLimiter(RateLimitConfig(org_rate=0, session_rate=1, session_burst=2, max_wait=0), clock)
+
+    async def calls():
+        await limiter.acquire("a")
+        await limiter.acquire("a")
+        await limiter.acquire("b")
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.acquire("a")
+        return excinfo.value.retry_after
+
+    assert asyncio.run(calls()) == pytest.approx(1.0)
+    clock.now = 1.0
+    asyncio.run(limiter.acquire("a"))
+    assert limiter.stats()["rejected_session"] == 1 and limiter.stats()["admitted"] == 4
+
+
+def test_default_config_never_throttles(monkeypatch):
+    for name in ("SALESFORCE_RATE_LIMIT", "SALESFORCE_SESSION_RATE_LIMIT"):
+        monkeypatch.delenv(name, raising=False)
+    limiter = RateLimiter(RateLimitConfig.from_env(), FakeClock())
+
+    async def calls():
+        for _ in range(500):
+            await limiter.acquire("a")
+
+    asyncio.run(calls())
+    assert limiter.stats()["admitted"] == 500 and "org_tokens" not in limiter.stats()
+    assert not RateLimiter(RateLimitConfig(reserve_fraction=0)).limits_due()
+
+
+def test_token_bucket_reservations_queue_into_the_future():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock)
+    assert bucket.reserve(max_wait=1) == 0
+    assert bucket.reserve(max_wait=1) == pytest.approx(0.5)
+    assert bucket.reserve(max_wait=1) == pytest.approx(1.0)
+    assert bucket.reserve(max_wait=1) is None
+
+
+def test_queued_calls_are_admitted_by_priority():
+    limiter = RateLimiter(RateLimitConfig(org_rate=20, org_burst=1, session_rate=0, max_wait=2))
+    admitted = []
+
+    async def call(name, priority):
+        await limiter.acquire(priority=priority)
+        admitted.append(name)
+
+    async def scenario():
+        await limiter.acquire()
+        low = asyncio.create_task(call("low", PRIORITY_LOW))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(call("high", PRIORITY_HIGH))
+        await asyncio.gather(low, high)
+
+    asyncio.run(scenario())
+    assert admitted == ["high", "low"]
+    assert limiter.stats()["max_queue_depth"] == 2
+
+
+def test_full_queue_is_rejected_at_once():
+    limiter = RateLimiter(RateLimitConfig(org_rate=1, org_burst=1, session_rate=0, max_wait=1.5))
+
+    async def scenario():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitExceeded) as excinfo:
+            await limiter.acquire()
+        waiter.cancel()
+        return excinfo.value.retry_after
+
+    assert asyncio.run(scenario()) == pytest.approx(2.0)
+
+
+def test_client_keeps_the_daily_api_reserve(monkeypatch):
+    monkeypatch.setenv("SALESFORCE_API_RESERVE", "0.2")
+    with MockSalesforce() as mock:
+        mock.add_records("Account", generate_records("Account", 1))
+        mock.daily_api_limit = 100
+        mock.api_requests_before = 70
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+
+        async def calls():
+            for _ in range(20):
+                await client.run(client.get_record, "Account", "001000000000000000")
+                await asyncio.sleep(0)
+
+        with pytest.raises(RateLimitExceeded, match=r"80/100 used"):
+            asyncio.run(calls())
+        assert mock.api_requests_used == 80
+        stats = client.rate_limiter.stats()
+        assert stats["rejected_quota"] == 1 and stats["api_requests_reserved"] == 20
+
+
+def test_org_admits_calls_again_once_usage_drops(monkeypatch):
+    monkeypatch.setenv("SALESFORCE_LIMITS_REFRESH", "0.2")
+    with MockSalesforce() as mock:
+        mock.add_records("Account", generate_records("Account", 1))
+        mock.api_requests_before = 14990
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+
+        async def calls():
+            await client.run(client.get_record, "Account", "001000000000000000")
+            await client._limits_task
+            with pytest.raises(RateLimitExceeded) as excinfo:
+                await client.run(client.get_record, "Account", "001000000000000000")
+            assert 0 < excinfo.value.retry_after <= 0.2
+            mock.api_requests_before = 0
+            # The rejected call itself schedules the /limits read that lifts the guard
+            await asyncio.sleep(0.25)
+            with pytest.raises(RateLimitExceeded):
+                await client.run(client.get_record, "Account", "001000000000000000")
+            await client._limits_task
+            return await client.run(client.get_record, "Account", "001000000000000000")
+
+        assert asyncio.run(calls())["Id"] == "001000000000000000"
+
+
+def test_session_token_is_refunded_when_the_org_rejects_the_call():
+    limiter = RateLimiter(RateLimitConfig(org_rate=1, org_burst=1, session_rate=1, session_burst=2, max_wait=0))
+
+    async def calls():
+        await limiter.acquire("a")
+        with pytest.raises(RateLimitExceeded, match="Org is at its rate"):
+            await limiter.acquire("a")
+
+    asyncio.run(calls())
+    assert limiter._sessions["a"].tokens == pytest.approx(1.0, abs=0.01)
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+import pytest
+
+from . import streaming_mcp_server as server
+from .client import SalesforceClient
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records, salesforce_datetime
+from .registry import ClientRegistry
+from .replica import Replica, ReplicaConfig, translate_soql
+from .soql import SoqlParseError
+
+COLUMNS = {
+    "id": ("Id", "id"), "name": ("Name", "string"), "isactive": ("IsActive", "boolean"),
+    "amount": ("Amount", "currency"), "createddate": ("CreatedDate", "datetime"), "__object__": "Product2",
+}
+
+
+def columns_for(name):
+    return COLUMNS if name.lower() == "product2" else None
+
+
+def test_translates_simple_soql_to_sql():
+    sql, params, object_name, fields, booleans = translate_soql(
+        "select id, NAME from product2 where (IsActive = true or Amount >= 10.5) and Name != 'O\\'Neil' "
+        "and Id in ('01t1', '01t2') and Name like 'Wid%' and Name not in ('Gadget') "
+        "order by Name desc nulls last limit 5", columns_for)
+    assert sql == ('SELECT "Id", "Name" FROM "Product2" WHERE (("IsActive" = ? OR "Amount" >= ?) AND '
+                   '("Name" IS NULL OR "Name" != ?) AND "Id" IN (?, ?) AND "Name" LIKE ? AND '
+                   '("Name" IS NULL OR "Name" NOT IN (?))) '
+                   'ORDER BY "Name" DESC NULLS LAST LIMIT ? OFFSET ?')
+    assert params == [1, 10.5, "O'Neil", "01t1", "01t2", "Wid%", "Gadget", 5, 0]
+    assert (object_name, fields, booleans) == ("Product2", ["Id", "Name"], [])
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT Id FROM Account",
+    "SELECT Id, Owner.Name FROM Product2",
+    "SELECT COUNT() FROM Product2",
+    "SELECT Id FROM Product2 WHERE CreatedDate > LAST_N_DAYS:7",
+    "SELECT Id FROM Product2 WHERE Name = :name",
+    "SELECT Id FROM Product2 GROUP BY Id",
+    "SELECT Id FROM Product2 WHERE Amount = 'ten'",
+    "SELECT Id FROM Product2 WHERE Id LIKE '01t%'",
+])
+def test_other_queries_are_left_to_salesforce(query):
+    with pytest.raises(SoqlParseError):
+        translate_soql(query, columns_for)
+
+
+def test_ids_match_case_sensitively_and_in_their_15_character_form():
+    with MockSalesforce(field_count=5) as mock:
+        records = generate_records("Account", 2, field_count=1)
+        records[0]["Id"] = "001A0000006Vm9rIAC"
+        mock.add_records("Account", records)
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+        replica = Replica(client, ReplicaConfig(objects=["Account"], refresh_interval=60))
+        asyncio.run(replica.refresh_all())
+
+        def names(condition):
+            result = asyncio.run(replica.query(f"SELECT Name FROM Account WHERE {condition}"))
+            return [record["Name"] for record in result["records"]]
+
+        assert names("Id = '001A0000006Vm9r'") == ["Account 0"]
+        assert sorted(names("Id IN ('001A0000006Vm9riac', '001000000000000001')")) == ["Account 0", "Account 1"]
+        assert names("Id = '001a0000006vm9r'") == []
+
+
+def test_replica_loads_then_refreshes_incrementally():
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    with MockSalesforce(field_count=5) as mock:
+        records = generate_records("Account", 4, field_count=1)
+        for i, record in enumerate(records):
+            record["SystemModstamp"] = salesforce_datetime(start + timedelta(seconds=i))
+        mock.add_records("Account", records)
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+        replica = Replica(client, ReplicaConfig(objects=["Account"], refresh_interval=60))
+
+        asyncio.run(replica.refresh_all())
+        before = mock.request_count
+        result = asyncio.run(replica.query("SELECT Id, Name FROM Account WHERE Name LIKE '%1' OR Name = 'account 2' "
+                                           "ORDER BY Name DESC"))
+        assert mock.request_count == before
+        assert [r["Name"] for r in result["records"]] == ["Account 2", "Account 1"]
+        assert result["replica"]["staleness_seconds"] < 5
+
+        mock.records["Account"][0]["Name"] = "Renamed"
+        mock.records["Account"][0]["SystemModstamp"] = salesforce_datetime()
+        mock.delete_records("Account", [records[3]["Id"]], datetime.now(timezone.utc) - timedelta(minutes=5))
+        key = "default:account:replica"
+        state = replica.sync_store.get(key)
+        state.deleted_watermark -= timedelta(minutes=10)
+        replica.sync_store.put(key, state)
+
+        asyncio.run(replica.refresh("Account"))
+        result = asyncio.run(replica.query("SELECT Name FROM Account ORDER BY Name", max_records=2))
+        assert [r["Name"] for r in result["records"]] == ["Account 1", "Account 2"] and result["truncated"]
+        assert result["totalSize"] == 3
+        assert [r["Name"] for r in asyncio.run(replica.query("SELECT Name FROM Account ORDER BY Name"))["records"]] == [
+            "Account 1", "Account 2", "Renamed"]
+        assert replica.stats()["rows"] == 3 and replica.stats()["refreshes"] == 2
+
+
+def test_run_soql_query_answers_from_the_replica(monkeypatch):
+    with MockSalesforce(field_count=5) as mock:
+        records = generate_records("Account", 3, field_count=1)
+        for record in records:
+            record["SystemModstamp"] = salesforce_datetime()
+        mock.add_records("Account", records)
+        monkeypatch.setattr(server, "registry", ClientRegistry({"default": MockOrgConfig(mock.base_url)}))
+        client = server.get_client()
+        client.replica = Replica(client, ReplicaConfig(objects=["Account"]))
+        asyncio.run(client.replica.refresh_all())
+
+        before = mock.request_count
+        result = asyncio.run(server.run_soql_query({"query": "SELECT Id, Name FROM Account WHERE Name = 'Account 1'",
+                                                    "format": "flat"}))
+        assert mock.request_count == before
+        assert result["records"] == [{"Id": records[1]["Id"], "Name": "Account 1"}] and "replica" in result
+
+        result = asyncio.run(server.run_soql_query({"query": "SELECT Id, Name FROM Account", "bypass_cache": True}))
+        assert mock.request_count > before and "replica" not in result
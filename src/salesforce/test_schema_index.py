@@ -0,0 +1,63 @@
+import asyncio
+
+from . import streaming_mcp_server as server
+from .mock_salesforce import MockOrgConfig, MockSalesforce
+from .registry import ClientRegistry
+from .schema_index import FieldIndex, SchemaIndex, tokenize
+
+ACCOUNT_FIELDS = [
+    {"name": "Id", "label": "Account ID", "type": "id", "updateable": False},
+    {"name": "Name", "label": "Account Name", "type": "string", "updateable": True},
+    {"name": "BillingPostalCode", "label": "Billing Zip/Postal Code", "type": "string", "updateable": True},
+    {"name": "ShippingPostalCode", "label": "Shipping Zip/Postal Code", "type": "string", "updateable": True},
+    {"name": "Industry", "label": "Industry", "type": "picklist", "updateable": True, "picklistValues": [
+        {"value": "Banking", "active": True}, {"value": "Mining", "active": False}]},
+    {"name": "Region__c", "label": "Sales Region", "type": "reference", "updateable": True},
+]
+
+
+def test_tokenize_splits_names_and_labels():
+    assert tokenize("BillingPostalCode") == ["billing", "postal", "code"]
+    assert tokenize("Sales_Region__c") == ["sales", "region"]
+    assert tokenize("Billing Zip/Postal Code") == ["billing", "zip", "postal", "code"]
+
+
+def test_search_by_prefix_spelling_and_type():
+    index = FieldIndex("Account", ACCOUNT_FIELDS)
+    assert [f["name"] for f in index.search("billing post")] == ["BillingPostalCode"]
+    assert [f["name"] for f in index.search("postal")] == ["BillingPostalCode", "ShippingPostalCode"]
+    assert [f["name"] for f in index.search("name")][0] == "Name"
+    assert [f["name"] for f in index.search("regoin")] == ["Region__c"]
+    assert [f["name"] for f in index.search("", types=["picklist", "reference"])] == ["Industry", "Region__c"]
+    assert index.search("postal", limit=1) == [
+        {"name": "BillingPostalCode", "label": "Billing Zip/Postal Code", "type": "string", "updateable": True}]
+    assert index.search("nothing like it") == []
+
+
+def test_picklist_values_only_on_request():
+    index = FieldIndex("Account", ACCOUNT_FIELDS)
+    assert "picklistValues" not in index.search("industry")[0]
+    assert index.search("industry", include_picklist=True)[0]["picklistValues"] == ["Banking"]
+
+
+def test_schema_index_rebuilds_when_the_describe_changes():
+    schema = SchemaIndex(max_objects=1)
+    first = schema.get("Account", ACCOUNT_FIELDS)
+    assert schema.get("Account", ACCOUNT_FIELDS) is first
+    assert schema.get("Account", list(ACCOUNT_FIELDS)) is not first
+    schema.get("Contact", ACCOUNT_FIELDS[:2])
+    assert schema.stats() == {"objects": 1, "fields": 2, "builds": 3}
+
+
+def test_search_fields_tool(monkeypatch):
+    with MockSalesforce(field_count=30) as mock:
+        monkeypatch.setattr(server, "registry", ClientRegistry({"default": MockOrgConfig(mock.base_url)}))
+        result = asyncio.run(server.search_fields(
+            {"object_name": "Account", "query": "custom field 10", "types": "picklist", "include_picklist": True}))
+        assert result["total_fields"] == 30
+        assert [f["name"] for f in result["fields"]] == ["Custom_Field_10__c"]
+        assert result["fields"][0]["picklistValues"][0] == "option_0"
+
+        before = mock.request_count
+        asyncio.run(server.search_fields({"object_name": "Account", "query": "name", "limit": 1}))
+        assert mock.request_count == before
@@ -0,0 +1,53 @@
+import copy
+
+import pytest
+
+from .shaping import flatten_record, output_format, shape_records, shape_result
+
+
+def opportunity(i, amount=None):
+    return {
+        "attributes": {"type": "Opportunity", "url": f"/services/data/v59.0/sobjects/Opportunity/006{i}"},
+        "Id": f"006{i}",
+        "Amount": amount,
+        "Account": {
+            "attributes": {"type": "Account", "url": f"/services/data/v59.0/sobjects/Account/001{i}"},
+            "Name": f"Acme {i}",
+            "Owner": {"attributes": {"type": "User"}, "Email": None},
+        },
+        "OpportunityContactRoles": {"totalSize": 1, "done": True, "records": [
+            {"attributes": {"type": "OpportunityContactRole"}, "Role": "Buyer"},
+        ]},
+    }
+
+
+def test_flat_strips_attributes_and_nulls_without_mutating():
+    record = opportunity(1)
+    original = copy.deepcopy(record)
+    assert flatten_record(record) == {
+        "Id": "0061",
+        "Account.Name": "Acme 1",
+        "OpportunityContactRoles": [{"Role": "Buyer"}],
+    }
+    assert record == original
+
+
+def test_columnar_and_csv_share_one_field_list():
+    records = [opportunity(1), opportunity(2, amount=5000.0)]
+    columnar = shape_records(records, "columnar")
+    assert columnar["fields"] == ["Id", "Amount", "Account.Name", "Account.Owner.Email", "OpportunityContactRoles"]
+    assert columnar["rows"][1][:3] == ["0062", 5000.0, "Acme 2"]
+
+    lines = shape_records(records, "csv").splitlines()
+    assert lines[0] == "Id,Amount,Account.Name,Account.Owner.Email,OpportunityContactRoles"
+    assert lines[1] == '0061,,Acme 1,,"[{""Role"":""Buyer""}]"'
+
+
+def test_shape_result_returns_a_copy():
+    result = {"records": [opportunity(1)], "totalSize": 1, "done": True}
+    assert shape_result(result, "raw") is result
+    shaped = shape_result(result, "flat")
+    assert shaped["totalSize"] == 1
+    assert "attributes" in result["records"][0]
+    with pytest.raises(ValueError):
+        output_format({"format": "xml"})
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from . import streaming_mcp_server as server
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records
+from .registry import ClientRegistry
+from .soql import SoqlParseError, parse_soql, plan_summary, plan_warning, validate_query
+
+CONTACT_FIELDS = [
+    {"name": "Id", "type": "id"},
+    {"name": "LastName", "type": "string"},
+    {"name": "Email", "type": "email"},
+    {"name": "AccountId", "type": "reference"},
+    {"name": "Region__c", "type": "reference"},
+    {"name": "CreatedDate", "type": "datetime"},
+]
+
+
+def fields_for(name):
+    return {"contact": CONTACT_FIELDS, "account": [{"name": "Id", "type": "id"}]}.get(name.lower())
+
+
+def test_parser_finds_references_in_every_clause():
+    parsed = parse_soql(
+        "SELECT c.LastName, Account.Name, COUNT(Id) total, (SELECT Subject FROM Tasks) "
+        "FROM Contact c WHERE Email LIKE '%where x = 1%' AND CALENDAR_YEAR(CreatedDate) = 2024 "
+        "AND AccountId IN (SELECT Id FROM Account WHERE Nmae != null) "
+        "GROUP BY c.LastName, Account.Name ORDER BY LastName DESC NULLS LAST LIMIT 10"
+    )
+    assert parsed.object_name == "Contact" and parsed.alias == "c"
+    assert parsed.fields == ["c.LastName", "Account.Name", "Id", "Email", "AccountId", "CreatedDate", "LastName"]
+    assert parsed.aliases == ["total"]
+    assert [sub.object_name for sub in parsed.subqueries] == ["Account"]
+    with pytest.raises(SoqlParseError):
+        parse_soql("FIND {Acme} IN ALL FIELDS")
+
+
+def test_parser_skips_typeof():
+    parsed = parse_soql("SELECT TYPEOF Owner WHEN User THEN Name END FROM Account")
+    assert parsed.object_name == "Account" and parsed.fields == []
+    assert parse_soql("SELECT Id, typeof What WHEN Account THEN Phone ELSE Name END FROM Event").fields == ["Id"]
+
+
+def test_validation_suggests_close_matches():
+    parsed = parse_soql("SELECT LastNmae, Acount.Name, Region__r.Name FROM Contact "
+                        "WHERE AccountId IN (SELECT Id FROM Account WHERE Nmae != null)")
+    assert validate_query(parsed, fields_for) == [
+        "No such field 'LastNmae' on Contact. Did you mean 'LastName'?",
+        "No relationship 'Acount' on Contact. Did you mean 'Account'?",
+        "No such field 'Nmae' on Account.",
+    ]
+    assert validate_query(parse_soql("SELECT Id FROM Contcat"), fields_for, ["Account", "Contact"]) == [
+        "Unknown object 'Contcat'. Did you mean 'Contact'?"
+    ]
+    # Objects without a cached describe are not checked
+    assert validate_query(parse_soql("SELECT Anything FROM Lead"), fields_for) == []
+
+
+def test_plan_warning_above_the_cost_threshold():
+    plan = plan_summary({"plans": [
+        {"leadingOperationType": "TableScan", "relativeCost": 2.5, "sobjectCardinality": 900000, "notes": []},
+        {"leadingOperationType": "Index", "relativeCost": 0.4, "sobjectCardinality": 900000, "notes": []},
+    ]})
+    assert plan["leadingOperationType"] == "Index"
+    assert plan_warning(plan, 1.0) is None
+    assert "TableScan" in plan_warning({**plan, "leadingOperationType": "TableScan", "relativeCost": 2.5}, 1.0)
+
+
+def test_run_soql_query_checks_before_sending(monkeypatch):
+    with MockSalesforce() as mock:
+        mock.add_records("Account", generate_records("Account", 1500, field_count=1))
+        registry = ClientRegistry({"default": MockOrgConfig(mock.base_url)})
+        # The /limits refresh is sent in the background and would be counted below
+        registry.get().rate_limiter.limits_due = lambda: False
+        monkeypatch.setattr(server, "registry", registry)
+        asyncio.run(server.get_object_fields({"object_name": "Account"}))
+        before = mock.request_count
+
+        with pytest.raises(ValueError, match=r"No such field 'Nmae' on Account. Did you mean 'Name'\?"):
+            asyncio.run(server.run_soql_query({"query": "SELECT Nmae FROM Account"}))
+        with pytest.raises(ValueError, match="not selective"):
+            asyncio.run(server.run_soql_query({"query": "SELECT Name FROM Account", "explain": "reject"}))
+        assert mock.request_count - before == 1
+
+        result = asyncio.run(server.run_soql_query(
+            {"query": "SELECT Name FROM Account WHERE Id = '001000000000000001'", "explain": "warn"}))
+        assert result["plan"]["leadingOperationType"] == "Index" and "warnings" not in result
+        assert result["records"]
+
+
+def test_stale_describes_are_revalidated_before_rejecting(monkeypatch):
+    with MockSalesforce() as mock:
+        registry = ClientRegistry({"default": MockOrgConfig(mock.base_url)})
+        monkeypatch.setattr(server, "registry", registry)
+        asyncio.run(server.get_object_fields({"object_name": "Account"}))
+        # As if loaded from a snapshot taken before Name existed
+        cache = registry.get().describe_cache
+        cache.put("Account", [{"name": "Id", "type": "id"}], None)
+        cache.get("Account").fetched_at -= cache.ttl
+
+        result = asyncio.run(server.run_soql_query({"query": "SELECT Name FROM Account"}))
+        assert result["records"] == []
+        with pytest.raises(ValueError, match="No such field 'Nmae' on Account"):
+            asyncio.run(server.run_soql_query({"query": "SELECT Nmae FROM Account"}))
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+from mcp.types import JSONRPCMessage, JSONRPCRequest
+from starlette.testclient import TestClient
+
+from . import streaming_mcp_server as server
+from .mock_salesforce import MockOrgConfig, MockSalesforce
+from .registry import ClientRegistry
+from .session_store import MemorySessionStore, SqliteSessionStore
+from .test_client import FakeOrgConfig
+
+
+def serve(app):
+    """Run app with uvicorn on a free local port; returns the base URL and the server"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=uvicorn_server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", uvicorn_server
+
+
+@pytest.fixture
+def orgs(monkeypatch):
+    registry = ClientRegistry({"default": FakeOrgConfig(), "acme": FakeOrgConfig("acme")})
+    for alias in ("default", "acme"):
+        registry.get(alias).describe_cache.put("Account", [{"name": f"{alias.title()}Field"}], None)
+    monkeypatch.setattr(server, "registry", registry)
+    return registry
+
+
+async def account_fields(url):
+    async with streamable_http_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool("get_objects_fields", {"arguments": {"object_names": ["Account"]}})
+    return json.loads(result.content[0].text)["objects"]["Account"]["fields"][0]["name"]
+
+
+@pytest.mark.parametrize("stateless", [False, True])
+def test_streamable_http_serves_the_requested_org(orgs, stateless):
+    base_url, uvicorn_server = serve(server.create_starlette_app(server.mcp._mcp_server, stateless=stateless))
+    try:
+        assert asyncio.run(account_fields(f"{base_url}/mcp")) == "DefaultField"
+        assert asyncio.run(account_fields(f"{base_url}/mcp?org=acme")) == "AcmeField"
+    finally:
+        uvicorn_server.should_exit = True
+
+
+def test_server_is_live_before_the_background_login_finishes(monkeypatch):
+    with MockSalesforce(login_latency=0.5) as mock:
+        registry = ClientRegistry({"default": MockOrgConfig(mock.base_url)})
+        monkeypatch.setattr(server, "registry", registry)
+        with TestClient(server.create_starlette_app(server.mcp._mcp_server)) as client:
+            health = client.get("/health")
+            assert health.status_code == 200 and health.json()["ready"] is False
+            assert client.get("/health/ready").status_code == 503
+
+            deadline = time.monotonic() + 5
+            while client.get("/health/ready").status_code != 200:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        assert registry.get().stats()["logins"] == 1
+
+
+@pytest.mark.parametrize("make_store", [lambda tmp_path: MemorySessionStore(),
+                                        lambda tmp_path: SqliteSessionStore(str(tmp_path / "sessions.db"))])
+def test_session_store_replays_events_of_one_stream(make_store, tmp_path):
+    store = make_store(tmp_path)
+
+    def message(i):
+        return JSONRPCMessage(JSONRPCRequest(jsonrpc="2.0", id=i, method="ping"))
+
+    async def scenario():
+        first = await store.store_event("a", message(1))
+        await store.store_event("b", message(2))
+        await store.store_event("a", None)
+        await store.store_event("a", message(3))
+        replayed = []
+
+        async def collect(event):
+            replayed.append(event.message.root.id)
+
+        stream = await store.replay_events_after(first, collect)
+        return stream, replayed
+
+    assert asyncio.run(scenario()) == ("a", [3])
+
+
+def test_session_store_is_exported_on_metrics_and_closed_at_shutdown(orgs, monkeypatch, tmp_path):
+    monkeypatch.setenv("MCP_SESSION_STORE", "sqlite")
+    monkeypatch.setenv("MCP_SESSION_STORE_PATH", str(tmp_path / "sessions.db"))
+    closed = []
+    monkeypatch.setattr(SqliteSessionStore, "close", lambda store: closed.append(store.path))
+    with TestClient(server.create_starlette_app(server.mcp._mcp_server)) as client:
+        assert 'mcp_session_store_events{backend="sqlite"} 0' in client.get("/metrics").text
+        assert client.get("/metrics?format=json").json()["session_store"] == {"backend": "sqlite", "events": 0}
+        assert closed == []
+    assert closed == [str(tmp_path / "sessions.db")]
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+from . import streaming_mcp_server as server
+from .client import SalesforceClient
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records, salesforce_datetime
+from .registry import ClientRegistry
+from .sync import MemorySyncStore, SqliteSyncStore, SyncState, read_changes
+
+
+def stamped_records(count, start):
+    records = generate_records("Account", count, field_count=1)
+    for i, record in enumerate(records):
+        record["SystemModstamp"] = salesforce_datetime(start + timedelta(seconds=i))
+    return records
+
+
+def test_state_compacts_to_the_overlap_window(tmp_path):
+    now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    state = SyncState(now, now, {
+        "001A": salesforce_datetime(now - timedelta(seconds=90)),
+        "001B": salesforce_datetime(now - timedelta(seconds=30)),
+    })
+    state.compact(60)
+    assert list(state.seen) == ["001B"]
+
+    for store in (MemorySyncStore(), SqliteSyncStore(str(tmp_path / "sync.db"))):
+        store.put("default:account:a", state)
+        loaded = store.get("default:account:a")
+        assert (loaded.watermark, loaded.seen) == (now, state.seen)
+        store.delete("default:account:a")
+        assert store.get("default:account:a") is None and store.stats()["subscriptions"] == 0
+
+
+def test_sync_returns_only_the_delta():
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    with MockSalesforce(query_page_size=2) as mock:
+        mock.add_records("Account", stamped_records(5, start))
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+        store = MemorySyncStore()
+
+        def sync(**kwargs):
+            return asyncio.run(read_changes(client, store, "Account", ["Name"], overlap=60, **kwargs))
+
+        first = sync(since=start.isoformat(), max_records=3)
+        assert first["initialized"] and first["has_more"]
+        assert [r["Id"] for r in first["changed"]] == [r["Id"] for r in mock.records["Account"][:3]]
+        rest = sync()
+        assert [r["Id"] for r in rest["changed"]] == [r["Id"] for r in mock.records["Account"][3:]]
+        assert not rest["has_more"] and not rest["deleted"]
+        assert sync()["changed"] == []
+
+        # One record changes, another is deleted
+        changed_id, deleted_id = mock.records["Account"][1]["Id"], mock.records["Account"][2]["Id"]
+        mock.records["Account"][1]["SystemModstamp"] = salesforce_datetime()
+        mock.delete_records("Account", [deleted_id], datetime.now(timezone.utc) - timedelta(minutes=5))
+        key = "default:account:default"
+        state = store.get(key)
+        state.deleted_watermark -= timedelta(minutes=10)
+        store.put(key, state)
+
+        delta = sync()
+        assert [r["Id"] for r in delta["changed"]] == [changed_id]
+        assert [r["Id"] for r in delta["deleted"]] == [deleted_id]
+        # Only records inside the overlap window are remembered
+        assert list(store.get(key).seen) == [changed_id]
+
+
+def test_concurrent_syncs_share_a_read_only_with_the_same_arguments():
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    with MockSalesforce() as mock:
+        mock.add_records("Account", stamped_records(3, start))
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+
+        async def scenario():
+            store = MemorySyncStore()
+            return await asyncio.gather(
+                read_changes(client, store, "Account", ["Name"], since=start.isoformat(), overlap=60),
+                read_changes(client, store, "Account", ["Name"], since=start.isoformat(), overlap=60),
+                read_changes(client, MemorySyncStore(), "Account", ["Name"], since=start.isoformat(),
+                             max_records=1, overlap=60),
+            )
+
+        shared, joined, limited = asyncio.run(scenario())
+        assert joined is shared and len(shared["changed"]) == 3
+        assert len(limited["changed"]) == 1 and limited["has_more"]
+
+
+def test_sync_changes_tool_starts_at_the_current_position(monkeypatch):
+    with MockSalesforce() as mock:
+        mock.add_records("Account", stamped_records(3, datetime.now(timezone.utc) - timedelta(seconds=10)))
+        monkeypatch.setattr(server, "registry", ClientRegistry({"default": MockOrgConfig(mock.base_url)}))
+        monkeypatch.setattr(server, "sync_store", MemorySyncStore())
+
+        first = asyncio.run(server.sync_changes({"object_name": "Account"}))
+        assert first["initialized"] and first["changed"] == []
+
+        mock.records["Account"][0]["SystemModstamp"] = salesforce_datetime()
+        second = asyncio.run(server.sync_changes({"object_name": "Account", "fields": "Name", "format": "flat"}))
+        assert not second["initialized"]
+        assert second["changed"] == [{"Id": mock.records["Account"][0]["Id"], "Name": "Account 0",
+                                      "SystemModstamp": mock.records["Account"][0]["SystemModstamp"]}]
+
+
+def test_concurrent_syncs_with_different_arguments_take_turns():
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    with MockSalesforce() as mock:
+        mock.add_records("Account", stamped_records(3, start))
+        client = SalesforceClient(MockOrgConfig(mock.base_url))
+        client.rate_limiter.limits_due = lambda: False
+        store = MemorySyncStore()
+
+        async def scenario():
+            return await asyncio.gather(
+                read_changes(client, store, "Account", ["Name"], since=start.isoformat(), overlap=60),
+                read_changes(client, store, "Account", since=start.isoformat(), max_records=10, overlap=60),
+            )
+
+        first, second = asyncio.run(scenario())
+        # The second call starts from the position the first one saved, so no change is returned twice
+        assert len(first["changed"]) == 3 and second["changed"] == []
+        assert second["watermark"] == first["watermark"]
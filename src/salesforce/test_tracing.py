@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+
+from mcp import types
+from starlette.testclient import TestClient
+
+from . import streaming_mcp_server as server
+from .metrics import TOOL_RESPONSE_BYTES
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records
+from .registry import ClientRegistry
+from .tracing import KIND_SERVER, JsonLinesExporter, Tracer, current_span, to_otlp
+
+
+def test_spans_nest_and_break_down_into_self_time(tmp_path):
+    tracer = Tracer(exporter=JsonLinesExporter(str(tmp_path / "traces" / "spans.jsonl")), slow_threshold=0)
+    with tracer.span("tools/call", {"mcp.tool": "get_record"}, KIND_SERVER) as root:
+        with tracer.span("salesforce.get"):
+            time.sleep(0.02)
+            with tracer.span("http GET", child_only=True):
+                time.sleep(0.03)
+        assert current_span.get() is root
+    assert current_span.get() is None
+    # Outside a trace child-only spans are not recorded
+    with tracer.span("http GET", child_only=True) as span:
+        assert span is None
+
+    breakdown = root.trace.breakdown()
+    assert list(breakdown) == ["http GET", "salesforce.get", "tools/call"]
+    assert breakdown["http GET"] >= 0.03 and 0.02 <= breakdown["salesforce.get"] < 0.03
+
+    [call] = tracer.slow_calls()
+    assert call["name"] == "tools/call" and [s["name"] for s in call["spans"]] == [
+        "tools/call", "salesforce.get", "http GET"]
+    [line] = (tmp_path / "traces" / "spans.jsonl").read_text().splitlines()
+    otlp = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp == to_otlp(root.trace)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp[0]["kind"] == KIND_SERVER and "parentSpanId" not in otlp[0]
+    assert otlp[2]["parentSpanId"] == otlp[1]["spanId"]
+    assert otlp[0]["attributes"] == [{"key": "mcp.tool", "value": {"stringValue": "get_record"}}]
+
+
+def test_reconfiguring_reuses_or_closes_the_file_exporter(tmp_path, monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setenv("MCP_TRACE_EXPORT", str(tmp_path / "a.jsonl"))
+    tracer.configure_from_env()
+    first = tracer.exporter
+    tracer.configure_from_env()
+    assert tracer.exporter is first
+
+    monkeypatch.setenv("MCP_TRACE_EXPORT", str(tmp_path / "b.jsonl"))
+    tracer.configure_from_env()
+    assert tracer.exporter is not first and first._stream is None
+    monkeypatch.setenv("MCP_TRACE_EXPORT", "none")
+    tracer.configure_from_env()
+    assert tracer.exporter is None
+
+
+def test_trace_waits_for_its_response_write():
+    tracer = Tracer(slow_threshold=0)
+    with tracer.span("tools/call") as root:
+        root.trace.write_key = ("sse:1", "7")
+    assert tracer.slow_calls() == [] and tracer.stats()["awaiting_write"] == 1
+
+    tracer.written(("sse:1", "7"), root.end_ns + 5_000_000)
+    [call] = tracer.slow_calls()
+    assert call["spans"][-1]["name"] == "transport.write" and call["duration_ms"] >= 5
+
+
+def test_tool_call_is_traced_down_to_the_http_request(monkeypatch):
+    with MockSalesforce() as mock:
+        mock.add_records("Account", generate_records("Account", 1, field_count=1))
+        monkeypatch.setattr(server, "registry", ClientRegistry({"default": MockOrgConfig(mock.base_url)}))
+        server.TRACER.slow_threshold = 0
+        server.TRACER.slow.clear()
+        try:
+            server.trace_tool_calls(server.mcp._mcp_server)
+            handler = server.mcp._mcp_server.request_handlers[types.CallToolRequest]
+            request = types.CallToolRequest(method="tools/call", params=types.CallToolRequestParams(
+                name="get_record", arguments={"arguments": {
+                    "object_name": "Account", "record_id": mock.records["Account"][0]["Id"]}}))
+            before = TOOL_RESPONSE_BYTES.value(tool="get_record")
+            result = asyncio.run(handler(request))
+            # Counted from the content FastMCP encoded, not from a second serialization
+            assert TOOL_RESPONSE_BYTES.value(tool="get_record") - before == len(result.root.content[0].text.encode())
+
+            with TestClient(server.create_starlette_app(server.mcp._mcp_server)) as client:
+                body = client.get("/debug/slow?limit=1").json()
+        finally:
+            server.TRACER.slow_threshold = 1.0
+    [call] = body["calls"]
+    names = [span["name"] for span in call["spans"]]
+    assert names[:2] == ["tools/call", "tool.get_record"] and "salesforce.get_record" in names
+    assert "rate_limit.wait" in names and "http GET" in names
+    assert call["attributes"]["mcp.tool"] == "get_record" and "tools/call" in call["breakdown_ms"]
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+import requests
+from simple_salesforce.exceptions import SalesforceGeneralError
+
+from .mock_salesforce import MockSalesforce
+from .transport import HttpxAdapter, TransportConfig, session_stats
+
+FAST_RETRIES = TransportConfig(max_retries=2, backoff_factor=0.001)
+
+
+@pytest.fixture
+def mock():
+    with MockSalesforce() as server:
+        yield server
+
+
+def test_get_is_retried_on_server_error(mock):
+    sf = mock.salesforce(FAST_RETRIES)
+    mock.fail_next(2, status=503)
+    assert sf.restful("sobjects/Account/describe")["name"] == "Account"
+    assert session_stats(sf.session)["retries"] == 2
+
+
+def test_request_limit_exceeded_is_retried_even_for_post(mock):
+    sf = mock.salesforce(FAST_RETRIES)
+    mock.fail_next(1, status=403, error_code="REQUEST_LIMIT_EXCEEDED")
+    batch = {"batchRequests": [{"method": "GET", "url": "v59.0/sobjects/Account/describe"}]}
+    assert sf.restful("composite/batch", method="POST", json=batch)["hasErrors"] is False
+
+
+def test_post_is_not_retried_on_server_error(mock):
+    sf = mock.salesforce(FAST_RETRIES)
+    mock.fail_next(1, status=503)
+    with pytest.raises(SalesforceGeneralError):
+        sf.restful("composite/batch", method="POST", json={"batchRequests": []})
+    assert session_stats(sf.session)["retries"] == 0
+
+
+def test_connections_are_reused(mock):
+    sf = mock.salesforce()
+    for _ in range(5):
+        sf.restful("sobjects/Account/describe")
+    stats = session_stats(sf.session)
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+
+
+def test_retry_after_is_capped_at_the_backoff_maximum():
+    adapter = HttpxAdapter(TransportConfig(backoff_max=2.0))
+    response = requests.Response()
+    response.headers["Retry-After"] = "3600"
+    assert adapter._retry_delay(response, 0) == 2.0
+    assert adapter._retry_delay(requests.Response(), 10) == 2.0
+    adapter.close()
+
+
+def test_httpx_adapter_supports_streamed_reads(mock):
+    # HTTP/1.1 through httpx exercises the same response conversion as HTTP/2
+    adapter = HttpxAdapter(TransportConfig())
+    session = requests.Session()
+    session.mount("http://", adapter)
+    url = f"{mock.base_url}/services/data/v59.0/sobjects/Account/describe"
+    with session.get(url, stream=True) as response:
+        # Nothing is buffered until the body is read
+        assert response._content is False
+        chunks = list(response.iter_content(chunk_size=64))
+    assert len(chunks) > 1 and json.loads(b"".join(chunks))["name"] == "Account"
+    with session.get(url, stream=True) as response:
+        assert json.loads(response.raw.read())["name"] == "Account"
+    response = session.get(url)
+    response.close()
+    assert response.json()["name"] == "Account"
+    session.close()
+
+
+def test_httpx_errors_are_raised_as_requests_errors():
+    session = requests.Session()
+    session.mount("http://", HttpxAdapter(TransportConfig(max_retries=0, connect_timeout=1)))
+    # Nothing listens on port 9 of localhost
+    with pytest.raises(requests.ConnectionError):
+        session.get("http://127.0.0.1:9/services/data")
+    session.close()
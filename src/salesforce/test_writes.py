@@ -0,0 +1,109 @@
+import asyncio
+import csv
+import io
+
+import pytest
+
+from . import streaming_mcp_server as server
+from .bulk import BulkConfig
+from .mock_salesforce import MockOrgConfig, MockSalesforce, generate_records
+from .registry import ClientRegistry
+from .writes import WriteConfig, WriteValidationError, ingest_payloads, validate_changes
+
+FIELDS = [
+    {"name": "Id", "updateable": False, "type": "id"},
+    {"name": "Name", "updateable": True, "type": "string"},
+    {"name": "AccountId", "updateable": True, "type": "reference"},
+    {"name": "External_Id__c", "updateable": True, "type": "string"},
+    {"name": "CreatedDate", "updateable": False, "type": "datetime"},
+]
+
+
+@pytest.fixture
+def mock(monkeypatch):
+    with MockSalesforce(field_count=5) as mock:
+        mock.add_records("Account", generate_records("Account", 250, field_count=1))
+        monkeypatch.setattr(server, "registry", ClientRegistry({"default": MockOrgConfig(mock.base_url)}))
+        monkeypatch.setattr(server, "bulk_config", BulkConfig(poll_interval=0.01, timeout=5))
+        monkeypatch.setattr(server, "write_config", WriteConfig(bulk_threshold=300, background_threshold=300))
+        yield mock
+
+
+def test_changes_are_checked_against_the_describe():
+    records, key = validate_changes(FIELDS, "Contact", [
+        {"id": "003A", "name": "Ada", "Account": {"External_Id__c": "A-1"}, "attributes": {"type": "Contact"}},
+    ], "ID")
+    assert key == "Id" and records == [{"Id": "003A", "Name": "Ada", "Account": {"External_Id__c": "A-1"}}]
+
+    with pytest.raises(WriteValidationError) as error:
+        validate_changes(FIELDS, "Contact", [{"Id": "003A", "Nmae": "Ada", "CreatedDate": "2024-01-01"},
+                                             {"Name": "Bob", "Account": "001A"}], "Id")
+    assert error.value.problems == [
+        "No such field 'Nmae' on Contact. Did you mean 'Name'?",
+        "Field 'CreatedDate' of Contact is not updateable.",
+        "Record 1: 'Account' takes one external ID field of the parent and its value, e.g. {'External_Id__c': 'A-1'}",
+        "Records 1 have no Id",
+    ]
+
+
+def test_ingest_payloads_split_by_size():
+    records = [{"Id": f"001{i}", "Name": None if i == 1 else f"Account {i}", "Active__c": True} for i in range(3)]
+    records[2]["Account"] = {"External_Id__c": "A-1"}
+    payloads = list(ingest_payloads(records, max_bytes=90))
+    assert [count for _, count in payloads] == [2, 1]
+    rows = [list(csv.reader(io.StringIO(payload.decode()))) for payload, _ in payloads]
+    assert rows[0] == [["Id", "Name", "Active__c", "Account.External_Id__c"],
+                       ["0010", "Account 0", "true", ""], ["0011", "#N/A", "true", ""]]
+    assert rows[1][1] == ["0012", "Account 2", "true", "A-1"]
+
+
+def test_update_records_uses_collections(mock):
+    changes = [{"Id": record["Id"], "Name": f"Renamed {i}"} for i, record in enumerate(mock.records["Account"])]
+    changes[210]["Id"] = "001000000000000999"
+    result = asyncio.run(server.update_records({"object_name": "Account", "records": changes}))
+
+    assert (result["api"], result["requests"], result["succeeded"], result["failed"]) == ("collections", 2, 249, 1)
+    assert result["failures"] == [{"index": 210, "key": "001000000000000999",
+                                   "id": "001000000000000999",
+                                   "errors": ["INVALID_CROSS_REFERENCE_KEY: invalid cross reference id"]}]
+    assert result["ids"][209] == mock.records["Account"][209]["Id"] and result["ids"][210] is None
+    assert mock.records["Account"][0]["Name"] == "Renamed 0"
+
+    # One bad record rolls back its whole request
+    result = asyncio.run(server.update_records({"object_name": "Account", "all_or_none": True, "records": [
+        {"Id": mock.records["Account"][0]["Id"], "Name": "Again"}, {"Id": "001000000000000999", "Name": "x"}]}))
+    assert result["failed"] == 2 and mock.records["Account"][0]["Name"] == "Renamed 0"
+
+    with pytest.raises(ValueError, match="SystemModstamp' of Account is not updateable"):
+        asyncio.run(server.update_records({"object_name": "Account", "records": [
+            {"Id": mock.records["Account"][0]["Id"], "SystemModstamp": "2024-01-01T00:00:00Z"}]}))
+
+
+def test_large_upsert_runs_as_a_background_bulk_job(mock):
+    records = [{"Name": f"Account {i}", "Custom_Field_0__c": f"upserted {i}"} for i in range(400)]
+
+    async def upsert_and_wait():
+        job = await server.upsert_records({"object_name": "Account", "external_id_field": "Name", "records": records})
+        assert (job["state"], job["api"]) == ("running", "bulk")
+        while job["state"] == "running":
+            await asyncio.sleep(0.01)
+            job = await server.get_write_job({"job_id": job["job_id"]})
+        return job
+
+    job = asyncio.run(upsert_and_wait())
+    assert job["state"] == "completed", job
+    result = job["result"]
+    assert (result["succeeded"], result["failed"], result["created"]) == (400, 0, 150)
+    assert len(result["bulk_jobs"]) == 1 and [j["state"] for j in mock.ingest_jobs.values()] == ["JobComplete"]
+    assert mock.records["Account"][0]["Custom_Field_0__c"] == "upserted 0"
+    assert len(mock.records["Account"]) == 400
+
+    # Forced into the foreground, failed rows are read back from the job's failedResults
+    result = asyncio.run(server.update_records({"object_name": "Account", "api": "bulk", "background": False, "records": [
+        {"Id": mock.records["Account"][1]["Id"], "Name": None}, {"Id": "001000000000000999", "Name": "x"}]}))
+    assert (result["succeeded"], result["failed"]) == (1, 1) and mock.records["Account"][1]["Name"] is None
+    assert result["failures"] == [{"index": 1, "key": "001000000000000999", "id": "001000000000000999",
+                                   "errors": ["INVALID_CROSS_REFERENCE_KEY:invalid cross reference id:--"]}]
+
+    with pytest.raises(ValueError, match="Unknown write job"):
+        asyncio.run(server.get_write_job({"job_id": "nope"}))
@@ -0,0 +1,333 @@
+"""
+Structured tracing of tool calls
+Spans kept in a context variable, so one trace follows a tool call from the MCP request handler through
+the rate limiter, the executor and each Salesforce HTTP request and back to the SSE write. Finished traces
+can be exported as OpenTelemetry (OTLP/JSON) lines, and the slowest recent ones are kept for /debug/slow.
+"""
+
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, TextIO
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_THRESHOLD = 1.0
+DEFAULT_SLOW_BUFFER = 100
+
+# Seconds a finished trace waits for the transport to write its response before it is recorded without it
+WRITE_TIMEOUT = 10.0
+MAX_AWAITING_WRITES = 1000
+
+SERVICE_NAME = "mcp-salesforce-server"
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace: "Trace", parent_id: Optional[str], kind: int = KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end, or to now while the span is open"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+class Trace:
+    """Spans of one tool call; the first span is the root"""
+
+    __slots__ = ("trace_id", "spans", "root", "write_key", "_lock")
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        # (session, request id) whose response write still belongs to this trace
+        self.write_key = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def duration(self) -> float:
+        return max((span.end_ns or span.start_ns) for span in self.spans) / 1e9 - self.root.start_ns / 1e9
+
+    def breakdown(self) -> Dict[str, float]:
+        """Seconds spent in each span name, not counting time covered by the span's own children"""
+        children: Dict[str, List[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent_id, []).append(span)
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            end = span.end_ns or span.start_ns
+            covered, cursor = 0, span.start_ns
+            for child in sorted(children.get(span.span_id, []), key=lambda c: c.start_ns):
+                child_start, child_end = max(child.start_ns, cursor), min(child.end_ns or child.start_ns, end)
+                if child_end > child_start:
+                    covered += child_end - child_start
+                    cursor = child_end
+            totals[span.name] = totals.get(span.name, 0.0) + max(0, end - span.start_ns - covered) / 1e9
+        return {name: round(seconds, 6) for name, seconds in sorted(totals.items(), key=lambda item: -item[1])}
+
+    def summary(self) -> Dict[str, Any]:
+        """The trace as /debug/slow shows it: total, self-time breakdown and each span relative to the start"""
+        start = self.root.start_ns
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "attributes": self.root.attributes,
+            "start": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(start / 1e9)) + f".{start // 1000000 % 1000:03d}Z",
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.root.error,
+            "breakdown_ms": {name: round(seconds * 1000, 3) for name, seconds in self.breakdown().items()},
+            "spans": [{
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "offset_ms": round((span.start_ns - start) / 1e6, 3),
+                "duration_ms": round(span.duration * 1000, 3),
+                "attributes": span.attributes,
+                **({"error": span.error} if span.error else {}),
+            } for span in sorted(self.spans, key=lambda s: s.start_ns)],
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """The trace as an OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for span in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                           if value is not None],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": __package__ or "salesforce"}, "spans": spans}],
+    }]}
+
+
+class JsonLinesExporter:
+    """Writes each finished trace as one OTLP/JSON line to a stream or an appended file"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+        if target == "stdout":
+            self._stream: Optional[TextIO] = sys.stdout
+        elif target == "stderr":
+            self._stream = sys.stderr
+        else:
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._stream = open(target, "a", buffering=1, encoding="utf-8")
+        self.exported = 0
+
+    def export(self, trace: Trace):
+        line = json.dumps(to_otlp(trace), separators=(',', ':'), default=str)
+        with self._lock:
+            # Traces that finish after the exporter was replaced are dropped
+            if self._stream is None:
+                return
+            self._stream.write(line + "\n")
+            self.exported += 1
+
+    def close(self):
+        """Close the file of a file target; stdout and stderr stay open"""
+        with self._lock:
+            if self._stream is not None and self.target not in ("stdout", "stderr"):
+                self._stream.close()
+            self._stream = None
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+class _SpanScope:
+    """Context manager that opens a span as the current span and ends it on exit; usable in sync and async code"""
+
+    __slots__ = ("tracer", "name", "kind", "attributes", "child_only", "span", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, kind: int, attributes: Optional[Dict[str, Any]], child_only: bool):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.child_only = child_only
+        self.span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self) -> Optional[Span]:
+        parent = current_span.get()
+        if parent is None and self.child_only:
+            return None
+        trace = parent.trace if parent is not None else Trace()
+        self.span = Span(self.name, trace, parent.span_id if parent else None, self.kind, self.attributes)
+        if parent is None:
+            trace.root = self.span
+        trace.add(self.span)
+        self._token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.span.end_ns = time.time_ns()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        current_span.reset(self._token)
+        if self.span.parent_id is None:
+            self.tracer.finish(self.span.trace)
+        return False
+
+
+class Tracer:
+    """Starts spans and keeps or exports the traces they form
+
+    Traces whose duration reaches slow_threshold seconds go into a ring buffer of slow_buffer entries.
+    """
+
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None, slow_threshold: float = DEFAULT_SLOW_THRESHOLD,
+                 slow_buffer: int = DEFAULT_SLOW_BUFFER):
+        self.exporter = exporter
+        self.slow_threshold = slow_threshold
+        self.slow: "deque[Trace]" = deque(maxlen=slow_buffer)
+        self._awaiting: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.traces = 0
+
+    def configure_from_env(self):
+        """Apply MCP_TRACE_EXPORT (none, stdout, stderr or a file path), MCP_TRACE_SLOW_THRESHOLD and
+        MCP_TRACE_SLOW_BUFFER
+
+        Calling it again keeps an exporter whose target is unchanged and closes one that is replaced.
+        """
+        target = os.getenv('MCP_TRACE_EXPORT', 'none').strip()
+        if not target or target.lower() == 'none':
+            target = None
+        previous = self.exporter
+        if previous is None or previous.target != target:
+            self.exporter = JsonLinesExporter(target) if target else None
+            if previous is not None:
+                previous.close()
+        self.slow_threshold = float(os.getenv('MCP_TRACE_SLOW_THRESHOLD', DEFAULT_SLOW_THRESHOLD))
+        with self._lock:
+            self.slow = deque(self.slow, maxlen=int(os.getenv('MCP_TRACE_SLOW_BUFFER', DEFAULT_SLOW_BUFFER)))
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = KIND_INTERNAL,
+             child_only: bool = False) -> _SpanScope:
+        """Open a span under the current one, or a new trace; with child_only nothing is recorded outside a trace"""
+        return _SpanScope(self, name, kind, attributes, child_only)
+
+    def record(self, name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None):
+        """Add an already finished span under the current span, if there is one"""
+        parent = current_span.get()
+        if parent is None:
+            return
+        span = Span(name, parent.trace, parent.span_id, attributes=attributes, start_ns=start_ns)
+        span.end_ns = end_ns
+        parent.trace.add(span)
+
+    def finish(self, trace: Trace):
+        """Record a trace whose root span ended, or hold it until its response is written"""
+        now = time.monotonic()
+        with self._lock:
+            while self._awaiting and now - next(iter(self._awaiting.values()))[1] > WRITE_TIMEOUT:
+                self._complete(self._awaiting.popitem(last=False)[1][0])
+            if trace.write_key is not None and len(self._awaiting) < MAX_AWAITING_WRITES:
+                self._awaiting[trace.write_key] = (trace, now)
+                return
+            self._complete(trace)
+
+    def written(self, write_key, end_ns: int):
+        """Close the trace waiting for write_key with a span covering the transport's write of its response"""
+        with self._lock:
+            entry = self._awaiting.pop(write_key, None)
+            if entry is None:
+                return
+            trace = entry[0]
+            root = trace.root
+            span = Span("transport.write", trace, root.span_id, attributes={"mcp.transport": "sse"},
+                        start_ns=root.end_ns)
+            span.end_ns = end_ns
+            trace.add(span)
+            self._complete(trace)
+
+    def _complete(self, trace: Trace):
+        self.traces += 1
+        if trace.duration >= self.slow_threshold:
+            self.slow.append(trace)
+        if self.exporter is not None:
+            try:
+                self.exporter.export(trace)
+            except Exception as e:
+                logger.warning(f"Could not export trace {trace.trace_id}: {e}")
+
+    @property
+    def awaiting_writes(self) -> bool:
+        return bool(self._awaiting)
+
+    def slow_calls(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries of the buffered slow traces, slowest first"""
+        with self._lock:
+            traces = sorted(self.slow, key=lambda trace: -trace.duration)
+        return [trace.summary() for trace in traces[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": self.traces,
+            "slow_buffered": len(self.slow),
+            "awaiting_write": len(self._awaiting),
+            "exported": self.exporter.exported if self.exporter is not None else 0,
+        }
+
+
+TRACER = Tracer()
@@ -0,0 +1,333 @@
+"""
+HTTP transport for the Salesforce session
+Connection pool sizing, timeouts, retries with backoff and optional HTTP/2 through httpx
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import io
+import logging
+import os
+import re
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+from .tracing import KIND_CLIENT, TRACER
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Sforce-Limit-Info: api-usage=25/15000
+_API_USAGE = re.compile(r'api-usage=(\d+)/(\d+)')
+
+
+def _env_number(name: str, default: float, cast=float):
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+class TransportConfig:
+    """Connection pool, timeout and retry settings for one Salesforce org"""
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 16, connect_timeout: float = 10.0,
+                 read_timeout: float = 120.0, max_retries: int = 3, backoff_factor: float = 0.5,
+                 backoff_max: float = 30.0, keepalive_expiry: float = 60.0, http2: bool = False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+    @classmethod
+    def from_env(cls, min_pool_size: int = 0) -> "TransportConfig":
+        """Build a config from SALESFORCE_POOL_*, *_TIMEOUT, *_RETRY* and SALESFORCE_HTTP2 variables
+
+        The per-host pool is never smaller than min_pool_size, so every executor thread can hold a
+        connection without tripping urllib3's "connection pool is full" warning.
+        """
+        return cls(
+            pool_connections=_env_number('SALESFORCE_POOL_CONNECTIONS', 4, int),
+            pool_maxsize=max(min_pool_size, _env_number('SALESFORCE_POOL_MAXSIZE', 16, int)),
+            connect_timeout=_env_number('SALESFORCE_CONNECT_TIMEOUT', 10.0),
+            read_timeout=_env_number('SALESFORCE_READ_TIMEOUT', 120.0),
+            max_retries=_env_number('SALESFORCE_MAX_RETRIES', 3, int),
+            backoff_factor=_env_number('SALESFORCE_RETRY_BACKOFF', 0.5),
+            backoff_max=_env_number('SALESFORCE_RETRY_BACKOFF_MAX', 30.0),
+            keepalive_expiry=_env_number('SALESFORCE_KEEPALIVE_EXPIRY', 60.0),
+            http2=os.getenv('SALESFORCE_HTTP2', 'false').lower() in ('1', 'true', 'yes'),
+        )
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+def is_request_limit_exceeded(response: requests.Response) -> bool:
+    """True for the 403 Salesforce returns when the org's concurrent or daily request limit is hit"""
+    return response.status_code == 403 and b'REQUEST_LIMIT_EXCEEDED' in (response.content or b'')
+
+
+def parse_limit_info(header: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(used, limit) daily API requests from a Sforce-Limit-Info header, or None if absent"""
+    match = _API_USAGE.search(header or '')
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+class RetryingAdapterMixin:
+    """Retries 5xx responses on idempotent methods and REQUEST_LIMIT_EXCEEDED on any method
+
+    Sleeps with exponential backoff between attempts and honours Retry-After when present,
+    never for longer than the configured backoff maximum.
+    Applies the configured timeout to requests sent without one, and records the org's daily
+    API usage from the Sforce-Limit-Info header of every response.
+    """
+
+    def _init_retries(self, config: TransportConfig):
+        self.transport_config = config
+        self._stats_lock = threading.Lock()
+        self.request_count = 0
+        self.retry_count = 0
+        self.api_usage: Optional[Tuple[int, int]] = None
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.transport_config.timeout
+        attempt = 0
+        while True:
+            attributes = {"http.method": request.method, "url.path": request.path_url.split('?')[0],
+                          "http.attempt": attempt + 1}
+            with TRACER.span(f"http {request.method}", attributes, KIND_CLIENT, child_only=True) as span:
+                response = self._send_once(request, stream=stream, timeout=timeout, **kwargs)
+                if span is not None:
+                    span.set_attribute("http.status_code", response.status_code)
+            usage = parse_limit_info(response.headers.get('Sforce-Limit-Info'))
+            with self._stats_lock:
+                self.request_count += 1
+                if usage is not None:
+                    self.api_usage = usage
+            retryable = (
+                (response.status_code in RETRY_STATUSES and request.method in IDEMPOTENT_METHODS)
+                or is_request_limit_exceeded(response)
+            )
+            if not retryable or attempt >= self.transport_config.max_retries:
+                return response
+
+            delay = self._retry_delay(response, attempt)
+            logger.warning(f"Salesforce returned {response.status_code} for {request.method} "
+                           f"{request.path_url.split('?')[0]}, retrying in {delay:.2f}s")
+            if response.raw is not None:
+                response.close()
+            attempt += 1
+            with self._stats_lock:
+                self.retry_count += 1
+            time.sleep(delay)
+
+    def _api_usage_stats(self) -> Dict[str, Any]:
+        if self.api_usage is None:
+            return {}
+        used, limit = self.api_usage
+        return {"api_requests_used": used, "api_requests_limit": limit}
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = self.transport_config.backoff_factor * (2 ** attempt)
+        # The sleep holds an executor thread, so a large Retry-After must not stall it for minutes
+        return min(delay, self.transport_config.backoff_max)
+
+
+class PooledAdapter(RetryingAdapterMixin, HTTPAdapter):
+    """urllib3-backed HTTP/1.1 adapter with keep-alive connection pooling"""
+
+    def __init__(self, config: TransportConfig):
+        self._init_retries(config)
+        super().__init__(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            # Connection errors are retried by urllib3; response statuses are handled by the mixin
+            max_retries=Retry(total=config.max_retries, read=0, status=0, backoff_factor=config.backoff_factor,
+                              raise_on_status=False),
+        )
+
+    def _send_once(self, request, **kwargs):
+        return HTTPAdapter.send(self, request, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests sent versus connections opened across the live host pools"""
+        connections = 0
+        pooled_requests = 0
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        return {
+            "transport": "http/1.1",
+            "requests": self.request_count,
+            "retries": self.retry_count,
+            "connections_opened": connections,
+            "connections_reused": max(0, pooled_requests - connections),
+            "pool_maxsize": self.transport_config.pool_maxsize,
+            **self._api_usage_stats(),
+        }
+
+
+def _requests_error(error: httpx.HTTPError, request) -> requests.RequestException:
+    """The requests exception simple_salesforce and callers expect for an httpx transport error"""
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(error, request=request)
+    if isinstance(error, httpx.ReadTimeout):
+        return requests.ReadTimeout(error, request=request)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.Timeout(error, request=request)
+    return requests.ConnectionError(error, request=request)
+
+
+class _HttpxStream(io.RawIOBase):
+    """Streamed httpx response body in the shape requests expects of Response.raw"""
+
+    def __init__(self, response: httpx.Response, request):
+        super().__init__()
+        self._response = response
+        self._request = request
+        self._chunks = None
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def stream(self, chunk_size: Optional[int] = None, decode_content: bool = True):
+        # httpx has already undone any Content-Encoding, so decode_content has nothing left to do
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.TransportError as e:
+            raise _requests_error(e, self._request) from e
+        finally:
+            self.close()
+
+    def readinto(self, buffer) -> int:
+        if self._chunks is None:
+            self._chunks = self.stream()
+        while not self._pending:
+            self._pending = next(self._chunks, b"")
+            if not self._pending:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def release_conn(self):
+        self.close()
+
+    def close(self):
+        self._response.close()
+        super().close()
+
+
+class HttpxAdapter(RetryingAdapterMixin, BaseAdapter):
+    """Adapter that sends requests through an httpx.Client, enabling HTTP/2 multiplexing"""
+
+    def __init__(self, config: TransportConfig):
+        self._init_retries(config)
+        super().__init__()
+        limits = httpx.Limits(
+            max_connections=config.pool_connections * config.pool_maxsize,
+            max_keepalive_connections=config.pool_maxsize,
+            keepalive_expiry=config.keepalive_expiry,
+        )
+        self.client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=config.http2, limits=limits, retries=config.max_retries),
+        )
+
+    def _send_once(self, request, stream=False, timeout=None, **kwargs):
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        outgoing = self.client.build_request(request.method, request.url, headers=dict(request.headers),
+                                             content=request.body, timeout=timeout)
+        try:
+            result = self.client.send(outgoing, stream=True)
+            if not stream:
+                try:
+                    result.read()
+                finally:
+                    result.close()
+        except httpx.TransportError as e:
+            raise _requests_error(e, request) from e
+        response = requests.Response()
+        response.status_code = result.status_code
+        response.reason = result.reason_phrase
+        response.headers = CaseInsensitiveDict(result.headers)
+        if stream:
+            # Bulk result pages are consumed chunk by chunk without holding the whole body
+            response.raw = _HttpxStream(result, request)
+        else:
+            # The body is already read, so iter_content() replays _content and close() has a raw to release
+            response._content = result.content
+            response._content_consumed = True
+            response.raw = io.BytesIO(result.content)
+        response.encoding = result.encoding
+        response.url = str(result.url)
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests sent versus connections currently held by the httpx pool"""
+        pool = getattr(self.client._transport, '_pool', None)
+        open_connections = len(getattr(pool, 'connections', []) or [])
+        return {
+            "transport": "http/2" if self.transport_config.http2 else "http/1.1",
+            "requests": self.request_count,
+            "retries": self.retry_count,
+            "connections_open": open_connections,
+            "pool_maxsize": self.transport_config.pool_maxsize,
+            **self._api_usage_stats(),
+        }
+
+
+def build_session(config: TransportConfig) -> requests.Session:
+    """Create the requests session simple_salesforce should use for this org"""
+    session = requests.Session()
+    adapter = None
+    if config.http2:
+        try:
+            import h2  # noqa: F401
+            adapter = HttpxAdapter(config)
+        except ImportError:
+            logger.warning("SALESFORCE_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+    if adapter is None:
+        adapter = PooledAdapter(config)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_stats(session: Optional[requests.Session]) -> Dict[str, Any]:
+    """Connection reuse statistics for a session built by build_session"""
+    if session is None:
+        return {}
+    adapter = session.get_adapter("https://")
+    return adapter.stats() if hasattr(adapter, "stats") else {}
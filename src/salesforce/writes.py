@@ -0,0 +1,498 @@
+"""
+Record updates and upserts
+Changes are checked against the object's describe, then sent as sObject Collections requests of 200
+records or, for larger volumes, as Bulk API 2.0 ingest jobs. Large writes run as background jobs whose
+state is polled by job ID, so the tool call that started them returns at once.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import csv
+import io
+import logging
+import os
+import time
+import uuid
+
+from .bulk import BulkConfig, BulkSink, report, wait_for_job
+from .soql import relationship_names, suggest
+from .tracing import TRACER, current_span
+
+logger = logging.getLogger(__name__)
+
+WRITE_OPERATIONS = ("update", "upsert")
+WRITE_APIS = ("auto", "collections", "bulk")
+
+# Maximum number of records in one sObject Collections update or upsert request
+COLLECTION_WRITE_LIMIT = 200
+
+# Bulk API 2.0 takes up to 150 MB of base64-encoded CSV per job; larger writes are split across jobs
+INGEST_MAX_BYTES = 100 * 1024 * 1024
+
+# Bulk API 2.0 CSV value that clears a field; an empty value leaves it unchanged
+CSV_NULL = "#N/A"
+
+DEFAULT_BULK_THRESHOLD = 2000
+DEFAULT_BACKGROUND_THRESHOLD = 1000
+DEFAULT_MAX_FAILURES = 100
+DEFAULT_KEEP_JOBS = 100
+
+# Problems listed in one validation error
+MAX_PROBLEMS = 20
+
+
+class WriteValidationError(ValueError):
+    """The changes reference fields that do not exist or cannot be written; problems lists each one"""
+
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        listed = problems[:MAX_PROBLEMS]
+        if len(problems) > MAX_PROBLEMS:
+            listed.append(f"and {len(problems) - MAX_PROBLEMS} more")
+        super().__init__("Invalid changes: " + "; ".join(listed))
+
+
+class WriteConfig:
+    """Routing and job settings for update_records and upsert_records
+
+    Writes of more than bulk_threshold records go to Bulk API 2.0, and writes of more than
+    background_threshold records, or through Bulk API 2.0, run in the background.
+    """
+
+    def __init__(self, bulk_threshold: int = DEFAULT_BULK_THRESHOLD,
+                 background_threshold: int = DEFAULT_BACKGROUND_THRESHOLD,
+                 max_failures: int = DEFAULT_MAX_FAILURES, read_only: bool = False):
+        self.bulk_threshold = bulk_threshold
+        self.background_threshold = background_threshold
+        self.max_failures = max_failures
+        self.read_only = read_only
+
+    @classmethod
+    def from_env(cls) -> "WriteConfig":
+        """Build a config from SALESFORCE_WRITE_* environment variables and SALESFORCE_READ_ONLY"""
+        return cls(
+            bulk_threshold=int(os.getenv('SALESFORCE_WRITE_BULK_THRESHOLD', DEFAULT_BULK_THRESHOLD)),
+            background_threshold=int(os.getenv('SALESFORCE_WRITE_BACKGROUND_THRESHOLD', DEFAULT_BACKGROUND_THRESHOLD)),
+            max_failures=int(os.getenv('SALESFORCE_WRITE_MAX_FAILURES', DEFAULT_MAX_FAILURES)),
+            read_only=os.getenv('SALESFORCE_READ_ONLY', 'false').lower() in ('1', 'true', 'yes'),
+        )
+
+    def choose_api(self, api: str, count: int, all_or_none: bool = False) -> str:
+        """'collections' or 'bulk' for a write of count records; Bulk API 2.0 has no all-or-none mode"""
+        if api != "auto":
+            return api
+        return "bulk" if count > self.bulk_threshold and not all_or_none else "collections"
+
+    def in_background(self, api: str, count: int, background: Optional[bool] = None) -> bool:
+        if background is not None:
+            return bool(background)
+        return api == "bulk" or count > self.background_threshold
+
+
+def validate_changes(fields: List[Dict[str, Any]], object_name: str, records: List[Any],
+                     key_field: str) -> Tuple[List[Dict[str, Any]], str]:
+    """Check records against the describe fields of object_name; returns them with field names in describe
+    casing, plus the key field's name
+
+    key_field identifies each record: Id for updates, the external ID field for upserts. It is the one
+    field that may be set without being updateable. A lookup may also be set through its relationship to
+    a parent's external ID, e.g. {"Account": {"External_Id__c": "A-1"}}. Raises WriteValidationError
+    listing every problem.
+    """
+    by_lower = {field["name"].lower(): field for field in fields}
+    relationships = relationship_names(fields)
+    key = by_lower.get(key_field.lower())
+    if key is None:
+        raise WriteValidationError([f"No such field '{key_field}' on {object_name}."
+                                    f"{suggest(key_field, [field['name'] for field in fields])}"])
+    problems = [f"Record {i} is not an object" for i, record in enumerate(records) if not isinstance(record, dict)]
+    if problems:
+        raise WriteValidationError(problems)
+
+    names = {}
+    for name in dict.fromkeys(name for record in records for name in record):
+        lowered = name.lower()
+        if lowered == "attributes":
+            continue
+        field = by_lower.get(lowered)
+        if field is None and lowered in relationships:
+            lookup = by_lower[lowered[:-3] + "__c" if lowered.endswith("__r") else lowered + "id"]
+            if lookup.get("updateable"):
+                names[name] = relationships[lowered]
+            else:
+                problems.append(f"Field '{lookup['name']}' of {object_name} is not updateable.")
+        elif field is None:
+            problems.append(f"No such field '{name}' on {object_name}.{suggest(name, [f['name'] for f in fields])}")
+        elif field is not key and not field.get("updateable"):
+            problems.append(f"Field '{field['name']}' of {object_name} is not updateable.")
+        else:
+            names[name] = field["name"]
+
+    normalized, missing = [], []
+    for i, record in enumerate(records):
+        changes = {}
+        for name, value in record.items():
+            target = names.get(name)
+            if target is None:
+                continue
+            if target.lower() in relationships:
+                if not isinstance(value, dict) or len(value) != 1:
+                    problems.append(f"Record {i}: '{target}' takes one external ID field of the parent and its "
+                                    f"value, e.g. {{'External_Id__c': 'A-1'}}")
+            elif isinstance(value, (dict, list)):
+                problems.append(f"Record {i}: '{target}' takes a single value")
+            changes[target] = value
+        if changes.get(key["name"]) in (None, ""):
+            missing.append(str(i))
+        normalized.append(changes)
+    if missing:
+        listed = ", ".join(missing[:10]) + (f" and {len(missing) - 10} more" if len(missing) > 10 else "")
+        problems.append(f"Records {listed} have no {key['name']}")
+    if problems:
+        raise WriteValidationError(problems)
+    return normalized, key["name"]
+
+
+def _error_text(error: Dict[str, Any]) -> str:
+    text = f"{error['statusCode']}: {error.get('message')}" if error.get("statusCode") else str(error.get("message"))
+    if error.get("fields"):
+        text += f" ({', '.join(error['fields'])})"
+    return text
+
+
+def _summary(object_name: str, operation: str, api: str, records: int, failed: int,
+             failures: List[Dict[str, Any]], max_failures: int) -> Dict[str, Any]:
+    result = {
+        "object_name": object_name,
+        "operation": operation,
+        "api": api,
+        "records": records,
+        "succeeded": records - failed,
+        "failed": failed,
+    }
+    if failures:
+        result["failures"] = failures[:max_failures]
+        if failed > max_failures:
+            result["failures_truncated"] = True
+    return result
+
+
+async def write_collections(client, operation: str, object_name: str, records: List[Dict[str, Any]],
+                            key_field: str, *, all_or_none: bool = False, max_failures: int = DEFAULT_MAX_FAILURES,
+                            progress=None) -> Dict[str, Any]:
+    """Write records with sObject Collections requests of 200, sent concurrently
+
+    With all_or_none a request is rolled back when any of its records fails; other requests are not.
+    A request that fails as a whole fails all of its records. 'ids' lists the record IDs in input
+    order, with None for records that failed.
+    """
+    external_id = key_field if operation == "upsert" else None
+    chunks = [records[i:i + COLLECTION_WRITE_LIMIT] for i in range(0, len(records), COLLECTION_WRITE_LIMIT)]
+    done = 0
+
+    async def send(chunk):
+        nonlocal done
+        try:
+            outcome = await client.run(client.write_collection, object_name, chunk, external_id, all_or_none)
+        except Exception as e:
+            outcome = e
+        done += len(chunk)
+        await report(progress, done, len(records), f"Wrote {done} of {len(records)} records")
+        return outcome
+
+    outcomes = await asyncio.gather(*(send(chunk) for chunk in chunks))
+    ids, failures, created = [], [], 0
+    for chunk, outcome in zip(chunks, outcomes):
+        for i, record in enumerate(chunk):
+            if isinstance(outcome, Exception):
+                result = {"success": False, "errors": [{"message": str(outcome)}]}
+            else:
+                result = outcome[i]
+            if result.get("success"):
+                ids.append(result.get("id"))
+                created += bool(result.get("created"))
+                continue
+            ids.append(None)
+            failure = {"index": len(ids) - 1, "key": record.get(key_field),
+                       "errors": [_error_text(error) for error in result.get("errors") or []]}
+            if result.get("id"):
+                failure["id"] = result["id"]
+            failures.append(failure)
+
+    summary = _summary(object_name, operation, "collections", len(records), len(failures), failures, max_failures)
+    summary["requests"] = len(chunks)
+    if operation == "upsert":
+        summary["created"] = created
+    summary["ids"] = ids
+    return summary
+
+
+def _csv_value(value: Any) -> str:
+    if value is None or value == "":
+        return CSV_NULL
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def ingest_payloads(records: List[Dict[str, Any]], max_bytes: int = INGEST_MAX_BYTES):
+    """CSV payloads of at most max_bytes, each starting with the header row, with their record counts
+
+    A relationship set by external ID becomes a 'Relationship.Field' column. Fields a record does not
+    set are left empty, which leaves them unchanged.
+    """
+    rows = []
+    for record in records:
+        row = {}
+        for name, value in record.items():
+            if isinstance(value, dict):
+                (field, value), = value.items()
+                name = f"{name}.{field}"
+            row[name] = value
+        rows.append(row)
+    columns = list(dict.fromkeys(name for row in rows for name in row))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def line(values) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue().encode("utf-8")
+
+    header = line(columns)
+    lines, size = [header], len(header)
+    for row in rows:
+        encoded = line([_csv_value(row[column]) if column in row else "" for column in columns])
+        if len(lines) > 1 and size + len(encoded) > max_bytes:
+            yield b"".join(lines), len(lines) - 1
+            lines, size = [header], len(header)
+        lines.append(encoded)
+        size += len(encoded)
+    if len(lines) > 1:
+        yield b"".join(lines), len(lines) - 1
+
+
+class FailureSink(BulkSink):
+    """Keeps the first limit rows of an ingest job's failedResults pages"""
+
+    def __init__(self, key_field: str, index_by_key: Dict[str, int], limit: int):
+        super().__init__()
+        self.key_field = key_field
+        self.index_by_key = index_by_key
+        self.limit = limit
+        self.failures: List[Dict[str, Any]] = []
+
+    def add(self, row: List[str]):
+        if len(self.failures) >= self.limit:
+            return
+        values = dict(zip(self.columns, row))
+        key = values.get(self.key_field)
+        failure = {"index": self.index_by_key.get(key), "key": key, "errors": [values.get("sf__Error", "")]}
+        if values.get("sf__Id"):
+            failure["id"] = values["sf__Id"]
+        self.failures.append(failure)
+
+
+class CreatedSink(BulkSink):
+    """Counts the records an upsert created, from an ingest job's successfulResults pages"""
+
+    def __init__(self):
+        super().__init__()
+        self.created = 0
+
+    def add(self, row: List[str]):
+        self.created += dict(zip(self.columns, row)).get("sf__Created") == "true"
+
+
+async def write_bulk(client, bulk_config: BulkConfig, operation: str, object_name: str, records: List[Dict[str, Any]],
+                     key_field: str, *, max_failures: int = DEFAULT_MAX_FAILURES, progress=None) -> Dict[str, Any]:
+    """Write records with Bulk API 2.0 ingest jobs, one per INGEST_MAX_BYTES of CSV, run one after another
+
+    A job is aborted if its upload fails or is cancelled. Once uploaded it is left to finish even if
+    polling times out or is cancelled, since aborting would not undo the records already written.
+    """
+    external_id = key_field if operation == "upsert" else None
+    index_by_key: Dict[str, int] = {}
+    for i, record in enumerate(records):
+        index_by_key.setdefault(str(record.get(key_field)), i)
+    failures = FailureSink(key_field, index_by_key, max_failures)
+    created = CreatedSink() if operation == "upsert" else None
+    job_ids, failed = [], 0
+
+    for payload, count in ingest_payloads(records):
+        job = await client.run(client.create_ingest_job, object_name, operation, external_id)
+        job_id = job["id"]
+        job_ids.append(job_id)
+        try:
+            await client.run(client.upload_ingest_data, job_id, payload)
+            await client.run(client.set_ingest_job_state, job_id, "UploadComplete")
+        except BaseException:
+            try:
+                await client.run(client.set_ingest_job_state, job_id, "Aborted")
+            except Exception as e:
+                logger.warning(f"Could not abort bulk ingest job {job_id}: {e}")
+            raise
+        await report(progress, 0, count, f"Uploaded {count} records to bulk job {job_id}")
+
+        job = await wait_for_job(client, job_id, bulk_config, progress, get_job=client.get_ingest_job)
+        job_failed = int(job.get("numberRecordsFailed") or 0)
+        failed += job_failed
+        if job_failed:
+            await client.run(client.read_ingest_results, job_id, "failedResults", failures.consume)
+        if created is not None and int(job.get("numberRecordsProcessed") or 0) > job_failed:
+            await client.run(client.read_ingest_results, job_id, "successfulResults", created.consume)
+
+    summary = _summary(object_name, operation, "bulk", len(records), failed, failures.failures, max_failures)
+    summary["bulk_jobs"] = job_ids
+    if created is not None:
+        summary["created"] = created.created
+    return summary
+
+
+class WriteJob:
+    """One update_records or upsert_records call running in the background"""
+
+    def __init__(self, operation: str, object_name: str, api: str, records: int):
+        self.job_id = uuid.uuid4().hex
+        self.operation = operation
+        self.object_name = object_name
+        self.api = api
+        self.records = records
+        self.state = "running"
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.processed = 0
+        self.message: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def report_progress(self, progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        """Progress callback with the signature of Context.report_progress"""
+        self.processed = int(progress)
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = {
+            "job_id": self.job_id,
+            "state": self.state,
+            "operation": self.operation,
+            "object_name": self.object_name,
+            "api": self.api,
+            "records": self.records,
+            "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "elapsed_seconds": round((self.finished or time.time()) - self.started, 3),
+        }
+        if self.state == "running":
+            status.update(processed=self.processed, message=self.message)
+        if self.finished is not None:
+            status["finished_at"] = datetime.fromtimestamp(self.finished, timezone.utc).isoformat()
+        if self.result is not None:
+            status["result"] = self.result
+        if self.error is not None:
+            status["error"] = self.error
+        return status
+
+
+class WriteJobs:
+    """Background write jobs of one org; the keep most recently finished ones stay available for polling"""
+
+    def __init__(self, keep: int = DEFAULT_KEEP_JOBS):
+        self.keep = keep
+        self._jobs: Dict[str, WriteJob] = {}
+        self.completed = 0
+        self.failed = 0
+
+    def start(self, job: WriteJob, write: Callable[[WriteJob], Awaitable[Dict[str, Any]]]) -> WriteJob:
+        """Run write(job) as a task; job receives its progress"""
+        self._jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, write))
+        return job
+
+    async def _run(self, job: WriteJob, write):
+        # The job outlives the tool call that started it, so it is traced on its own
+        current_span.set(None)
+        try:
+            with TRACER.span(f"write_job.{job.operation}", {"salesforce.object": job.object_name,
+                                                             "write.records": job.records, "write.api": job.api}):
+                job.result = await write(job)
+            job.state = "completed"
+            self.completed += 1
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Write job {job.job_id} failed: {e}")
+            job.state = "failed"
+            job.error = str(e)
+            self.failed += 1
+        finally:
+            job.finished = time.time()
+            job.task = None
+            self._prune()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.finished is not None]
+        for job in sorted(finished, key=lambda job: job.finished)[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[WriteJob]:
+        return self._jobs.get(job_id)
+
+    async def close(self):
+        """Cancel running jobs; uploaded bulk ingest jobs keep running in Salesforce"""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": sum(job.state == "running" for job in self._jobs.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+async def write_records(client, operation: str, object_name: str, records: List[Any], key_field: str, *,
+                        config: WriteConfig, bulk_config: BulkConfig, all_or_none: bool = False, api: str = "auto",
+                        background: Optional[bool] = None, ctx=None) -> Dict[str, Any]:
+    """Validate and write records of one object, returning the write's result or, when it runs in the
+    background, the status of its job
+
+    Cached query results of the org and the object's local replica stop answering once records were written.
+    """
+    if config.read_only:
+        raise ValueError("Writes are disabled on this server (SALESFORCE_READ_ONLY)")
+    if operation not in WRITE_OPERATIONS:
+        raise ValueError(f"'operation' must be one of {', '.join(WRITE_OPERATIONS)}")
+    if api not in WRITE_APIS:
+        raise ValueError(f"'api' must be one of {', '.join(WRITE_APIS)}")
+    if api == "bulk" and all_or_none:
+        raise ValueError("'all_or_none' is not supported by Bulk API 2.0; use the collections api")
+    if not records:
+        raise ValueError("No records to write")
+
+    records, key_field = validate_changes(await client.object_fields(object_name), object_name, records, key_field)
+    api = config.choose_api(api, len(records), all_or_none)
+
+    async def write(progress) -> Dict[str, Any]:
+        if api == "bulk":
+            result = await write_bulk(client, bulk_config, operation, object_name, records, key_field,
+                                      max_failures=config.max_failures, progress=progress)
+        else:
+            result = await write_collections(client, operation, object_name, records, key_field,
+                                             all_or_none=all_or_none, max_failures=config.max_failures,
+                                             progress=progress)
+        if result["succeeded"]:
+            client.query_cache.invalidate(client.identity)
+            if client.replica is not None:
+                client.replica.invalidate(object_name)
+        return result
+
+    if config.in_background(api, len(records), background):
+        return client.write_jobs.start(WriteJob(operation, object_name, api, len(records)), write).to_dict()
+    return await write(ctx)